@@ -2,13 +2,23 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
+from iot_gateway import tracing
 from iot_gateway.config import settings
 
 engine = create_async_engine(
     settings.database_url,
     echo=False,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
 )
 
+if tracing.tracer.enabled:
+    tracing.instrument_engine(engine.sync_engine)
+
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
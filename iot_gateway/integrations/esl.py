@@ -0,0 +1,239 @@
+"""Native asyncio client for the FreeSWITCH Event Socket (inbound mode)."""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable
+from urllib.parse import unquote
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict[str, str]], None]
+
+
+class ESLError(Exception):
+    """Connection, authentication or protocol failure talking to FreeSWITCH."""
+
+
+class ESLFrame:
+    __slots__ = ("headers", "body")
+
+    def __init__(self, headers: dict[str, str], body: str = "") -> None:
+        self.headers = headers
+        self.body = body
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "")
+
+    @property
+    def reply_text(self) -> str:
+        return self.headers.get("Reply-Text", "")
+
+
+def _parse_headers(block: str, decode: bool = False) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    for line in block.split("\n"):
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        value = value.strip()
+        # most event values carry no escapes; skip unquote() for them (hot on busy event streams)
+        headers[name.strip()] = unquote(value) if decode and "%" in value else value
+    return headers
+
+
+def parse_event(body: str) -> dict[str, str]:
+    """Decode a text/event-plain body; the event's own body (if any) is stored under `_body`."""
+    head, _, rest = body.partition("\n\n")
+    event = _parse_headers(head, decode=True)
+    if rest:
+        length = int(event.get("Content-Length", len(rest)))
+        event["_body"] = rest[:length]
+    return event
+
+
+class ESLClient:
+    """
+    One long-lived authenticated connection. Commands are pipelined: replies arrive
+    in send order, so each caller waits on its own future in a FIFO. Every bgapi carries
+    a client-generated Job-UUID, so results can be matched to BACKGROUND_JOB events.
+    The connection is re-established on the next command after it drops.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        *,
+        connect_timeout: float = 5.0,
+        command_timeout: float = 10.0,
+        reconnect_max_delay: float = 30.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.password = password
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.reconnect_max_delay = reconnect_max_delay
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+        self._event_handlers: list[EventHandler] = []
+        self._subscriptions: set[str] = set()
+        self._reconnect_delay = 0.0
+        self._next_attempt_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def add_event_handler(self, handler: EventHandler) -> None:
+        self._event_handlers.append(handler)
+
+    async def connect(self) -> None:
+        """Connect and authenticate unless already connected; failures back off exponentially."""
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if self.connected:
+                return
+            now = time.monotonic()
+            if now < self._next_attempt_at:
+                raise ESLError(f"ESL reconnect backoff ({self._next_attempt_at - now:.1f}s left)")
+            try:
+                await asyncio.wait_for(self._open(), timeout=self.connect_timeout)
+            except (OSError, asyncio.TimeoutError, ESLError, asyncio.IncompleteReadError) as e:
+                await self._drop()
+                self._reconnect_delay = min(max(self._reconnect_delay * 2, 0.5), self.reconnect_max_delay)
+                self._next_attempt_at = time.monotonic() + self._reconnect_delay
+                raise ESLError(f"ESL connection to {self.host}:{self.port} failed: {e}") from e
+            self._reconnect_delay = 0.0
+            self._next_attempt_at = 0.0
+            if self._subscriptions:
+                await self._command(f"event plain {' '.join(sorted(self._subscriptions))}")
+
+    async def _open(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        frame = await self._read_frame()
+        if frame.content_type != "auth/request":
+            raise ESLError(f"unexpected greeting: {frame.content_type!r}")
+        self._writer.write(f"auth {self.password}\n\n".encode())
+        await self._writer.drain()
+        frame = await self._read_frame()
+        if not frame.reply_text.startswith("+OK"):
+            raise ESLError(f"authentication failed: {frame.reply_text}")
+        self._reader_task = asyncio.create_task(self._read_loop())
+        logger.info("ESL connected to %s:%s", self.host, self.port)
+
+    async def close(self) -> None:
+        if self._writer is not None and not self._writer.is_closing():
+            try:
+                self._writer.write(b"exit\n\n")
+            except Exception:
+                pass
+        await self._drop()
+
+    async def _drop(self) -> None:
+        task, self._reader_task = self._reader_task, None
+        writer, self._writer = self._writer, None
+        self._reader = None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+        self._fail_pending(ESLError("ESL connection closed"))
+
+    def _fail_pending(self, exc: Exception) -> None:
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_exception(exc)
+
+    async def _read_frame(self) -> ESLFrame:
+        assert self._reader is not None
+        raw = await self._reader.readuntil(b"\n\n")
+        headers = _parse_headers(raw.decode())
+        body = ""
+        length = int(headers.get("Content-Length", 0))
+        if length:
+            body = (await self._reader.readexactly(length)).decode()
+        return ESLFrame(headers, body)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                frame = await self._read_frame()
+                ctype = frame.content_type
+                if ctype in ("command/reply", "api/response"):
+                    if self._pending:
+                        fut = self._pending.popleft()
+                        if not fut.done():  # the caller may already have timed out
+                            fut.set_result(frame)
+                elif ctype == "text/event-plain":
+                    event = parse_event(frame.body)
+                    for handler in self._event_handlers:
+                        try:
+                            handler(event)
+                        except Exception:
+                            logger.exception("ESL event handler failed")
+                elif ctype == "text/disconnect-notice":
+                    logger.warning("ESL disconnect notice from %s:%s", self.host, self.port)
+                    break
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            logger.warning("ESL connection lost: %s", e)
+        except Exception:
+            logger.exception("ESL reader failed")
+        self._reader_task = None
+        await self._drop()
+
+    async def _command(self, command: str, extra_headers: dict[str, str] | None = None) -> ESLFrame:
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            raise ESLError("ESL not connected")
+        lines = [command]
+        for name, value in (extra_headers or {}).items():
+            lines.append(f"{name}: {value}")
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        # write and enqueue without awaiting in between so the FIFO matches the wire order
+        writer.write(("\n".join(lines) + "\n\n").encode())
+        self._pending.append(fut)
+        await writer.drain()
+        return await asyncio.wait_for(fut, timeout=self.command_timeout)
+
+    async def api(self, command: str) -> str:
+        """Blocking FreeSWITCH API call; returns the response body."""
+        await self.connect()
+        frame = await self._command(f"api {command}")
+        return frame.body
+
+    async def bgapi(self, command: str, job_uuid: str | None = None) -> str:
+        """Queue a background job and return its Job-UUID; raises ESLError on -ERR."""
+        await self.connect()
+        job_uuid = job_uuid or str(uuid4())
+        frame = await self._command(f"bgapi {command}", {"Job-UUID": job_uuid})
+        if not frame.reply_text.startswith("+OK"):
+            raise ESLError(frame.reply_text or "bgapi rejected")
+        replied = frame.headers.get("Job-UUID")
+        if replied and replied != job_uuid:
+            logger.warning("ESL bgapi reply Job-UUID %s does not match %s", replied, job_uuid)
+            return replied
+        return job_uuid
+
+    async def subscribe(self, *event_names: str) -> None:
+        """Subscribe to events (plain format); re-applied automatically after reconnect."""
+        self._subscriptions.update(event_names)
+        if not self.connected:
+            await self.connect()  # applies the subscriptions
+            return
+        await self._command(f"event plain {' '.join(sorted(self._subscriptions))}")
@@ -1,32 +1,80 @@
 """FreeSWITCH integration: originate call via REST or ESL."""
+import asyncio
 import logging
-from typing import Any
+from typing import Any, Protocol
+from uuid import uuid4
 
 import httpx
 
 from iot_gateway.config import settings
+from iot_gateway.integrations import http_client
+from iot_gateway.integrations.esl import ESLClient, ESLError
+from iot_gateway.metrics import stage
 
 logger = logging.getLogger(__name__)
 
+_esl_client: ESLClient | None = None
 
-async def originate(destination_number: str, caller_id: str | None = None, playback: str | None = None) -> dict[str, Any]:
+
+class CallTracker(Protocol):
+    def track(self, call_id: str, destination: str) -> None: ...
+
+    def discard(self, call_id: str) -> None: ...
+
+
+_call_tracker: CallTracker | None = None
+
+
+def set_call_tracker(tracker: CallTracker | None) -> None:
+    """Register the tracker told about every ESL originate before it is sent (None to unregister)."""
+    global _call_tracker
+    _call_tracker = tracker
+
+
+def uses_rest() -> bool:
+    return bool(getattr(settings, "freeswitch_rest_url", None))
+
+
+def uses_mock() -> bool:
+    """FREESWITCH_MOCK if set; otherwise mock when no FreeSWITCH is configured at all (no REST URL, default host)."""
+    if settings.freeswitch_mock is not None:
+        return settings.freeswitch_mock
+    return not uses_rest() and "freeswitch_host" not in settings.model_fields_set
+
+
+async def originate(
+    destination_number: str,
+    caller_id: str | None = None,
+    playback: str | None = None,
+    call_id: str | None = None,
+) -> dict[str, Any]:
     """
     Initiate outbound call via FreeSWITCH.
+    `call_id` is used as the channel UUID (a new one when None); FreeSWITCH refuses a second
+    channel with the same UUID, so retries of one call should pass the same call_id.
     Returns dict with success (bool), call_id (str | None), error (str | None).
     """
-    if getattr(settings, "freeswitch_rest_url", None):
-        return await _originate_rest(destination_number, caller_id=caller_id, playback=playback)
-    return await _originate_esl(destination_number, caller_id=caller_id, playback=playback)
+    if uses_mock():
+        logger.warning("FreeSWITCH mock mode; skipping originate to %s (mock)", destination_number)
+        return {"success": True, "call_id": call_id, "error": None, "mock": True}
+    if uses_rest():
+        with stage("freeswitch.originate_rest") as timer:
+            result = await _originate_rest(destination_number, caller_id=caller_id, playback=playback, call_id=call_id)
+            if not result["success"]:
+                timer.outcome = "failure"
+        return result
+    with stage("freeswitch.originate_esl") as timer:
+        result = await _originate_esl(destination_number, caller_id=caller_id, playback=playback, call_id=call_id)
+        if not result["success"]:
+            timer.outcome = "failure"
+    return result
 
 
 async def _originate_rest(
-    destination_number: str, caller_id: str | None = None, playback: str | None = None
+    destination_number: str, caller_id: str | None = None, playback: str | None = None, call_id: str | None = None
 ) -> dict[str, Any]:
     """Use FreeSWITCH REST API (mod_http_cache or similar) if available."""
     base = (settings.freeswitch_rest_url or "").rstrip("/")
-    if not base:
-        logger.warning("FREESWITCH_REST_URL not set; skipping originate (mock)")
-        return {"success": True, "call_id": None, "error": None, "mock": True}
     url = f"{base}/api/originate"
     payload: dict[str, Any] = {
         "destination": destination_number,
@@ -34,46 +82,90 @@ async def _originate_rest(
     }
     if caller_id:
         payload["caller_id"] = caller_id
+    if call_id:
+        payload["uuid"] = call_id
     if playback:
         payload["application"] = "playback"
         payload["application_data"] = playback
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(url, json=payload)
-            if r.status_code >= 400:
-                return {"success": False, "call_id": None, "error": r.text}
-            data = r.json() if r.content else {}
-            return {
-                "success": True,
-                "call_id": data.get("uuid") or data.get("call_id"),
-                "error": None,
-            }
+        r = await http_client.post(url, json=payload, read_timeout=settings.freeswitch_rest_timeout_seconds)
+        if r.status_code >= 400:
+            return {"success": False, "call_id": None, "error": r.text}
+        data = r.json() if r.content else {}
+        return {
+            "success": True,
+            "call_id": data.get("uuid") or data.get("call_id"),
+            "error": None,
+        }
     except Exception as e:
         logger.exception("FreeSWITCH REST originate failed")
         return {"success": False, "call_id": None, "error": str(e)}
 
 
+async def check() -> dict[str, Any]:
+    """Reachability for readiness: ESL connects and authenticates; REST gets any HTTP reply from the base URL."""
+    if uses_mock():
+        return {"mode": "mock", "reachable": True}
+    if not uses_rest():
+        try:
+            await _get_esl_client().connect()
+        except ESLError as e:
+            return {"mode": "esl", "reachable": False, "error": str(e)}
+        return {"mode": "esl", "reachable": True}
+    base = settings.freeswitch_rest_url
+    try:
+        await http_client.get_client().get(base, timeout=settings.http_connect_timeout_seconds)
+    except httpx.HTTPError as e:
+        return {"mode": "rest", "reachable": False, "error": str(e) or e.__class__.__name__}
+    return {"mode": "rest", "reachable": True}
+
+
+def new_esl_client() -> ESLClient:
+    return ESLClient(
+        settings.freeswitch_host,
+        settings.freeswitch_port,
+        settings.freeswitch_password,
+        connect_timeout=settings.freeswitch_esl_connect_timeout_seconds,
+        command_timeout=settings.freeswitch_esl_command_timeout_seconds,
+        reconnect_max_delay=settings.freeswitch_esl_reconnect_max_seconds,
+    )
+
+
+def _get_esl_client() -> ESLClient:
+    global _esl_client
+    if _esl_client is None:
+        _esl_client = new_esl_client()
+    return _esl_client
+
+
+async def close() -> None:
+    """Close the persistent ESL connection (called from the FastAPI lifespan)."""
+    global _esl_client
+    if _esl_client is not None:
+        client, _esl_client = _esl_client, None
+        await client.close()
+
+
 async def _originate_esl(
-    destination_number: str, caller_id: str | None = None, playback: str | None = None
+    destination_number: str, caller_id: str | None = None, playback: str | None = None, call_id: str | None = None
 ) -> dict[str, Any]:
-    """Use Event Socket Layer (ESL) to send bgapi originate."""
-    try:
-        import ESL
-    except ImportError:
-        logger.warning("python-ESL not installed; skipping originate (mock)")
-        return {"success": True, "call_id": None, "error": None, "mock": True}
-    host = settings.freeswitch_host
-    port = settings.freeswitch_port
-    password = settings.freeswitch_password
-    con = ESL.ESLconnection(host, str(port), password)
-    if not con.connected():
-        return {"success": False, "call_id": None, "error": "ESL connection failed"}
+    """
+    Send bgapi originate over the shared ESL connection. One UUID is used as the Job-UUID and
+    as origination_uuid, so call_id matches both the BACKGROUND_JOB and the channel events.
+    """
+    call_id = call_id or str(uuid4())
+    variables = f"{{origination_uuid={call_id},origination_caller_id_number={caller_id or 'IoT'}}}"
+    cmd = f"originate {variables}user/{destination_number} &echo"
+    if playback:
+        cmd = f"originate {variables}user/{destination_number} 'playback:{playback}' &echo"
+    tracker = _call_tracker
+    if tracker is not None:
+        tracker.track(call_id, destination_number)
     try:
-        cmd = f"originate {{origination_caller_id_number={caller_id or 'IoT'}}}user/{destination_number} &echo"
-        if playback:
-            cmd = f"originate {{origination_caller_id_number={caller_id or 'IoT'}}}user/{destination_number} 'playback:{playback}' &echo"
-        ev = con.api("bgapi", cmd)
-        uuid = ev.getHeader("Job-UUID") if ev else None
+        uuid = await _get_esl_client().bgapi(cmd, job_uuid=call_id)
         return {"success": True, "call_id": uuid, "error": None}
-    finally:
-        con.disconnect()
+    except (ESLError, OSError, asyncio.TimeoutError) as e:
+        if tracker is not None:
+            tracker.discard(call_id)
+        logger.warning("FreeSWITCH ESL originate failed: %s", e)
+        return {"success": False, "call_id": None, "error": str(e) or "ESL command timed out"}
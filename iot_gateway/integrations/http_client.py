@@ -0,0 +1,104 @@
+"""Application-lifetime pooled HTTP client shared by outbound integrations."""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+
+from iot_gateway import tracing
+from iot_gateway.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+class _HostLimiter:
+    """Per-host concurrency cap; semaphores exist only while a host has requests in flight."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._hosts: dict[str, list] = {}  # host -> [semaphore, users]
+
+    @asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[None]:
+        if self.limit <= 0:
+            yield
+            return
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._hosts.pop(host, None)
+
+
+_host_limiter = _HostLimiter(settings.http_max_connections_per_host)
+
+
+def _http2_enabled() -> bool:
+    if not settings.http_http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.http_read_timeout_seconds,
+            connect=settings.http_connect_timeout_seconds,
+        ),
+    )
+
+
+async def start() -> None:
+    """Create the shared client (called from the FastAPI lifespan)."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared client; created lazily when used outside the application lifespan (e.g. scripts)."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+async def post(url: str, *, json: Any, read_timeout: float | None = None) -> httpx.Response:
+    """POST through the shared pool, honouring the per-host connection cap."""
+    kwargs: dict[str, Any] = {"json": json}
+    if read_timeout is not None:
+        kwargs["timeout"] = httpx.Timeout(read_timeout, connect=settings.http_connect_timeout_seconds)
+    with tracing.span("http.post", url=url) as span:
+        async with _host_limiter.acquire(urlsplit(url).netloc):
+            r = await get_client().post(url, **kwargs)
+        if span is not None:
+            span.set(status=r.status_code)
+        return r
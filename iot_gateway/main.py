@@ -1,35 +1,155 @@
 """FastAPI application and routes."""
+import asyncio
+import base64
+import csv
+import io
+import json
 import logging
-from typing import Annotated
+from contextlib import ExitStack, asynccontextmanager, suppress
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, AsyncIterator, Literal
 
-from fastapi import Depends, Header, HTTPException, Query
-from fastapi.responses import RedirectResponse
+from fastapi import Depends, Header, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from iot_gateway import metrics
 from iot_gateway.config import settings
-from iot_gateway.db import get_db
+from iot_gateway.db import async_session_maker, get_db
+from iot_gateway.integrations import freeswitch, http_client
 from iot_gateway.repositories import device as device_repo
 from iot_gateway.repositories import event_log as event_log_repo
+from iot_gateway.repositories import event_log_rollup as rollup_repo
+from iot_gateway.repositories import outbox as outbox_repo
 from iot_gateway.repositories import rule as rule_repo
 from iot_gateway.schemas import (
     DeviceCreate,
     DeviceResponse,
     DeviceUpdate,
     EventLogResponse,
+    OutboxItemResponse,
     RuleCreate,
     RuleResponse,
     RuleUpdate,
     SimulateIncomingCallRequest,
     WebhookRequest,
 )
+from iot_gateway.serialization import FastJSONResponse
+from iot_gateway.services import event_log_maintenance
 from iot_gateway.services import iot_to_telekom as iot_to_telekom_svc
+from iot_gateway.services import provisioning as provisioning_svc
 from iot_gateway.services import telekom_to_iot as telekom_to_iot_svc
+from iot_gateway.services import warmup
+from iot_gateway.services.admission import Rejected, admission
+from iot_gateway.services.call_scheduler import PRIORITY_LIFE_SAFETY, PRIORITY_NORMAL, call_scheduler, priority_for
+from iot_gateway.services.call_tracker import call_tracker
+from iot_gateway.services.device_cache import device_cache
+from iot_gateway.services.event_log_writer import event_log_writer
+from iot_gateway.services.outbox import outbox_worker
+from iot_gateway.services.rule_index import rule_index
+from iot_gateway.services.speaker_push import speaker_push
+from iot_gateway.services.webhook_dedup import webhook_coalescer
+from iot_gateway.services.webhook_jobs import webhook_jobs
+from iot_gateway.services.webhook_stream import webhook_stream
+from iot_gateway.tracing import TracingMiddleware, tracer
 
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
 logger = logging.getLogger(__name__)
-app = FastAPI(title="IoT Gateway", description="Prototype TAS IoT integration module")
+
+
+async def _reload_rule_index() -> None:
+    try:
+        async with async_session_maker() as session:
+            await rule_index.reload(session)
+    except Exception:
+        logger.exception("Rule index reload failed; webhook falls back to DB lookups until loaded")
+
+
+async def _refresh_rule_index_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.rule_index_refresh_seconds)
+        await _reload_rule_index()
+
+
+async def _flush_suppressed_webhooks() -> None:
+    try:
+        async with async_session_maker() as session:
+            await iot_to_telekom_svc.flush_suppressed(session)
+    except Exception:
+        logger.exception("Writing suppressed webhook counts failed")
+
+
+async def _flush_suppressed_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.webhook_suppressed_flush_seconds)
+        await _flush_suppressed_webhooks()
+
+
+async def _maintain_event_logs_periodically() -> None:
+    while True:
+        try:
+            async with async_session_maker() as session:
+                await event_log_maintenance.run(session)
+        except Exception:
+            logger.exception("Event log maintenance failed")
+        await asyncio.sleep(settings.event_log_maintenance_interval_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await http_client.start()
+    if settings.event_log_async:
+        await event_log_writer.start()
+    if settings.call_scheduler_enabled:
+        await call_scheduler.start()
+    if freeswitch.uses_mock():
+        if settings.freeswitch_mock is None:
+            logger.warning(
+                "Neither FREESWITCH_REST_URL nor FREESWITCH_HOST is set: calls are mocked, not placed. "
+                "Set FREESWITCH_HOST (ESL) or FREESWITCH_REST_URL, or FREESWITCH_MOCK=true to silence this."
+            )
+    elif settings.call_events_enabled and not freeswitch.uses_rest():
+        await call_tracker.start()
+    await webhook_jobs.start()
+    if settings.outbox_enabled:
+        outbox_worker.register("call", iot_to_telekom_svc.retry_call)
+        outbox_worker.register("speaker_notify", telekom_to_iot_svc.retry_notification)
+        await outbox_worker.start()
+    tasks = []
+    if settings.warmup_enabled:
+        # warmup also loads the rule index; /health/ready turns 200 once it has passed
+        tasks.append(asyncio.create_task(warmup.run()))
+    else:
+        await _reload_rule_index()
+        warmup.readiness.ready = True
+    if settings.rule_index_refresh_seconds > 0:
+        tasks.append(asyncio.create_task(_refresh_rule_index_periodically()))
+    tasks.append(asyncio.create_task(_flush_suppressed_periodically()))
+    if settings.event_log_maintenance_interval_seconds > 0:
+        tasks.append(asyncio.create_task(_maintain_event_logs_periodically()))
+    try:
+        yield
+    finally:
+        # stop taking traffic from the load balancer before draining
+        warmup.readiness.ready = False
+        for task in tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await webhook_jobs.stop()
+        await outbox_worker.stop()
+        await call_scheduler.stop()
+        await call_tracker.stop()
+        await _flush_suppressed_webhooks()
+        await telekom_to_iot_svc.drain()
+        await event_log_writer.stop()
+        await freeswitch.close()
+        await http_client.close()
+
+
+app = FastAPI(title="IoT Gateway", description="Prototype TAS IoT integration module", lifespan=lifespan)
 
 DB_UNAVAILABLE_MSG = "Database unavailable. Ensure PostgreSQL is running and DATABASE_URL in .env is correct."
 
@@ -42,11 +162,22 @@ try:
     import asyncpg.exceptions as _asyncpg_exc
     app.add_exception_handler(_asyncpg_exc.ConnectionDoesNotExistError, _db_unavailable_handler)
     app.add_exception_handler(_asyncpg_exc.InvalidPasswordError, _db_unavailable_handler)
-    app.add_exception_handler(_asyncpg_exc.ConnectionFailure, _db_unavailable_handler)
+    app.add_exception_handler(_asyncpg_exc.ConnectionFailureError, _db_unavailable_handler)
     app.add_exception_handler(_asyncpg_exc.TooManyConnectionsError, _db_unavailable_handler)
 except ImportError:
     pass
 
+
+async def _admission_rejected_handler(request, exc: Rejected):
+    detail = "Rate limit exceeded" if exc.status_code == 429 else "Overloaded, retry later"
+    return JSONResponse(
+        status_code=exc.status_code, content={"detail": detail, "reason": exc.reason}, headers=exc.headers
+    )
+
+
+app.add_exception_handler(Rejected, _admission_rejected_handler)
+app.add_middleware(TracingMiddleware)
+
 SessionDep = Annotated[AsyncSession, Depends(get_db)]
 
 
@@ -56,6 +187,58 @@ async def root():
     return RedirectResponse(url="/docs", status_code=302)
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: 200 once startup warmup has passed, 503 with the failing checks until then and during shutdown."""
+    status_code = 200 if warmup.readiness.ready else 503
+    return JSONResponse(status_code=status_code, content=warmup.readiness.to_dict())
+
+
+_EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def _ndjson_chunks(rows: AsyncIterator[Any]) -> AsyncIterator[str]:
+    """Serialize row mappings as NDJSON, yielding ~64 KiB chunks."""
+    buf = io.StringIO()
+    async for row in rows:
+        buf.write(json.dumps(dict(row), default=_json_default))
+        buf.write("\n")
+        if buf.tell() >= _EXPORT_CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+async def _csv_chunks(rows: AsyncIterator[Any], columns: list[str]) -> AsyncIterator[str]:
+    """Serialize row mappings as CSV with a header line; dict/list values are written as JSON."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    async for row in rows:
+        writer.writerow([
+            json.dumps(v) if isinstance(v := row[c], (dict, list)) else _json_default(v) if isinstance(v, datetime) else v
+            for c in columns
+        ])
+        if buf.tell() >= _EXPORT_CHUNK_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
 def _device_to_response(d):
     return DeviceResponse(
         id=d.id,
@@ -74,15 +257,101 @@ def _device_to_response(d):
 @app.get("/devices", response_model=list[DeviceResponse])
 async def list_devices(
     session: SessionDep,
+    response: Response,
     msisdn: str | None = Query(None, description="Filter by MSISDN"),
+    limit: int | None = Query(None, ge=1, le=1000, description="Page size; without it all devices are returned"),
+    after_id: int | None = Query(None, description="X-Next-Cursor from the previous page"),
 ):
-    if msisdn is not None:
+    """Ordered by id. With limit, the X-Next-Cursor header holds after_id for the next page when more rows exist."""
+    if settings.fast_json_responses:
+        rows = await device_repo.list_rows(
+            session, limit=limit + 1 if limit is not None else None, after_id=after_id, msisdn=msisdn
+        )
+        headers = {}
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = str(rows[-1]["id"])
+        return FastJSONResponse(rows, headers=headers)
+    if limit is not None:
+        devices = await device_repo.list_page(session, limit + 1, after_id=after_id, msisdn=msisdn)
+        if len(devices) > limit:
+            devices = devices[:limit]
+            response.headers["X-Next-Cursor"] = str(devices[-1].id)
+    elif msisdn is not None:
         devices = await device_repo.list_by_msisdn(session, msisdn)
     else:
         devices = await device_repo.list_all(session)
     return [_device_to_response(d) for d in devices]
 
 
+async def _export_devices(msisdn: str | None) -> AsyncIterator[str]:
+    async with async_session_maker() as session:
+        async for chunk in _ndjson_chunks(device_repo.stream_rows(session, msisdn=msisdn)):
+            yield chunk
+
+
+@app.get("/devices/export")
+async def export_devices(msisdn: str | None = Query(None, description="Filter by MSISDN")):
+    """Stream all devices (ordered by id) as NDJSON, read through a server-side cursor."""
+    return StreamingResponse(
+        _export_devices(msisdn),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="devices.ndjson"'},
+    )
+
+
+async def _bulk_items(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Rows of a bulk body: NDJSON (application/x-ndjson) is parsed line by line while it
+    streams in; anything else is read as one JSON array, at most BULK_MAX_JSON_BYTES (413
+    beyond that). Unparseable lines yield the error.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        row = 0
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield row, json.loads(line)
+                    except ValueError as e:
+                        yield row, e
+                    row += 1
+        if pending.strip():
+            try:
+                yield row, json.loads(pending)
+            except ValueError as e:
+                yield row, e
+        return
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"JSON array body over {settings.bulk_max_json_bytes} bytes; send NDJSON (application/x-ndjson)",
+    )
+    if int(request.headers.get("content-length") or 0) > settings.bulk_max_json_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.bulk_max_json_bytes:
+            raise too_large
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for row, item in enumerate(data):
+        yield row, item
+
+
+@app.post("/devices/bulk")
+async def bulk_upsert_devices(session: SessionDep, request: Request):
+    """Upsert many devices (JSON array or NDJSON of DeviceCreate); returns counts and per-row errors."""
+    return await provisioning_svc.bulk_upsert_devices(session, _bulk_items(request))
+
+
 @app.post("/devices", response_model=DeviceResponse)
 async def create_device(session: SessionDep, body: DeviceCreate):
     existing = await device_repo.get_by_device_id(session, body.device_id)
@@ -91,6 +360,7 @@ async def create_device(session: SessionDep, body: DeviceCreate):
     data = body.model_dump()
     data["metadata_"] = data.pop("metadata", None)
     device = await device_repo.create(session, **data)
+    device_cache.refresh(device)
     return _device_to_response(device)
 
 
@@ -110,7 +380,9 @@ async def update_device(session: SessionDep, device_id: str, body: DeviceUpdate)
     data = body.model_dump(exclude_unset=True)
     if "metadata" in data:
         data["metadata_"] = data.pop("metadata")
+    device_cache.invalidate(device.device_id, device.msisdn, device.type)
     await device_repo.update(session, device, **data)
+    device_cache.refresh(device)
     return _device_to_response(device)
 
 
@@ -119,18 +391,31 @@ async def delete_device(session: SessionDep, device_id: str):
     device = await device_repo.get_by_device_id(session, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
+    keys = (device.device_id, device.msisdn, device.type)
+    device_cache.invalidate(*keys)
     await device_repo.delete(session, device)
+    # a lookup that ran between the first invalidate and the commit may have cached the row again
+    device_cache.invalidate(*keys)
 
 
 @app.get("/rules", response_model=list[RuleResponse])
 async def list_rules(session: SessionDep):
+    if settings.fast_json_responses:
+        return FastJSONResponse(await rule_repo.list_all_rows(session))
     rules = await rule_repo.list_all(session)
     return [RuleResponse.model_validate(r) for r in rules]
 
 
+@app.post("/rules/bulk")
+async def bulk_create_rules(session: SessionDep, request: Request):
+    """Create many rules (JSON array or NDJSON of RuleCreate); returns counts and per-row errors."""
+    return await provisioning_svc.bulk_create_rules(session, _bulk_items(request))
+
+
 @app.post("/rules", response_model=RuleResponse)
 async def create_rule(session: SessionDep, body: RuleCreate):
     rule = await rule_repo.create(session, **body.model_dump())
+    rule_index.upsert(rule)
     return RuleResponse.model_validate(rule)
 
 
@@ -148,6 +433,7 @@ async def update_rule(session: SessionDep, rule_id: int, body: RuleUpdate):
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     await rule_repo.update(session, rule, **body.model_dump(exclude_unset=True))
+    rule_index.upsert(rule)
     return RuleResponse.model_validate(rule)
 
 
@@ -157,14 +443,224 @@ async def delete_rule(session: SessionDep, rule_id: int):
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     await rule_repo.delete(session, rule)
+    rule_index.remove(rule_id)
+
+
+def _encode_log_cursor(created_at: datetime, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+
+def _decode_log_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, _, id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return datetime.fromisoformat(created_at), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _log_filters(
+    device_id: str | None = Query(None, description="Filter by device_id"),
+    event_kind: str | None = Query(None, description="Filter by event_kind"),
+    result: str | None = Query(None, description="Filter by result"),
+    call_id: str | None = Query(None, description="Filter by call_id"),
+    created_from: datetime | None = Query(None, alias="from", description="created_at >= from"),
+    created_to: datetime | None = Query(None, alias="to", description="created_at < to"),
+) -> dict[str, Any]:
+    return {
+        "device_id": device_id,
+        "event_kind": event_kind,
+        "result": result,
+        "call_id": call_id,
+        "created_from": created_from,
+        "created_to": created_to,
+    }
+
+
+LogFiltersDep = Annotated[dict[str, Any], Depends(_log_filters)]
 
 
 @app.get("/logs", response_model=list[EventLogResponse])
-async def list_logs(session: SessionDep, limit: int = Query(50, ge=1, le=500)):
-    logs = await event_log_repo.list_recent(session, limit=limit)
+async def list_logs(
+    session: SessionDep,
+    response: Response,
+    filters: LogFiltersDep,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+):
+    """Newest first. When more rows exist, the X-Next-Cursor header holds the cursor for the next page."""
+    before = _decode_log_cursor(cursor) if cursor else None
+    if settings.fast_json_responses:
+        rows = await event_log_repo.list_page_rows(session, limit=limit + 1, before=before, **filters)
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = _encode_log_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return FastJSONResponse(rows, headers=headers)
+    logs = await event_log_repo.list_page(session, limit=limit + 1, before=before, **filters)
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = _encode_log_cursor(logs[-1].created_at, logs[-1].id)
     return [EventLogResponse.model_validate(l) for l in logs]
 
 
+_LOG_EXPORT_COLUMNS = [
+    "id", "event_kind", "device_id", "rule_id", "call_id", "target_number", "result", "details", "created_at",
+]
+
+
+async def _export_logs(filters: dict[str, Any], format: str) -> AsyncIterator[str]:
+    # own session: a yield dependency is closed before a streaming body is sent
+    async with async_session_maker() as session:
+        rows = event_log_repo.stream_rows(session, **filters)
+        chunks = _csv_chunks(rows, _LOG_EXPORT_COLUMNS) if format == "csv" else _ndjson_chunks(rows)
+        async for chunk in chunks:
+            yield chunk
+
+
+@app.get("/logs/export")
+async def export_logs(filters: LogFiltersDep, format: Literal["ndjson", "csv"] = Query("ndjson")):
+    """Stream all matching logs (oldest first) as NDJSON or CSV, read through a server-side cursor."""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_logs(filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="event_logs.{format}"'},
+    )
+
+
+@app.get("/logs/stats")
+async def log_stats(
+    session: SessionDep,
+    granularity: Literal["hour", "day"] = Query("hour"),
+    created_from: datetime | None = Query(None, alias="from", description="bucket >= from (default: 24 hours / 30 days ago)"),
+    created_to: datetime | None = Query(None, alias="to", description="bucket < to (default: now)"),
+    group_by: list[Literal["device_id", "event_kind", "result"]] = Query(["event_kind", "result"]),
+    device_id: str | None = Query(None, description="Filter by device_id"),
+    event_kind: str | None = Query(None, description="Filter by event_kind"),
+    result: str | None = Query(None, description="Filter by result"),
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    """Event counts per hour or day from the rollup tables (refreshed by the event-log maintenance task)."""
+    end = created_to or datetime.now(timezone.utc)
+    start = created_from or end - (timedelta(hours=24) if granularity == "hour" else timedelta(days=30))
+    rows = await rollup_repo.query(
+        session,
+        granularity,
+        start,
+        end,
+        group_by=list(group_by),
+        limit=limit,
+        device_id=device_id,
+        event_kind=event_kind,
+        result=result,
+    )
+    return {"granularity": granularity, "from": start, "to": end, "buckets": rows}
+
+
+@app.get("/outbox", response_model=list[OutboxItemResponse])
+async def list_outbox(
+    session: SessionDep,
+    response: Response,
+    status: Literal["pending", "dead"] | None = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    after_id: int | None = Query(None, description="X-Next-Cursor from the previous page"),
+):
+    """Retries waiting in the outbox (pending) and the ones that gave up (dead), by id; X-Next-Cursor holds after_id of the next page."""
+    items = await outbox_repo.list_page(session, limit=limit + 1, status=status, after_id=after_id)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = str(items[-1].id)
+    return [OutboxItemResponse.model_validate(i) for i in items]
+
+
+@app.get("/outbox/stats")
+async def outbox_stats(session: SessionDep):
+    """Outbox items per status, plus this instance's worker counters."""
+    return {"items": await outbox_repo.count_by_status(session), "worker": outbox_worker.stats()}
+
+
+@app.post("/outbox/{item_id}/retry", response_model=OutboxItemResponse)
+async def retry_outbox_item(session: SessionDep, item_id: int):
+    """Make a dead item due again with a fresh attempt count."""
+    item = await outbox_repo.requeue_dead(session, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="No dead outbox item with this id")
+    outbox_worker.wake()
+    return OutboxItemResponse.model_validate(item)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss/reload counters of the in-memory lookup caches and the event-log writer."""
+    return {
+        "rule_index": rule_index.stats(),
+        "device_cache": device_cache.stats(),
+        "event_log_writer": event_log_writer.stats(),
+        "webhook_dedup": webhook_coalescer.stats(),
+        "call_scheduler": call_scheduler.stats(),
+        "webhook_jobs": webhook_jobs.stats(),
+        "call_tracker": call_tracker.stats(),
+        "speaker_notify": telekom_to_iot_svc.stats(),
+        "admission": admission.stats(),
+        "webhook_stream": webhook_stream.stats(),
+        "speaker_push": speaker_push.stats(),
+        "tracing": tracer.stats(),
+    }
+
+
+metrics.StatsMetrics("rule_index", rule_index.stats, frozenset({"hits", "misses", "reloads"}))
+metrics.StatsMetrics("device_cache", device_cache.stats, frozenset({"hits", "negative_hits", "misses", "evictions"}))
+metrics.StatsMetrics(
+    "event_log_writer", event_log_writer.stats, frozenset({"submitted", "written", "batches", "rejected", "failed"})
+)
+metrics.StatsMetrics("webhook_dedup", webhook_coalescer.stats, frozenset({"suppressed"}))
+metrics.StatsMetrics("call_scheduler", call_scheduler.stats, frozenset({"completed", "expired"}))
+metrics.StatsMetrics(
+    "call_tracker",
+    call_tracker.stats,
+    frozenset({"events", "ignored", "expired", "written", "unmatched", "failed"}),
+)
+metrics.StatsMetrics("speaker_notify", telekom_to_iot_svc.stats, frozenset({"opened", "short_circuited"}))
+metrics.StatsMetrics(
+    "outbox", outbox_worker.stats, frozenset({"claimed", "delivered", "retried", "dead", "errors"})
+)
+metrics.StatsMetrics(
+    "admission",
+    admission.stats,
+    frozenset({
+        "admitted",
+        "rejected_key_rate",
+        "rejected_device_rate",
+        "rejected_in_flight",
+        "rejected_db_pool",
+        "rejected_call_queue",
+    }),
+)
+metrics.StatsMetrics(
+    "webhook_stream",
+    webhook_stream.stats,
+    frozenset({"received", "acked", "invalid", "rejected", "failed", "unacked"}),
+)
+metrics.StatsMetrics(
+    "speaker_push", speaker_push.stats, frozenset({"pushed", "acked", "nacked", "ack_timeouts", "replaced"})
+)
+metrics.StatsMetrics("tracing", tracer.stats, frozenset({"traced", "sampled", "slow", "dropped_spans"}))
+metrics.StatsMetrics(
+    "webhook_jobs", webhook_jobs.stats, frozenset({"busy_seconds", "submitted", "completed", "failed", "rejected"})
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Per-stage latency histograms, in-flight gauges and outcome counters in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _respond(content: Any) -> Any:
+    """Return content for FastAPI to encode, or already encoded when FAST_JSON_RESPONSES is on."""
+    return FastJSONResponse(content) if settings.fast_json_responses else content
+
+
 def _check_webhook_api_key(x_api_key: str | None) -> None:
     if not x_api_key or x_api_key != settings.webhook_api_key:
         raise HTTPException(status_code=401, detail="Invalid or missing X-API-Key")
@@ -172,16 +668,18 @@ def _check_webhook_api_key(x_api_key: str | None) -> None:
 
 @app.post("/simulate/incoming-call")
 async def simulate_incoming_call(session: SessionDep, body: SimulateIncomingCallRequest):
-    """Simulate incoming call to to_msisdn; notify registered speaker device."""
-    result = await telekom_to_iot_svc.on_incoming_call(
-        session,
-        to_msisdn=body.to_msisdn,
-        from_cli=body.from_cli,
-        call_id=body.call_id,
-    )
+    """Simulate incoming call to to_msisdn; notify all registered speaker devices."""
+    admission.limit_device(body.to_msisdn)
+    with admission.slot(PRIORITY_NORMAL):
+        result = await telekom_to_iot_svc.on_incoming_call(
+            session,
+            to_msisdn=body.to_msisdn,
+            from_cli=body.from_cli,
+            call_id=body.call_id,
+        )
     if not result.get("notified") and result.get("error") == "no_speaker_for_msisdn":
         raise HTTPException(status_code=404, detail="No speaker device for this MSISDN")
-    return result
+    return _respond(result)
 
 
 @app.post("/webhook")
@@ -189,13 +687,142 @@ async def webhook(
     session: SessionDep,
     body: WebhookRequest,
     x_api_key: Annotated[str | None, Header(alias="X-API-Key")] = None,
+    idempotency_key: Annotated[str | None, Header(alias="Idempotency-Key")] = None,
+    prefer: Annotated[str | None, Header()] = None,
 ):
-    """Receive IoT events (e.g. smoke); require X-API-Key. Triggers rule action (e.g. call)."""
+    """
+    Receive IoT events (e.g. smoke); require X-API-Key. Triggers rule action (e.g. call).
+    In async mode (WEBHOOK_ASYNC or "Prefer: respond-async") answers 202 with a job id; see GET /jobs/{job_id}.
+    Over a rate limit answers 429, when overloaded 503 (both with Retry-After).
+    """
     _check_webhook_api_key(x_api_key)
-    result = await iot_to_telekom_svc.handle_webhook(
-        session, event_type=body.event_type, device_id=body.device_id
-    )
-    return result
+    admission.limit_key(x_api_key)
+    admission.limit_device(body.device_id)
+    idempotency_key = idempotency_key or body.idempotency_key
+    if settings.webhook_async or (prefer and "respond-async" in prefer):
+        job = webhook_jobs.submit(body.event_type, body.device_id, idempotency_key)
+        if job is None:
+            raise HTTPException(status_code=503, detail="Webhook job queue is full", headers={"Retry-After": "1"})
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"},
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+    with admission.slot(priority_for(body.event_type)):
+        result = await iot_to_telekom_svc.handle_webhook(
+            session,
+            event_type=body.event_type,
+            device_id=body.device_id,
+            idempotency_key=idempotency_key,
+        )
+    return _respond(result)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an asynchronous webhook job: queued, running, done (with result) or failed (with error)."""
+    job = webhook_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+
+@app.websocket("/webhook/ws")
+async def webhook_ws(
+    websocket: WebSocket,
+    x_api_key: Annotated[str | None, Header(alias="X-API-Key")] = None,
+    api_key: str | None = None,
+):
+    """
+    Stream of /webhook events over one connection, authenticated once at the handshake by the
+    X-API-Key header (the api_key query parameter only with WEBHOOK_WS_QUERY_KEY). Frames are
+    WebhookRequest objects with an "id"; each is acked with {"id", "result"} or {"id", "error"}
+    when done, possibly out of order.
+    """
+    key = x_api_key or (api_key if settings.webhook_ws_query_key else None)
+    if not key or key != settings.webhook_api_key:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid or missing X-API-Key")
+        return
+    await websocket.accept()
+    await webhook_stream.serve(websocket, key)
+
+
+_RATE_LIMITED_RESULT = {
+    "success": False, "rule_id": None, "target": None, "call_result": None, "calls": [], "error": "rate_limited"
+}
+_OVERLOADED_RESULT = {**_RATE_LIMITED_RESULT, "error": "overloaded"}
+
+
+@app.post("/webhook/batch")
+async def webhook_batch(
+    session: SessionDep,
+    body: list[WebhookRequest],
+    x_api_key: Annotated[str | None, Header(alias="X-API-Key")] = None,
+):
+    """
+    Receive an array of IoT events; returns per-event results in the same order. Requires X-API-Key.
+    Each event takes a token of the key's rate limit; events of devices over their limit get
+    error "rate_limited" instead of being processed. Each event also takes an in-flight slot:
+    life-safety events are admitted through their reserve, and when the others are shed the
+    life-safety ones still run while the rest get error "overloaded".
+    """
+    _check_webhook_api_key(x_api_key)
+    if len(body) > settings.webhook_batch_max_events:
+        raise HTTPException(
+            status_code=413, detail=f"Too many events (max {settings.webhook_batch_max_events})"
+        )
+    admission.limit_key(x_api_key, len(body))
+    # None: over the device's rate limit; else the event's priority
+    priorities = [priority_for(e.event_type) if admission.device_allowed(e.device_id) else None for e in body]
+    life_safety = priorities.count(PRIORITY_LIFE_SAFETY)
+    normal = priorities.count(PRIORITY_NORMAL)
+    with ExitStack() as slots:
+        if life_safety:
+            slots.enter_context(admission.slot(PRIORITY_LIFE_SAFETY, life_safety))
+        if normal:
+            try:
+                slots.enter_context(admission.slot(PRIORITY_NORMAL, normal))
+            except Rejected:
+                if not life_safety:
+                    raise
+                normal = 0
+        admitted = {PRIORITY_LIFE_SAFETY} | ({PRIORITY_NORMAL} if normal else set())
+        events = [
+            (e.event_type, e.device_id, e.idempotency_key) for e, p in zip(body, priorities) if p in admitted
+        ]
+        handled = iter(await iot_to_telekom_svc.handle_webhook_batch(session, events))
+    results = [
+        _RATE_LIMITED_RESULT if p is None else next(handled) if p in admitted else _OVERLOADED_RESULT
+        for p in priorities
+    ]
+    return _respond({"results": results})
+
+
+@app.websocket("/speakers/ws")
+async def speaker_ws(
+    websocket: WebSocket,
+    device_id: str,
+    x_device_token: Annotated[str | None, Header(alias="X-Device-Token")] = None,
+    token: str | None = None,
+):
+    """
+    Push channel of a speaker (SPEAKER_PUSH_ENABLED): incoming-call notifications arrive as
+    {"type": "incoming_call", "id", ...} frames, to be answered with {"type": "ack", "id"}.
+    The token is the hex HMAC-SHA256 of device_id with SPEAKER_PUSH_SECRET.
+    """
+    if not settings.speaker_push_enabled or not speaker_push.authorize(device_id, x_device_token or token):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid device token")
+        return
+    async with async_session_maker() as session:
+        device = await device_cache.get_by_device_id(session, device_id)
+    if device is None or device.type != "speaker":
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Unknown speaker")
+        return
+    if not speaker_push.has_room(device_id):
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many connections")
+        return
+    await websocket.accept()
+    await speaker_push.serve(websocket, device_id)
 
 
 @app.post("/test/notify")
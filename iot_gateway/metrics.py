@@ -0,0 +1,187 @@
+"""Minimal in-process metrics (counters, gauges, histograms) rendered in Prometheus text format."""
+import functools
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+from iot_gateway import tracing
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Registered on creation; subclasses define _samples() or override render()."""
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+
+class StatsMetrics(_Metric):
+    """
+    Numeric values of an existing stats() dict, read at scrape time (no per-request cost).
+    Keys listed in `counters` are exported as counters, the rest as gauges; booleans become 0/1.
+    """
+
+    def __init__(self, prefix: str, fn: Callable[[], dict], counters: frozenset[str] = frozenset()) -> None:
+        super().__init__(f"iot_gateway_{prefix}", f"{prefix} stats")
+        self.fn = fn
+        self.counters = counters
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, value in self.fn().items():
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"{self.name}_{key}"
+            kind = "counter" if key in self.counters else "gauge"
+            if kind == "counter":
+                name += "_total"
+            lines.append(f"# HELP {name} {self.help}: {key}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+STAGE_DURATION = Histogram(
+    "iot_gateway_stage_duration_seconds", "Latency of hot-path stages", ("stage",)
+)
+STAGE_IN_FLIGHT = Gauge("iot_gateway_stage_in_flight", "Stage executions currently running", ("stage",))
+STAGE_OUTCOMES = Counter("iot_gateway_stage_outcomes_total", "Stage executions by outcome", ("stage", "outcome"))
+
+
+class _StageTimer:
+    """Also a span of the traced request, if any (see tracing.py)."""
+
+    __slots__ = ("stage", "outcome", "started", "span")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.outcome = "ok"
+
+    def __enter__(self) -> "_StageTimer":
+        STAGE_IN_FLIGHT.inc(self.stage)
+        self.span = tracing.start_span(self.stage)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        STAGE_DURATION.observe(self.stage, value=time.perf_counter() - self.started)
+        STAGE_IN_FLIGHT.dec(self.stage)
+        STAGE_OUTCOMES.inc(self.stage, "error" if exc_type is not None else self.outcome)
+        if self.span is not None:
+            if self.outcome != "ok":
+                self.span[0].set(outcome=self.outcome)
+            tracing.end_span(self.span, exc_type.__name__ if exc_type is not None else None)
+
+
+def stage(name: str) -> _StageTimer:
+    """Time a block: `with stage("webhook.originate") as t: ...`; set t.outcome to record a non-ok result."""
+    return _StageTimer(name)
+
+
+def timed(name: str):
+    """Decorator form of stage() for async functions."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with _StageTimer(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
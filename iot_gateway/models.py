@@ -1,8 +1,8 @@
-"""SQLAlchemy models for devices, rules, event_logs."""
+"""SQLAlchemy models for devices, rules, event_logs, outbox."""
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import Boolean, DateTime, Integer, String, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -41,11 +41,65 @@ class EventLog(Base):
     __tablename__ = "event_logs"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    event_kind: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    event_kind: Mapped[str] = mapped_column(String(64), nullable=False)
     device_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     rule_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
     call_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     target_number: Mapped[str | None] = mapped_column(String(64), nullable=True)
     result: Mapped[str] = mapped_column(String(32), nullable=False)
     details: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # partition key: the table is range-partitioned by day (scripts/event_logs_partitioning.sql), so it is
+    # part of the primary key there and here; identity lookups (refresh, get) then prune to one partition
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now()
+    )
+
+    # keyset pagination on (created_at, id), optionally narrowed by one filter column
+    __table_args__ = (
+        Index("idx_event_logs_created_id", "created_at", "id"),
+        Index("idx_event_logs_device_created_id", "device_id", "created_at", "id"),
+        Index("idx_event_logs_kind_created_id", "event_kind", "created_at", "id"),
+        Index("idx_event_logs_result_created_id", "result", "created_at", "id"),
+        Index("idx_event_logs_call_id", "call_id", postgresql_where=call_id.isnot(None)),
+    )
+
+
+class _EventLogRollup:
+    """Event counts per bucket, device, event_kind and result; device_id '' means no device."""
+
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    device_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    event_kind: Mapped[str] = mapped_column(String(64), primary_key=True)
+    result: Mapped[str] = mapped_column(String(32), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class EventLogRollupHourly(_EventLogRollup, Base):
+    __tablename__ = "event_log_rollup_hourly"
+
+
+class EventLogRollupDaily(_EventLogRollup, Base):
+    __tablename__ = "event_log_rollup_daily"
+
+
+class OutboxItem(Base):
+    """A failed notification or call waiting for a retry (kind selects the handler)."""
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")  # pending | dead
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index("idx_outbox_due", "next_attempt_at", postgresql_where=status == "pending"),
+        Index("idx_outbox_status_id", "status", "id"),
+    )
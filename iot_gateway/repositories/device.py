@@ -1,20 +1,33 @@
 """Device repository."""
-from sqlalchemy import select
+from typing import AsyncIterator
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from iot_gateway.metrics import timed
 from iot_gateway.models import Device
 
 
+@timed("db.device.get_by_device_id")
 async def get_by_device_id(session: AsyncSession, device_id: str) -> Device | None:
     result = await session.execute(select(Device).where(Device.device_id == device_id))
     return result.scalar_one_or_none()
 
 
-async def get_speaker_by_msisdn(session: AsyncSession, msisdn: str) -> Device | None:
+@timed("db.device.list_by_device_ids")
+async def list_by_device_ids(session: AsyncSession, device_ids: list[str]) -> list[Device]:
+    result = await session.execute(select(Device).where(Device.device_id.in_(device_ids)))
+    return list(result.scalars().all())
+
+
+@timed("db.device.list_speakers_by_msisdn")
+async def list_speakers_by_msisdn(session: AsyncSession, msisdn: str) -> list[Device]:
     result = await session.execute(
-        select(Device).where(Device.msisdn == msisdn, Device.type == "speaker")
+        select(Device).where(Device.msisdn == msisdn, Device.type == "speaker").order_by(Device.id)
     )
-    return result.scalar_one_or_none()
+    return list(result.scalars().all())
 
 
 async def list_by_msisdn(session: AsyncSession, msisdn: str) -> list[Device]:
@@ -27,6 +40,44 @@ async def list_all(session: AsyncSession) -> list[Device]:
     return list(result.scalars().all())
 
 
+async def list_page(
+    session: AsyncSession, limit: int, after_id: int | None = None, msisdn: str | None = None
+) -> list[Device]:
+    """Ordered by id; `after_id` is the id of the last device of the previous page."""
+    stmt = select(Device)
+    if msisdn is not None:
+        stmt = stmt.where(Device.msisdn == msisdn)
+    if after_id is not None:
+        stmt = stmt.where(Device.id > after_id)
+    result = await session.execute(stmt.order_by(Device.id).limit(limit))
+    return list(result.scalars().all())
+
+
+async def list_rows(
+    session: AsyncSession, limit: int | None = None, after_id: int | None = None, msisdn: str | None = None
+) -> list[RowMapping]:
+    """Like list_page (without limit: all devices) as plain row mappings (no ORM objects)."""
+    stmt = select(Device.__table__)
+    if msisdn is not None:
+        stmt = stmt.where(Device.msisdn == msisdn)
+    if after_id is not None:
+        stmt = stmt.where(Device.id > after_id)
+    result = await session.execute(stmt.order_by(Device.id).limit(limit))
+    return list(result.mappings().all())
+
+
+async def stream_rows(
+    session: AsyncSession, msisdn: str | None = None, batch_size: int = 1000
+) -> AsyncIterator[RowMapping]:
+    """All devices ordered by id as plain row mappings (no ORM objects), via a server-side cursor."""
+    stmt = select(Device.__table__)
+    if msisdn is not None:
+        stmt = stmt.where(Device.msisdn == msisdn)
+    result = await session.stream(stmt.order_by(Device.id).execution_options(yield_per=batch_size))
+    async for row in result.mappings():
+        yield row
+
+
 async def create(session: AsyncSession, **kwargs) -> Device:
     device = Device(**kwargs)
     session.add(device)
@@ -35,6 +86,27 @@ async def create(session: AsyncSession, **kwargs) -> Device:
     return device
 
 
+@timed("db.device.upsert_many")
+async def upsert_many(session: AsyncSession, rows: list[dict]) -> list[tuple[str, bool]]:
+    """
+    INSERT ... ON CONFLICT (device_id) DO UPDATE for many rows in one statement and commit.
+    Rows are keyed by column name (`metadata`, not `metadata_`) and must have distinct
+    device_ids. Returns (device_id, inserted) per row.
+    """
+    if not rows:
+        return []
+    stmt = pg_insert(Device).values(rows)
+    updatable = [c for c in rows[0] if c != "device_id"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Device.device_id],
+        set_={**{c: stmt.excluded[c] for c in updatable}, "updated_at": func.now()},
+    ).returning(Device.device_id, literal_column("(xmax = 0)").label("inserted"))
+    result = await session.execute(stmt)
+    returned = [(r.device_id, r.inserted) for r in result]
+    await session.commit()
+    return returned
+
+
 async def update(session: AsyncSession, device: Device, **kwargs) -> Device:
     for k, v in kwargs.items():
         if v is not None and hasattr(device, k):
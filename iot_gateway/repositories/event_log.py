@@ -1,10 +1,17 @@
 """Event log repository."""
-from sqlalchemy import select
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator
+
+from sqlalchemy import Select, func, insert, literal, select, text, tuple_
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from iot_gateway.metrics import timed
 from iot_gateway.models import EventLog
 
 
+@timed("db.event_log.create")
 async def create(
     session: AsyncSession,
     event_kind: str,
@@ -30,8 +37,133 @@ async def create(
     return log
 
 
-async def list_recent(session: AsyncSession, limit: int = 50) -> list[EventLog]:
+@timed("db.event_log.create_many")
+async def create_many(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Insert many log rows in one executemany round trip and commit once (no refresh)."""
+    if not rows:
+        return
+    await session.execute(insert(EventLog), rows)
+    await session.commit()
+
+
+def _apply_filters(
+    stmt: Select,
+    device_id: str | None = None,
+    event_kind: str | None = None,
+    result: str | None = None,
+    call_id: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> Select:
+    if device_id is not None:
+        stmt = stmt.where(EventLog.device_id == device_id)
+    if event_kind is not None:
+        stmt = stmt.where(EventLog.event_kind == event_kind)
+    if result is not None:
+        stmt = stmt.where(EventLog.result == result)
+    if call_id is not None:
+        stmt = stmt.where(EventLog.call_id == call_id)
+    if created_from is not None:
+        stmt = stmt.where(EventLog.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(EventLog.created_at < created_to)
+    return stmt
+
+
+def _page(stmt: Select, limit: int, before: tuple[datetime, int] | None, **filters: Any) -> Select:
+    stmt = _apply_filters(stmt, **filters)
+    if before is not None:
+        created_at, id = before
+        stmt = stmt.where(
+            tuple_(EventLog.created_at, EventLog.id)
+            < tuple_(literal(created_at, EventLog.created_at.type), literal(id, EventLog.id.type))
+        )
+    return stmt.order_by(EventLog.created_at.desc(), EventLog.id.desc()).limit(limit)
+
+
+@timed("db.event_log.list_page")
+async def list_page(
+    session: AsyncSession,
+    limit: int = 50,
+    before: tuple[datetime, int] | None = None,
+    **filters: Any,
+) -> list[EventLog]:
+    """Newest first; `before` is the (created_at, id) of the last row of the previous page."""
+    result = await session.execute(_page(select(EventLog), limit, before, **filters))
+    return list(result.scalars().all())
+
+
+@timed("db.event_log.list_page_rows")
+async def list_page_rows(
+    session: AsyncSession,
+    limit: int = 50,
+    before: tuple[datetime, int] | None = None,
+    **filters: Any,
+) -> list[RowMapping]:
+    """list_page as plain row mappings (no ORM objects)."""
+    result = await session.execute(_page(select(EventLog.__table__), limit, before, **filters))
+    return list(result.mappings().all())
+
+
+async def stream_rows(session: AsyncSession, batch_size: int = 1000, **filters: Any) -> AsyncIterator[RowMapping]:
+    """Oldest first, as plain row mappings read through a server-side cursor."""
+    stmt = _apply_filters(select(EventLog.__table__), **filters)
+    stmt = stmt.order_by(EventLog.created_at, EventLog.id).execution_options(yield_per=batch_size)
+    result = await session.stream(stmt)
+    async for row in result.mappings():
+        yield row
+
+
+async def oldest_created_at(session: AsyncSession) -> datetime | None:
+    return await session.scalar(select(func.min(EventLog.created_at)))
+
+
+async def is_partitioned(session: AsyncSession) -> bool:
+    """True once event_logs has been converted to the partitioned layout (scripts/event_logs_partitioning.sql)."""
+    return bool(await session.scalar(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('event_logs'))")
+    ))
+
+
+async def create_partitions(session: AsyncSession, days: list[date]) -> int:
+    """Create missing daily partitions (no commit); returns how many were created."""
+    created = 0
+    for day in days:
+        if await session.scalar(text("SELECT event_logs_create_partition(:day)"), {"day": day}):
+            created += 1
+    return created
+
+
+async def drop_partitions_before(session: AsyncSession, before: datetime) -> list[str]:
+    """Drop daily partitions that end at or before `before` (no commit); returns their names."""
+    result = await session.execute(text("SELECT event_logs_drop_partitions(:before)"), {"before": before})
+    return list(result.scalars().all())
+
+
+@timed("db.event_log.set_dispositions")
+async def set_dispositions(
+    session: AsyncSession, items: list[tuple[str, dict[str, Any]]], since: datetime
+) -> set[str]:
+    """
+    Merge {"disposition": ...} into details of the rows with these call_ids (created at or after
+    `since`) in one statement and commit; returns the call_ids that matched a row.
+    """
+    if not items:
+        return set()
     result = await session.execute(
-        select(EventLog).order_by(EventLog.created_at.desc()).limit(limit)
+        text(
+            "UPDATE event_logs AS e "
+            "SET details = COALESCE(e.details, '{}'::jsonb) || jsonb_build_object('disposition', v.disposition::jsonb) "
+            "FROM unnest(CAST(:call_ids AS text[]), CAST(:dispositions AS text[])) AS v(call_id, disposition) "
+            "WHERE e.call_id = v.call_id AND e.created_at >= :since "
+            "RETURNING e.call_id"
+        ),
+        {
+            "call_ids": [call_id for call_id, _ in items],
+            "dispositions": [json.dumps(disposition) for _, disposition in items],
+            "since": since,
+        },
     )
-    return list(result.scalars().all())
+    updated = set(result.scalars().all())
+    await session.commit()
+    return updated
@@ -0,0 +1,96 @@
+"""Event log rollup repository: hourly/daily counts per device, event_kind and result."""
+from datetime import datetime
+from typing import Any, Literal
+
+from sqlalchemy import delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.models import EventLog, EventLogRollupDaily, EventLogRollupHourly
+
+Granularity = Literal["hour", "day"]
+GROUP_COLUMNS = ("device_id", "event_kind", "result")
+
+_TABLES = {"hour": EventLogRollupHourly, "day": EventLogRollupDaily}
+
+
+def _utc_trunc(field: str, column):
+    # truncate in UTC regardless of the session time zone; constants inline so GROUP BY matches SELECT
+    utc = literal_column("'UTC'")
+    return func.timezone(utc, func.date_trunc(literal_column(f"'{field}'"), func.timezone(utc, column)))
+
+
+def _upsert_counts(model, select_stmt):
+    stmt = pg_insert(model).from_select(["bucket", "device_id", "event_kind", "result", "count"], select_stmt)
+    return stmt.on_conflict_do_update(
+        index_elements=["bucket", "device_id", "event_kind", "result"],
+        set_={"count": stmt.excluded["count"]},
+    )
+
+
+async def latest_bucket(session: AsyncSession, granularity: Granularity) -> datetime | None:
+    model = _TABLES[granularity]
+    return await session.scalar(select(func.max(model.bucket)))
+
+
+async def refresh_hourly(session: AsyncSession, start: datetime, end: datetime) -> None:
+    """Recount raw logs into hourly buckets for start <= created_at < end (no commit)."""
+    bucket = _utc_trunc("hour", EventLog.created_at).label("bucket")
+    device_id = func.coalesce(EventLog.device_id, literal_column("''"))
+    counts = (
+        select(bucket, device_id, EventLog.event_kind, EventLog.result, func.count())
+        .where(EventLog.created_at >= start, EventLog.created_at < end)
+        .group_by(bucket, device_id, EventLog.event_kind, EventLog.result)
+    )
+    await session.execute(_upsert_counts(EventLogRollupHourly, counts))
+
+
+async def refresh_daily(session: AsyncSession, start: datetime, end: datetime) -> None:
+    """Re-sum hourly buckets into daily buckets for start <= bucket < end; start should be a UTC midnight (no commit)."""
+    h = EventLogRollupHourly
+    bucket = _utc_trunc("day", h.bucket).label("bucket")
+    counts = (
+        select(bucket, h.device_id, h.event_kind, h.result, func.sum(h.count))
+        .where(h.bucket >= start, h.bucket < end)
+        .group_by(bucket, h.device_id, h.event_kind, h.result)
+    )
+    await session.execute(_upsert_counts(EventLogRollupDaily, counts))
+
+
+async def delete_before(session: AsyncSession, granularity: Granularity, before: datetime) -> int:
+    model = _TABLES[granularity]
+    result = await session.execute(delete(model).where(model.bucket < before))
+    return result.rowcount
+
+
+async def query(
+    session: AsyncSession,
+    granularity: Granularity,
+    start: datetime,
+    end: datetime,
+    group_by: list[str],
+    limit: int,
+    device_id: str | None = None,
+    event_kind: str | None = None,
+    result: str | None = None,
+) -> list[dict[str, Any]]:
+    """Counts per bucket (oldest first), summed over the dimensions not in group_by."""
+    model = _TABLES[granularity]
+    dims = [getattr(model, name) for name in GROUP_COLUMNS if name in group_by]
+    stmt = select(model.bucket, *dims, func.sum(model.count).label("count")).where(
+        model.bucket >= start, model.bucket < end
+    )
+    if device_id is not None:
+        stmt = stmt.where(model.device_id == device_id)
+    if event_kind is not None:
+        stmt = stmt.where(model.event_kind == event_kind)
+    if result is not None:
+        stmt = stmt.where(model.result == result)
+    stmt = stmt.group_by(model.bucket, *dims).order_by(model.bucket, *dims).limit(limit)
+    buckets = []
+    for row in (await session.execute(stmt)).mappings().all():
+        item = {**row, "count": int(row["count"])}
+        if "device_id" in item:
+            item["device_id"] = item["device_id"] or None
+        buckets.append(item)
+    return buckets
@@ -0,0 +1,102 @@
+"""Outbox repository: retry items claimed by concurrent workers with FOR UPDATE SKIP LOCKED."""
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.metrics import timed
+from iot_gateway.models import OutboxItem
+
+
+@timed("db.outbox.enqueue_many")
+async def enqueue_many(session: AsyncSession, items: list[dict[str, Any]]) -> None:
+    """Insert {"kind", "payload", "next_attempt_at"} items and commit."""
+    if not items:
+        return
+    await session.execute(insert(OutboxItem), items)
+    await session.commit()
+
+
+@timed("db.outbox.claim_due")
+async def claim_due(session: AsyncSession, limit: int, lease: timedelta) -> list[OutboxItem]:
+    """
+    Take up to `limit` due pending items and commit. Rows locked by another claimer are
+    skipped; a claim counts the attempt and moves next_attempt_at forward by `lease`, so an
+    item is claimed again only if its claimer did not report back in time.
+    """
+    due = (
+        select(OutboxItem.id)
+        .where(OutboxItem.status == "pending", OutboxItem.next_attempt_at <= func.now())
+        .order_by(OutboxItem.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        update(OutboxItem)
+        .where(OutboxItem.id.in_(due.scalar_subquery()))
+        .values(attempts=OutboxItem.attempts + 1, next_attempt_at=func.now() + lease, updated_at=func.now())
+        .returning(OutboxItem)
+        .execution_options(synchronize_session=False)
+    )
+    items = list(result.scalars().all())
+    await session.commit()
+    return items
+
+
+@timed("db.outbox.complete")
+async def complete(session: AsyncSession, item_id: int) -> None:
+    await session.execute(delete(OutboxItem).where(OutboxItem.id == item_id))
+    await session.commit()
+
+
+@timed("db.outbox.reschedule")
+async def reschedule(session: AsyncSession, item_id: int, next_attempt_at: datetime, error: str | None) -> None:
+    await session.execute(
+        update(OutboxItem)
+        .where(OutboxItem.id == item_id)
+        .values(next_attempt_at=next_attempt_at, last_error=error, updated_at=func.now())
+    )
+    await session.commit()
+
+
+@timed("db.outbox.mark_dead")
+async def mark_dead(session: AsyncSession, item_id: int, error: str | None) -> None:
+    await session.execute(
+        update(OutboxItem)
+        .where(OutboxItem.id == item_id)
+        .values(status="dead", last_error=error, updated_at=func.now())
+    )
+    await session.commit()
+
+
+async def list_page(
+    session: AsyncSession, limit: int, status: str | None = None, after_id: int | None = None
+) -> list[OutboxItem]:
+    """Ordered by id; `after_id` is the id of the last item of the previous page."""
+    stmt = select(OutboxItem)
+    if status is not None:
+        stmt = stmt.where(OutboxItem.status == status)
+    if after_id is not None:
+        stmt = stmt.where(OutboxItem.id > after_id)
+    result = await session.execute(stmt.order_by(OutboxItem.id).limit(limit))
+    return list(result.scalars().all())
+
+
+async def requeue_dead(session: AsyncSession, item_id: int) -> OutboxItem | None:
+    """Make a dead item due now with a fresh attempt count; None if there is no such dead item."""
+    result = await session.execute(
+        update(OutboxItem)
+        .where(OutboxItem.id == item_id, OutboxItem.status == "dead")
+        .values(status="pending", attempts=0, next_attempt_at=func.now(), updated_at=func.now())
+        .returning(OutboxItem)
+        .execution_options(synchronize_session=False)
+    )
+    item = result.scalar_one_or_none()
+    await session.commit()
+    return item
+
+
+async def count_by_status(session: AsyncSession) -> dict[str, int]:
+    result = await session.execute(select(OutboxItem.status, func.count()).group_by(OutboxItem.status))
+    return {status: count for status, count in result.all()}
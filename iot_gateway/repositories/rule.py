@@ -1,7 +1,9 @@
 """Rule repository."""
-from sqlalchemy import select
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.engine import Row, RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from iot_gateway.metrics import timed
 from iot_gateway.models import Rule
 
 
@@ -10,15 +12,43 @@ async def get_by_id(session: AsyncSession, id: int) -> Rule | None:
     return result.scalar_one_or_none()
 
 
-async def get_by_event_and_device(session: AsyncSession, event_type: str, device_id: str) -> Rule | None:
+@timed("db.rule.list_by_event_and_device")
+async def list_by_event_and_device(session: AsyncSession, event_type: str, device_id: str) -> list[Rule]:
+    """All active rules for event_type+device_id (one event may call several targets)."""
     result = await session.execute(
-        select(Rule).where(
+        select(Rule)
+        .where(
             Rule.event_type == event_type,
             Rule.device_id == device_id,
             Rule.active == True,
         )
+        .order_by(Rule.id)
     )
-    return result.scalar_one_or_none()
+    return list(result.scalars().all())
+
+
+@timed("db.rule.list_many_by_event_and_device")
+async def list_many_by_event_and_device(
+    session: AsyncSession, pairs: set[tuple[str, str]]
+) -> dict[tuple[str, str], list[Rule]]:
+    """Active rules per (event_type, device_id) pair, for many pairs in one query."""
+    if not pairs:
+        return {}
+    result = await session.execute(
+        select(Rule)
+        .where(tuple_(Rule.event_type, Rule.device_id).in_(list(pairs)), Rule.active == True)
+        .order_by(Rule.id)
+    )
+    rules: dict[tuple[str, str], list[Rule]] = {}
+    for r in result.scalars().all():
+        rules.setdefault((r.event_type, r.device_id), []).append(r)
+    return rules
+
+
+@timed("db.rule.list_active")
+async def list_active(session: AsyncSession) -> list[Rule]:
+    result = await session.execute(select(Rule).where(Rule.active == True).order_by(Rule.id))
+    return list(result.scalars().all())
 
 
 async def list_all(session: AsyncSession) -> list[Rule]:
@@ -26,6 +56,12 @@ async def list_all(session: AsyncSession) -> list[Rule]:
     return list(result.scalars().all())
 
 
+async def list_all_rows(session: AsyncSession) -> list[RowMapping]:
+    """list_all as plain row mappings (no ORM objects)."""
+    result = await session.execute(select(Rule.__table__).order_by(Rule.id))
+    return list(result.mappings().all())
+
+
 async def create(session: AsyncSession, **kwargs) -> Rule:
     rule = Rule(**kwargs)
     session.add(rule)
@@ -34,6 +70,16 @@ async def create(session: AsyncSession, **kwargs) -> Rule:
     return rule
 
 
+async def create_many(session: AsyncSession, rows: list[dict]) -> list[Row]:
+    """Insert many rules in one statement and commit; returns the created rows (all columns)."""
+    if not rows:
+        return []
+    result = await session.execute(insert(Rule).values(rows).returning(*Rule.__table__.columns))
+    created = list(result)
+    await session.commit()
+    return created
+
+
 async def update(session: AsyncSession, rule: Rule, **kwargs) -> Rule:
     for k, v in kwargs.items():
         if v is not None and hasattr(rule, k):
@@ -5,21 +5,22 @@ from typing import Any
 from pydantic import BaseModel, Field
 
 
+# max_length values follow the VARCHAR sizes in scripts/init_db.sql
 class DeviceCreate(BaseModel):
-    device_id: str
+    device_id: str = Field(..., max_length=255)
     type: str = Field(..., pattern="^(speaker|sensor_smoke)$")
-    msisdn: str | None = None
-    subscriber_id: str | None = None
-    vendor: str | None = None
-    endpoint: str | None = None
+    msisdn: str | None = Field(None, max_length=32)
+    subscriber_id: str | None = Field(None, max_length=255)
+    vendor: str | None = Field(None, max_length=128)
+    endpoint: str | None = Field(None, max_length=512)
     metadata: dict[str, Any] | None = None
 
 
 class DeviceUpdate(BaseModel):
-    msisdn: str | None = None
-    subscriber_id: str | None = None
-    vendor: str | None = None
-    endpoint: str | None = None
+    msisdn: str | None = Field(None, max_length=32)
+    subscriber_id: str | None = Field(None, max_length=255)
+    vendor: str | None = Field(None, max_length=128)
+    endpoint: str | None = Field(None, max_length=512)
     metadata: dict[str, Any] | None = None
 
 
@@ -39,16 +40,16 @@ class DeviceResponse(BaseModel):
 
 
 class RuleCreate(BaseModel):
-    event_type: str
-    device_id: str
-    action_type: str = "call"
-    target: str
+    event_type: str = Field(..., max_length=64)
+    device_id: str = Field(..., max_length=255)
+    action_type: str = Field("call", max_length=64)
+    target: str = Field(..., max_length=64)
     active: bool = True
 
 
 class RuleUpdate(BaseModel):
-    action_type: str | None = None
-    target: str | None = None
+    action_type: str | None = Field(None, max_length=64)
+    target: str | None = Field(None, max_length=64)
     active: bool | None = None
 
 
@@ -79,6 +80,20 @@ class EventLogResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class OutboxItemResponse(BaseModel):
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: str | None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class SimulateIncomingCallRequest(BaseModel):
     to_msisdn: str
     from_cli: str
@@ -90,3 +105,8 @@ class WebhookRequest(BaseModel):
     device_id: str
     timestamp: str | None = None
     payload: dict[str, Any] | None = None
+    idempotency_key: str | None = None  # or the Idempotency-Key header on /webhook
+
+
+class WebhookStreamMessage(WebhookRequest):
+    id: str | int  # echoed in the ack
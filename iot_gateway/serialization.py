@@ -0,0 +1,46 @@
+"""Fast JSON responses: plain dicts and row mappings straight to bytes, with orjson when it is installed."""
+import json
+from datetime import datetime, timedelta
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder gives the same output, only slower
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z if orjson is not None else 0
+
+
+def _default(value: Any) -> Any:
+    # orjson calls this only for types it does not know (e.g. RowMapping, Decimal)
+    if hasattr(value, "keys"):
+        return dict(value)
+    return str(value)
+
+
+def _stdlib_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # like pydantic and orjson OPT_UTC_Z
+        return text[:-6] + "Z" if value.utcoffset() == timedelta(0) else text
+    return _default(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode like FastAPI's JSON responses (compact, UTC datetimes with "Z"), without validation."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content, default=_stdlib_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode()
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips response_model validation and jsonable_encoder."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
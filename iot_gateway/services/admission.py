@@ -0,0 +1,168 @@
+"""Admission control for inbound events: per-key and per-device rate limits, in-flight cap, load shedding."""
+import math
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from iot_gateway.config import settings
+from iot_gateway.db import engine
+from iot_gateway.services.call_scheduler import PRIORITY_LIFE_SAFETY, TokenBucket, call_scheduler
+
+
+class Rejected(Exception):
+    """The request is not admitted; answered with `status_code` and a Retry-After header."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class _Buckets:
+    """Token buckets by key, at most `max_keys` (least recently used dropped first, which refills it)."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def take(self, key: str, n: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(n)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Checks run in O(1) per request, cheapest first: the rate limits (429), then overload (503).
+    Overload means the in-flight cap is reached, or the share of DB pool connections in use or
+    the call scheduler queue is past its threshold. Life-safety events (call_priority_event_types)
+    are not shed on pool or queue pressure and get `life_safety_reserve` in-flight slots of their own,
+    so a flood of ordinary traffic cannot keep alarms out; the rate limits apply to them too.
+    """
+
+    def __init__(
+        self,
+        key_rate: float,
+        key_burst: float,
+        device_rate: float,
+        device_burst: float,
+        max_keys: int,
+        max_in_flight: int,
+        life_safety_reserve: int,
+        shed_pool_utilization: float,
+        shed_call_queue_depth: int,
+        retry_after: float,
+        pool_utilization: Callable[[], float],
+        call_queue_depth: Callable[[], int],
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.life_safety_reserve = life_safety_reserve
+        self.shed_pool_utilization = shed_pool_utilization
+        self.shed_call_queue_depth = shed_call_queue_depth
+        self.retry_after = retry_after
+        self._keys = _Buckets(key_rate, key_burst, max_keys)
+        self._devices = _Buckets(device_rate, device_burst, max_keys)
+        self._pool_utilization = pool_utilization
+        self._call_queue_depth = call_queue_depth
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: dict[str, int] = dict.fromkeys(
+            ("key_rate", "device_rate", "in_flight", "db_pool", "call_queue"), 0
+        )
+
+    def limit_key(self, api_key: str, n: int = 1) -> None:
+        """Take `n` tokens from the caller's bucket or raise Rejected (429)."""
+        self._limit(self._keys, "key_rate", api_key, n)
+
+    def limit_device(self, device_id: str) -> None:
+        """Take a token from the device's bucket or raise Rejected (429)."""
+        self._limit(self._devices, "device_rate", device_id, 1)
+
+    def device_allowed(self, device_id: str) -> bool:
+        """limit_device for batches: counts the rejection but does not raise."""
+        if self._devices.take(device_id) > 0:
+            self.rejected["device_rate"] += 1
+            return False
+        return True
+
+    @contextmanager
+    def slot(self, priority: int, n: int = 1) -> Iterator[None]:
+        """
+        Hold `n` in-flight slots (one per event of a batch) for the duration of the block or
+        raise Rejected (503). A batch larger than the whole cap is charged the cap, so it can
+        still run on an idle instance.
+        """
+        life_safety = priority == PRIORITY_LIFE_SAFETY
+        cap = self.max_in_flight + (self.life_safety_reserve if life_safety else 0)
+        if self.max_in_flight > 0:
+            n = min(n, self.max_in_flight)
+            if self.in_flight + n > cap:
+                self._reject("in_flight", 503, self.retry_after)
+        if not life_safety:
+            if self.shed_pool_utilization > 0 and self._pool_utilization() >= self.shed_pool_utilization:
+                self._reject("db_pool", 503, self.retry_after)
+            if self.shed_call_queue_depth > 0 and self._call_queue_depth() >= self.shed_call_queue_depth:
+                self._reject("call_queue", 503, self.retry_after)
+        self.in_flight += n
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= n
+
+    def _limit(self, buckets: _Buckets, reason: str, key: str, n: int) -> None:
+        wait = buckets.take(key, n)
+        if wait > 0:
+            self._reject(reason, 429, wait)
+
+    def _reject(self, reason: str, status_code: int, retry_after: float) -> None:
+        self.rejected[reason] += 1
+        raise Rejected(status_code, reason, retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            **{f"rejected_{reason}": count for reason, count in self.rejected.items()},
+            "key_buckets": len(self._keys),
+            "device_buckets": len(self._devices),
+            "db_pool_utilization": round(self._pool_utilization(), 3),
+        }
+
+
+def _db_pool_utilization() -> float:
+    capacity = settings.db_pool_size + max(settings.db_max_overflow, 0)
+    return engine.pool.checkedout() / capacity if capacity > 0 else 0.0
+
+
+admission = AdmissionController(
+    key_rate=settings.admission_key_rate,
+    key_burst=settings.admission_key_burst,
+    device_rate=settings.admission_device_rate,
+    device_burst=settings.admission_device_burst,
+    max_keys=settings.admission_max_keys,
+    max_in_flight=settings.admission_max_in_flight,
+    life_safety_reserve=settings.admission_life_safety_reserve,
+    shed_pool_utilization=settings.admission_shed_pool_utilization,
+    shed_call_queue_depth=settings.admission_shed_call_queue_depth,
+    retry_after=settings.admission_retry_after_seconds,
+    pool_utilization=_db_pool_utilization,
+    call_queue_depth=lambda: call_scheduler.queue_depth,
+)
@@ -0,0 +1,267 @@
+"""Outbound call scheduler: CPS limits, per-target limits, priorities and bounded concurrency."""
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from iot_gateway.config import settings
+from iot_gateway.integrations import freeswitch
+from iot_gateway.tracing import Span, leaf_span
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LIFE_SAFETY = 0
+PRIORITY_NORMAL = 1
+
+
+class TokenBucket:
+    """Classic token bucket; take() returns 0 when the tokens were taken, else seconds until they are available."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def take(self, n: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        n = min(n, self.capacity)  # more than a full bucket could never be granted
+        self._refill()
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / self.rate
+
+    def wait_time(self, n: float = 1.0) -> float:
+        """Seconds until take(n) would succeed, without taking anything."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(n, self.capacity) - self.tokens) / self.rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+
+class _Job:
+    __slots__ = ("target", "kwargs", "future", "enqueued_at", "started", "dropped", "context", "wait_span")
+
+    def __init__(self, target: str, kwargs: dict[str, Any], priority: int) -> None:
+        self.target = target
+        self.kwargs = kwargs
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.started = False  # handed to freeswitch.originate
+        self.dropped = False  # the caller gave up while it was queued; never started
+        # the caller's context (trace span, ...), which the originate runs in
+        self.context = contextvars.copy_context()
+        self.wait_span: Span | None = leaf_span("scheduler.wait", priority=priority)
+
+    def end_wait(self, error: str | None = None) -> None:
+        if self.wait_span is not None:
+            self.wait_span.finish(error)
+            self.wait_span = None
+
+
+def _timed_out(started: bool) -> dict[str, Any]:
+    if started:
+        # the originate may still go through; retrying could dial twice
+        return {"success": False, "call_id": None, "error": "timeout", "outcome_unknown": True}
+    return {"success": False, "call_id": None, "error": "queue_timeout"}
+
+
+def priority_for(event_type: str | None) -> int:
+    if event_type and event_type in settings.call_priority_event_types:
+        return PRIORITY_LIFE_SAFETY
+    return PRIORITY_NORMAL
+
+
+class CallScheduler:
+    """
+    Jobs wait in a priority queue (life-safety first, FIFO within a priority) and are
+    dispatched by a fixed pool of workers, so at most `concurrency` originates run at once.
+    A job whose target has no per-target token is parked and re-queued when one is due,
+    so one busy target does not block workers. The global CPS token is waited for before a
+    job is taken: a worker holds no job while it waits, so a life-safety call queued during
+    the wait is the next one dispatched. The originate runs in the caller's context, so it
+    is traced under the caller's request, after a "scheduler.wait" span for the time queued.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        global_cps: float,
+        global_burst: float,
+        target_cps: float,
+        target_burst: float,
+        max_targets: int = 10000,
+    ) -> None:
+        self.concurrency = concurrency
+        self.target_cps = target_cps
+        self.target_burst = target_burst
+        self.max_targets = max_targets
+        self._global = TokenBucket(global_cps, global_burst)
+        self._targets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._queue: asyncio.PriorityQueue | None = None
+        self._dispatch = asyncio.Lock()  # one worker at a time picks the next job
+        self._workers: list[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._parked = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.expired = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def queue_depth(self) -> int:
+        """Originates waiting for a worker or a per-target token."""
+        return (self._queue.qsize() if self._queue is not None else 0) + self._parked
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        for task in workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        # fail whatever is still queued so callers do not hang
+        while self._queue is not None and not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            job.end_wait("scheduler stopped")
+            if not job.future.done():
+                job.future.set_result({"success": False, "call_id": None, "error": "scheduler stopped"})
+
+    async def originate(
+        self, target: str, priority: int = PRIORITY_NORMAL, timeout: float | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        """
+        Queue an originate and wait up to `timeout` for its result; runs it directly when the
+        scheduler is not started. A job still queued at the timeout is dropped and never placed
+        (error "queue_timeout"); one already sent may still be placed (error "timeout" with
+        outcome_unknown=True).
+        """
+        if not self._workers:
+            try:
+                return await asyncio.wait_for(freeswitch.originate(target, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                return _timed_out(started=True)
+        job = _Job(target, kwargs, priority)
+        self._queue.put_nowait((priority, next(self._seq), job))
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            if not job.started:
+                job.dropped = True
+                job.end_wait("queue_timeout")
+                self.expired += 1
+            return _timed_out(job.started)
+
+    def _target_bucket(self, target: str) -> TokenBucket:
+        bucket = self._targets.get(target)
+        if bucket is None:
+            bucket = self._targets[target] = TokenBucket(self.target_cps, self.target_burst)
+            if len(self._targets) > self.max_targets:
+                self._targets.popitem(last=False)
+        else:
+            self._targets.move_to_end(target)
+        return bucket
+
+    def _requeue(self, item: tuple) -> None:
+        self._parked -= 1
+        if self._queue is not None and self._workers:
+            self._queue.put_nowait(item)
+        elif not item[2].future.done():
+            item[2].end_wait("scheduler stopped")
+            item[2].future.set_result({"success": False, "call_id": None, "error": "scheduler stopped"})
+
+    async def _next(self) -> _Job:
+        """The highest-priority job that may run now; takes its global and per-target tokens."""
+        loop = asyncio.get_running_loop()
+        async with self._dispatch:
+            while True:
+                item = await self._queue.get()
+                job: _Job = item[2]
+                if job.dropped:
+                    continue
+                wait = self._global.wait_time()
+                if wait > 0:
+                    # put it back and look again afterwards: the queue may hold a more urgent job by then
+                    self._queue.put_nowait(item)
+                    await asyncio.sleep(wait)
+                    continue
+                delay = self._target_bucket(job.target).take()
+                if delay > 0:
+                    self._parked += 1
+                    loop.call_later(delay, self._requeue, item)
+                    continue
+                self._global.take()
+                job.started = True
+                job.end_wait()
+                return job
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._next()
+            try:
+                result = await self._run(job)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.set_result({"success": False, "call_id": None, "error": "scheduler stopped"})
+                raise
+            self.completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def _run(self, job: _Job) -> dict[str, Any]:
+        waited = time.monotonic() - job.enqueued_at
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.in_flight += 1
+        try:
+            return await asyncio.create_task(freeswitch.originate(job.target, **job.kwargs), context=job.context)
+        except Exception as e:
+            logger.exception("Scheduled originate to %s failed", job.target)
+            return {"success": False, "call_id": None, "error": str(e)}
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "expired": self.expired,
+            "wait_seconds_avg": self.wait_seconds_total / self.completed if self.completed else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+call_scheduler = CallScheduler(
+    concurrency=settings.call_scheduler_concurrency,
+    global_cps=settings.call_scheduler_global_cps,
+    global_burst=settings.call_scheduler_global_burst,
+    target_cps=settings.call_scheduler_target_cps,
+    target_burst=settings.call_scheduler_target_burst,
+)
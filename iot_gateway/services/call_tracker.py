@@ -0,0 +1,243 @@
+"""Call state tracking from the FreeSWITCH event stream; final dispositions are written to event_logs."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker
+from iot_gateway.integrations import freeswitch
+from iot_gateway.integrations.esl import ESLClient, ESLError
+from iot_gateway.metrics import Counter
+from iot_gateway.repositories import event_log as event_log_repo
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ("BACKGROUND_JOB", "CHANNEL_ANSWER", "CHANNEL_HANGUP_COMPLETE")
+
+CALL_DISPOSITIONS = Counter("iot_gateway_call_dispositions_total", "Final call dispositions", ("state",))
+
+# (call_id, disposition) pairs -> call_ids whose event_logs row was updated
+DispositionWriter = Callable[[list[tuple[str, dict[str, Any]]], datetime], Awaitable[set[str]]]
+
+
+async def _write_dispositions(items: list[tuple[str, dict[str, Any]]], since: datetime) -> set[str]:
+    async with async_session_maker() as session:
+        return await event_log_repo.set_dispositions(session, items, since)
+
+
+class LiveCall:
+    __slots__ = ("destination", "started_at", "expires_at", "answered_at")
+
+    def __init__(self, destination: str, ttl: float) -> None:
+        self.destination = destination
+        self.started_at = datetime.now(timezone.utc)
+        self.expires_at = time.monotonic() + ttl
+        self.answered_at: str | None = None
+
+
+class CallTracker:
+    """
+    Live calls keyed by call UUID (Job-UUID = origination_uuid, see freeswitch._originate_esl).
+    Events arrive on their own persistent ESL connection; the handler only does dict work,
+    and final dispositions are merged into event_logs.details in batches by a flush task.
+    Events for channels that were not originated here are ignored. A row that is not in
+    event_logs yet (its log may still be queued) is retried on the next few flushes.
+    """
+
+    MAX_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        max_calls: int,
+        ttl: float,
+        batch_size: int,
+        flush_interval: float,
+        writer: DispositionWriter = _write_dispositions,
+    ) -> None:
+        self.max_calls = max_calls
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self._calls: OrderedDict[str, LiveCall] = OrderedDict()
+        # call_id -> (disposition, call start, attempts)
+        self._pending: dict[str, tuple[dict[str, Any], datetime, int]] = {}
+        self._wake = asyncio.Event()
+        self._client: ESLClient | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.events = 0
+        self.ignored = 0
+        self.expired = 0
+        self.written = 0
+        self.unmatched = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, client: ESLClient | None = None) -> None:
+        """Subscribe on a dedicated ESL connection and start flushing; originates are tracked from now on."""
+        if self._tasks:
+            return
+        self._client = client or freeswitch.new_esl_client()
+        self._client.add_event_handler(self.on_event)
+        self._tasks = [asyncio.create_task(self._supervise()), asyncio.create_task(self._flush_loop())]
+        freeswitch.set_call_tracker(self)
+
+    async def stop(self) -> None:
+        freeswitch.set_call_tracker(None)
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        await self.flush()
+
+    def track(self, call_id: str, destination: str) -> None:
+        self._calls[call_id] = LiveCall(destination, self.ttl)
+        while len(self._calls) > self.max_calls:
+            self._calls.popitem(last=False)
+            self.expired += 1
+
+    def discard(self, call_id: str) -> None:
+        self._calls.pop(call_id, None)
+
+    def on_event(self, event: dict[str, str]) -> None:
+        self.events += 1
+        name = event.get("Event-Name")
+        if name == "BACKGROUND_JOB":
+            call_id = event.get("Job-UUID")
+        else:
+            call_id = event.get("Unique-ID")
+        call = self._calls.get(call_id) if call_id else None
+        if call is None:
+            self.ignored += 1
+            return
+        if name == "CHANNEL_ANSWER":
+            call.answered_at = _event_time(event)
+        elif name == "CHANNEL_HANGUP_COMPLETE":
+            self._finish(call_id, call, {
+                "state": "answered" if call.answered_at else "not_answered",
+                "hangup_cause": event.get("Hangup-Cause"),
+                "answered_at": call.answered_at,
+                "ended_at": _event_time(event),
+                "billsec": _int(event.get("variable_billsec")),
+            })
+        elif name == "BACKGROUND_JOB":
+            reply = event.get("_body", "").strip()
+            if reply.startswith("-ERR"):
+                # originate failed before a channel was answered; a later hangup finds no entry
+                self._finish(call_id, call, {
+                    "state": "failed",
+                    "hangup_cause": reply[4:].strip() or None,
+                    "answered_at": None,
+                    "ended_at": _event_time(event),
+                    "billsec": 0,
+                })
+
+    def _finish(self, call_id: str, call: LiveCall, disposition: dict[str, Any]) -> None:
+        del self._calls[call_id]
+        CALL_DISPOSITIONS.inc(disposition["state"])
+        self._pending[call_id] = (disposition, call.started_at, 0)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        """Write pending dispositions in batches; rows not found yet are kept for a later flush."""
+        self._expire()
+        while self._pending:
+            batch = list(self._pending.items())[: self.batch_size]
+            for call_id, _ in batch:
+                del self._pending[call_id]
+            # bounds the update to recent partitions; the margin covers app/DB clock skew
+            since = min(started for _, (_, started, _) in batch) - timedelta(hours=1)
+            try:
+                updated = await self.writer([(call_id, d) for call_id, (d, _, _) in batch], since)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Writing %d call dispositions failed", len(batch))
+                return
+            self.written += len(updated)
+            retry = [(call_id, item) for call_id, item in batch if call_id not in updated]
+            for call_id, (disposition, started, attempts) in retry:
+                if attempts + 1 < self.MAX_ATTEMPTS:
+                    self._pending[call_id] = (disposition, started, attempts + 1)
+                else:
+                    self.unmatched += 1
+            if retry:
+                break  # retried on the next flush, after their log rows had time to land
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._calls:
+            call_id, call = next(iter(self._calls.items()))
+            if call.expires_at > now:
+                break
+            del self._calls[call_id]
+            self.expired += 1
+
+    async def _supervise(self) -> None:
+        """Keep the event connection up; ESLClient re-subscribes by itself when it reconnects."""
+        while True:
+            if not self._client.connected:
+                try:
+                    await self._client.subscribe(*EVENTS)
+                except ESLError as e:
+                    logger.warning("FreeSWITCH event subscription failed: %s", e)
+            await asyncio.sleep(1.0)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "connected": self._client.connected if self._client is not None else False,
+            "live_calls": len(self._calls),
+            "pending_updates": len(self._pending),
+            "events": self.events,
+            "ignored": self.ignored,
+            "expired": self.expired,
+            "written": self.written,
+            "unmatched": self.unmatched,
+            "failed": self.failed,
+        }
+
+
+def _event_time(event: dict[str, str]) -> str | None:
+    # Event-Date-Timestamp is microseconds since the epoch
+    micros = _int(event.get("Event-Date-Timestamp"))
+    if micros is None:
+        return None
+    return datetime.fromtimestamp(micros / 1_000_000, timezone.utc).isoformat()
+
+
+def _int(value: str | None) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+call_tracker = CallTracker(
+    max_calls=settings.call_tracker_max_calls,
+    ttl=settings.call_tracker_ttl_seconds,
+    batch_size=settings.call_events_batch_size,
+    flush_interval=settings.call_events_flush_interval_seconds,
+)
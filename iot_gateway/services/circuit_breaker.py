@@ -0,0 +1,74 @@
+"""Per-endpoint circuit breakers for outbound notifications."""
+import time
+from collections import OrderedDict
+
+from iot_gateway.config import settings
+
+
+class _Breaker:
+    __slots__ = ("failures", "opened_at")
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.opened_at: float | None = None
+
+
+class CircuitBreakers:
+    """
+    Consecutive-failure breaker per endpoint. After `threshold` failures in a row the endpoint
+    is skipped for `reset_after` seconds; then one probe request per `reset_after` is let
+    through (half-open) until a success closes the breaker again. Only endpoints with recent
+    failures are kept, at most `max_endpoints` of them (least recently failed dropped first).
+    """
+
+    def __init__(self, threshold: int, reset_after: float, max_endpoints: int) -> None:
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.max_endpoints = max_endpoints
+        self._breakers: OrderedDict[str, _Breaker] = OrderedDict()
+        self.opened = 0
+        self.short_circuited = 0
+
+    def allow(self, endpoint: str) -> bool:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None or breaker.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - breaker.opened_at >= self.reset_after:
+            breaker.opened_at = now  # the next probe waits another reset_after
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record(self, endpoint: str, ok: bool) -> None:
+        if ok:
+            self._breakers.pop(endpoint, None)
+            return
+        if self.threshold <= 0:
+            return
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = _Breaker()
+        breaker.failures += 1
+        if breaker.failures >= self.threshold:
+            if breaker.opened_at is None:
+                self.opened += 1
+            breaker.opened_at = time.monotonic()
+        self._breakers.move_to_end(endpoint)
+        while len(self._breakers) > self.max_endpoints:
+            self._breakers.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "failing_endpoints": len(self._breakers),
+            "open": sum(1 for b in self._breakers.values() if b.opened_at is not None),
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+        }
+
+
+speaker_breakers = CircuitBreakers(
+    threshold=settings.speaker_breaker_failure_threshold,
+    reset_after=settings.speaker_breaker_reset_seconds,
+    max_endpoints=settings.speaker_breaker_max_endpoints,
+)
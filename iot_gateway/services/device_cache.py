@@ -0,0 +1,206 @@
+"""Bounded LRU/TTL cache of device lookups used on the webhook and incoming-call paths."""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.config import settings
+from iot_gateway.models import Device
+from iot_gateway.repositories import device as device_repo
+
+
+@dataclass(frozen=True, slots=True)
+class CachedDevice:
+    """Detached snapshot of a device row (safe to share between sessions)."""
+
+    id: int
+    device_id: str
+    type: str
+    msisdn: str | None
+    subscriber_id: str | None
+    vendor: str | None
+    endpoint: str | None
+
+    @classmethod
+    def from_model(cls, device: Device) -> "CachedDevice":
+        return cls(
+            id=device.id,
+            device_id=device.device_id,
+            type=device.type,
+            msisdn=device.msisdn,
+            subscriber_id=device.subscriber_id,
+            vendor=device.vendor,
+            endpoint=device.endpoint,
+        )
+
+
+class _LRU:
+    """OrderedDict-based LRU where every entry carries its own expiry (monotonic seconds)."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: Any) -> tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def put(self, key: Any, value: Any, ttl: float) -> None:
+        if self.capacity <= 0 or ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Any) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DeviceCache:
+    """
+    Two indexes: device_id -> device and (msisdn, type) -> devices (ordered by id).
+    Unknown keys are cached as None / () for a shorter negative TTL.
+    """
+
+    def __init__(self, capacity: int, ttl: float, negative_ttl: float) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._by_device_id = _LRU(capacity)
+        self._by_msisdn = _LRU(capacity)
+        # Bumped on every write-through so a DB read that raced with it is not cached.
+        self._generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    async def get_by_device_id(self, session: AsyncSession, device_id: str) -> CachedDevice | None:
+        found, cached = self._by_device_id.get(device_id)
+        if found:
+            self._count_hit(cached)
+            return cached
+        self.misses += 1
+        generation = self._generation
+        device = await device_repo.get_by_device_id(session, device_id)
+        cached = CachedDevice.from_model(device) if device else None
+        if generation == self._generation:
+            self._by_device_id.put(device_id, cached, self._ttl_for(cached))
+        return cached
+
+    async def get_many(self, session: AsyncSession, device_ids: set[str]) -> dict[str, CachedDevice | None]:
+        """Resolve many device_ids; cache misses are loaded with a single IN query."""
+        result: dict[str, CachedDevice | None] = {}
+        missing = []
+        for device_id in device_ids:
+            found, cached = self._by_device_id.get(device_id)
+            if found:
+                self._count_hit(cached)
+                result[device_id] = cached
+            else:
+                missing.append(device_id)
+        if missing:
+            self.misses += len(missing)
+            generation = self._generation
+            loaded = {d.device_id: CachedDevice.from_model(d) for d in await device_repo.list_by_device_ids(session, missing)}
+            for device_id in missing:
+                cached = loaded.get(device_id)
+                result[device_id] = cached
+                if generation == self._generation:
+                    self._by_device_id.put(device_id, cached, self._ttl_for(cached))
+        return result
+
+    async def get_speakers_by_msisdn(self, session: AsyncSession, msisdn: str) -> tuple[CachedDevice, ...]:
+        key = (msisdn, "speaker")
+        found, cached = self._by_msisdn.get(key)
+        if found:
+            self._count_hit(cached)
+            return cached
+        self.misses += 1
+        generation = self._generation
+        devices = await device_repo.list_speakers_by_msisdn(session, msisdn)
+        cached = tuple(CachedDevice.from_model(d) for d in devices)
+        if generation == self._generation:
+            self._by_msisdn.put(key, cached, self._ttl_for(cached))
+        return cached
+
+    def refresh(self, device: Device) -> None:
+        """Store the current state of a created or updated device; its MSISDN entry is dropped."""
+        self._generation += 1
+        cached = CachedDevice.from_model(device)
+        self._by_device_id.put(cached.device_id, cached, self.ttl)
+        if cached.msisdn:
+            # an MSISDN may have several devices; the list is reloaded on the next lookup
+            self._by_msisdn.pop((cached.msisdn, cached.type))
+
+    async def preload(self, session: AsyncSession, limit: int) -> int:
+        """Load up to `limit` devices (by id) into both indexes for the startup warmup; returns how many."""
+        generation = self._generation
+        limit = min(limit, self._by_device_id.capacity)
+        devices = await device_repo.list_page(session, limit)
+        if generation != self._generation:
+            return 0  # a write-through raced with the read
+        # MSISDN lists are only complete when every device was loaded
+        complete = len(devices) < limit
+        by_msisdn: dict[tuple[str, str], list[CachedDevice]] = {}
+        for device in devices:
+            cached = CachedDevice.from_model(device)
+            self._by_device_id.put(cached.device_id, cached, self.ttl)
+            if complete and cached.msisdn and cached.type == "speaker":
+                by_msisdn.setdefault((cached.msisdn, cached.type), []).append(cached)
+        for key, speakers in by_msisdn.items():
+            self._by_msisdn.put(key, tuple(speakers), self.ttl)
+        return len(devices)
+
+    def invalidate(self, device_id: str, msisdn: str | None = None, type: str | None = None) -> None:
+        self._generation += 1
+        self._by_device_id.pop(device_id)
+        if msisdn and type:
+            self._by_msisdn.pop((msisdn, type))
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._by_device_id.clear()
+        self._by_msisdn.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size_by_device_id": len(self._by_device_id),
+            "size_by_msisdn": len(self._by_msisdn),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self._by_device_id.evictions + self._by_msisdn.evictions,
+        }
+
+    def _count_hit(self, cached: CachedDevice | tuple[CachedDevice, ...] | None) -> None:
+        if not cached:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+
+    def _ttl_for(self, cached: CachedDevice | tuple[CachedDevice, ...] | None) -> float:
+        return self.ttl if cached else self.negative_ttl
+
+
+device_cache = DeviceCache(
+    capacity=settings.device_cache_capacity,
+    ttl=settings.device_cache_ttl_seconds,
+    negative_ttl=settings.device_cache_negative_ttl_seconds,
+)
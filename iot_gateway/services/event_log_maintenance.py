@@ -0,0 +1,83 @@
+"""Event-log maintenance: create partitions ahead, refresh rollups, drop expired partitions."""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.config import settings
+from iot_gateway.repositories import event_log as event_log_repo
+from iot_gateway.repositories import event_log_rollup as rollup_repo
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key, so only one gateway instance runs a step at a time
+_LOCK_KEY = 0x10_6A7E_0001
+
+_warned_unpartitioned = False
+
+
+async def _try_lock(session: AsyncSession) -> bool:
+    return bool(await session.scalar(select(func.pg_try_advisory_xact_lock(_LOCK_KEY))))
+
+
+def _midnight(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def run(session: AsyncSession, now: datetime | None = None) -> dict:
+    """
+    One maintenance pass. Each step commits on its own, so partition DDL never waits on the
+    rollup query and inserts are blocked only for the moment a partition is created or dropped.
+    Rollups recount the last hours (and the current one) every run, so they may lag raw
+    logs by one maintenance interval; expired partitions are dropped after the rollup.
+    """
+    global _warned_unpartitioned
+    now = now or datetime.now(timezone.utc)
+    report = {"partitions_created": 0, "rollup_from": None, "partitions_dropped": [], "hourly_rollups_deleted": 0}
+
+    partitioned = await event_log_repo.is_partitioned(session)
+    await session.commit()
+    if partitioned and await _try_lock(session):
+        today = now.date()
+        days = [today + timedelta(days=n) for n in range(settings.event_log_partition_premake_days + 1)]
+        report["partitions_created"] = await event_log_repo.create_partitions(session, days)
+    await session.commit()
+
+    if await _try_lock(session):
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        start = hour - timedelta(hours=settings.event_log_rollup_lookback_hours)
+        latest = await rollup_repo.latest_bucket(session, "hour")
+        if latest is None:
+            # first run: backfill from the oldest log
+            oldest = await event_log_repo.oldest_created_at(session)
+            if oldest is not None:
+                start = min(start, oldest.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0))
+        else:
+            start = min(start, latest)
+        end = hour + timedelta(hours=1)
+        await rollup_repo.refresh_hourly(session, start, end)
+        await rollup_repo.refresh_daily(session, _midnight(start), end)
+        report["rollup_from"] = start.isoformat()
+    await session.commit()
+
+    if await _try_lock(session):
+        if partitioned and settings.event_log_retention_days > 0:
+            before = now - timedelta(days=settings.event_log_retention_days)
+            report["partitions_dropped"] = await event_log_repo.drop_partitions_before(session, before)
+        elif settings.event_log_retention_days > 0 and not _warned_unpartitioned:
+            _warned_unpartitioned = True
+            logger.warning(
+                "event_logs is not partitioned; retention is skipped (run scripts/migrate_event_logs_partitioned.sql)"
+            )
+        if settings.event_log_rollup_hourly_retention_days > 0:
+            before = now - timedelta(days=settings.event_log_rollup_hourly_retention_days)
+            report["hourly_rollups_deleted"] = await rollup_repo.delete_before(session, "hour", before)
+    await session.commit()
+
+    if report["partitions_created"] or report["partitions_dropped"]:
+        logger.info(
+            "Event log partitions: %d created, dropped %s",
+            report["partitions_created"], ", ".join(report["partitions_dropped"]) or "none",
+        )
+    return report
@@ -0,0 +1,175 @@
+"""Optional background sink that batches event-log inserts off the request path."""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway import tracing
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker
+from iot_gateway.repositories import event_log as event_log_repo
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# executemany needs every row to carry the same keys
+_EMPTY_ROW: dict[str, Any] = {
+    "device_id": None,
+    "rule_id": None,
+    "call_id": None,
+    "target_number": None,
+    "details": None,
+}
+
+
+class EventLogWriter:
+    """
+    Bounded queue drained by one writer task that inserts batches by size or time.
+    When the queue is full, submit() refuses the entry and the caller writes it
+    synchronously, which slows producers down to the DB rate instead of dropping logs.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float) -> None:
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything already queued, then stop the writer task."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error("Event log writer did not flush within %.1fs; %d entries lost", timeout, self._queue.qsize())
+
+    def submit(self, row: dict[str, Any]) -> bool:
+        if self._task is None:
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            async with async_session_maker() as session:
+                await event_log_repo.create_many(session, batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Event log batch insert failed; %d entries lost", len(batch))
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+
+event_log_writer = EventLogWriter(
+    max_queue=settings.event_log_queue_size,
+    batch_size=settings.event_log_batch_size,
+    flush_interval=settings.event_log_flush_interval_seconds,
+)
+
+
+def _with_trace_ids(details: dict | None) -> dict | None:
+    """Add trace_id and request_id when the event is logged by a traced request."""
+    ids = tracing.log_ids()
+    return {**(details or {}), **ids} if ids else details
+
+
+async def record_event(
+    session: AsyncSession,
+    event_kind: str,
+    result: str,
+    device_id: str | None = None,
+    rule_id: int | None = None,
+    call_id: str | None = None,
+    target_number: str | None = None,
+    details: dict | None = None,
+) -> None:
+    """Log an event: queued for the background writer when it runs, otherwise written inline."""
+    row = {
+        "event_kind": event_kind,
+        "result": result,
+        "device_id": device_id,
+        "rule_id": rule_id,
+        "call_id": call_id,
+        "target_number": target_number,
+        "details": _with_trace_ids(details),
+    }
+    # stamp now: a queued row may be inserted up to a flush interval later
+    if event_log_writer.running and event_log_writer.submit({**row, "created_at": datetime.now(timezone.utc)}):
+        return
+    await event_log_repo.create(session, **row)
+
+
+async def record_events(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Log several events (record_event keyword dicts); whatever the writer does not take is inserted in one batch."""
+    inline = []
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        row = {**_EMPTY_ROW, **row}
+        row["details"] = _with_trace_ids(row["details"])
+        if not (event_log_writer.running and event_log_writer.submit({**row, "created_at": now})):
+            inline.append(row)
+    await event_log_repo.create_many(session, inline)
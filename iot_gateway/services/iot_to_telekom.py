@@ -1,12 +1,20 @@
 """IoT -> Telekom: on webhook event (e.g. smoke), find rule and originate call."""
+import asyncio
 import logging
+from typing import Any
+from uuid import uuid4
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from iot_gateway.integrations.freeswitch import originate as freeswitch_originate
-from iot_gateway.repositories import device as device_repo
-from iot_gateway.repositories import event_log as event_log_repo
+from iot_gateway.config import settings
+from iot_gateway.metrics import stage
 from iot_gateway.repositories import rule as rule_repo
+from iot_gateway.services.call_scheduler import call_scheduler, priority_for
+from iot_gateway.services.device_cache import CachedDevice, device_cache
+from iot_gateway.services.event_log_writer import record_events
+from iot_gateway.services.outbox import Attempt, enqueue
+from iot_gateway.services.rule_index import rule_index
+from iot_gateway.services.webhook_dedup import webhook_coalescer
 
 logger = logging.getLogger(__name__)
 
@@ -15,46 +23,243 @@ async def handle_webhook(
     session: AsyncSession,
     event_type: str,
     device_id: str,
+    idempotency_key: str | None = None,
 ) -> dict:
     """
-    Find device and rule for event_type+device_id, run action (call), log result.
-    Returns dict with success (bool), rule_id (int|None), target (str|None), call_result (dict).
+    Find device and all active rules for event_type+device_id, call every target
+    concurrently, log one row per target.
+    Returns dict with success (bool, true if any call succeeded), calls (list of per-rule
+    results: rule_id, target, success, call_result) and, for the first rule, rule_id (int|None),
+    target (str|None), call_result (dict). A duplicate (same idempotency key, or same device+event_type within the suppression
+    window) gets the original result with duplicate=True. Failed calls are queued in the outbox
+    for retries and marked retry_scheduled=True; calls that timed out after being sent
+    (outcome_unknown) are not, as they may still be placed.
     """
-    device = await device_repo.get_by_device_id(session, device_id)
+    earlier = webhook_coalescer.lookup(event_type, device_id, idempotency_key)
+    if earlier is not None:
+        return await webhook_coalescer.wait(earlier)
+    entry = webhook_coalescer.begin(event_type, device_id, idempotency_key)
+    try:
+        result = await _handle_one(session, event_type, device_id)
+    except BaseException as e:
+        webhook_coalescer.finish(entry, None, e)
+        raise
+    webhook_coalescer.finish(entry, result)
+    return result
+
+
+async def _handle_one(session: AsyncSession, event_type: str, device_id: str) -> dict:
+    with stage("webhook.device_lookup"):
+        device = await device_cache.get_by_device_id(session, device_id)
+    rules = []
+    if device:
+        with stage("webhook.rule_lookup"):
+            if rule_index.loaded:
+                rules = rule_index.get_all(event_type, device_id)
+            else:
+                rules = await rule_repo.list_by_event_and_device(session, event_type, device_id)
+    result, log_rows = await _run_rules(event_type, device_id, device, rules)
+    with stage("webhook.event_log"):
+        await record_events(session, log_rows)
+    await _schedule_retries(session, [(event_type, device_id, result)])
+    return result
+
+
+async def handle_webhook_batch(
+    session: AsyncSession, events: list[tuple[str, str, str | None]]
+) -> list[dict]:
+    """
+    Process (event_type, device_id, idempotency_key) triples: devices and rules are resolved
+    with one query each, calls run concurrently (bounded), logs are written as one batch.
+    Duplicates (also within the batch) are coalesced as in handle_webhook.
+    Returns one handle_webhook-style result per event, in input order.
+    """
+    slots: list = []
+    fresh: list[tuple[str, str]] = []
+    entries = []
+    for event_type, device_id, idempotency_key in events:
+        earlier = webhook_coalescer.lookup(event_type, device_id, idempotency_key)
+        if earlier is not None:
+            slots.append(earlier)
+        else:
+            slots.append(len(fresh))
+            fresh.append((event_type, device_id))
+            entries.append(webhook_coalescer.begin(event_type, device_id, idempotency_key))
+    try:
+        results = await _handle_many(session, fresh)
+    except BaseException as e:
+        for entry in entries:
+            webhook_coalescer.finish(entry, None, e)
+        raise
+    for entry, result in zip(entries, results):
+        webhook_coalescer.finish(entry, result)
+    return [
+        results[slot] if isinstance(slot, int) else await webhook_coalescer.wait(slot)
+        for slot in slots
+    ]
+
+
+async def _handle_many(session: AsyncSession, events: list[tuple[str, str]]) -> list[dict]:
+    if not events:
+        return []
+    with stage("webhook_batch.device_lookup"):
+        devices = await device_cache.get_many(session, {device_id for _, device_id in events})
+    pairs = {(event_type, device_id) for event_type, device_id in events if devices.get(device_id)}
+    with stage("webhook_batch.rule_lookup"):
+        if rule_index.loaded:
+            rules = {pair: rule_index.get_all(*pair) for pair in pairs}
+        else:
+            rules = await rule_repo.list_many_by_event_and_device(session, pairs)
+
+    semaphore = asyncio.Semaphore(settings.webhook_batch_concurrency)
+
+    async def run(event_type: str, device_id: str) -> tuple[dict, list[dict[str, Any]]]:
+        async with semaphore:
+            return await _run_rules(
+                event_type, device_id, devices.get(device_id), rules.get((event_type, device_id), [])
+            )
+
+    outcomes = await asyncio.gather(*(run(event_type, device_id) for event_type, device_id in events))
+    with stage("webhook_batch.event_log"):
+        await record_events(session, [log_row for _, log_rows in outcomes for log_row in log_rows])
+    results = [result for result, _ in outcomes]
+    await _schedule_retries(session, [(*event, result) for event, result in zip(events, results)])
+    return results
+
+
+async def _schedule_retries(session: AsyncSession, handled: list[tuple[str, str, dict]]) -> None:
+    """
+    Queue the failed calls of (event_type, device_id, result) triples in the outbox. The payload
+    keeps the call's call_id, so every retry reuses its channel UUID. Calls with an unknown
+    outcome are left alone: a retry could dial a second time.
+    """
+    failed = [
+        (call, {
+            "event_type": event_type,
+            "device_id": device_id,
+            "rule_id": call["rule_id"],
+            "target": call["target"],
+            "call_id": call["call_id"],
+        })
+        for event_type, device_id, result in handled
+        for call in result["calls"]
+        if not call["success"] and not (call["call_result"] or {}).get("outcome_unknown")
+    ]
+    if failed and await enqueue(session, "call", [payload for _, payload in failed]):
+        for call, _ in failed:
+            call["retry_scheduled"] = True
+
+
+async def retry_call(item: dict[str, Any]) -> Attempt:
+    """
+    Outbox handler for "call" items; a rule deactivated in the meantime is not retried, nor
+    is an attempt that timed out after it was sent.
+    """
+    if rule_index.loaded and not any(
+        rule.id == item["rule_id"] for rule in rule_index.get_all(item["event_type"], item["device_id"])
+    ):
+        return Attempt(False, "rule_inactive", {}, retryable=False)
+    call_result = await _call(item["target"], priority_for(item["event_type"]), item.get("call_id"))
+    success = call_result.get("success", False)
+    log = {
+        "event_kind": "smoke_trigger_call",
+        "result": "success" if success else "failure",
+        "device_id": item["device_id"],
+        "rule_id": item["rule_id"],
+        "call_id": call_result.get("call_id") or item.get("call_id"),
+        "target_number": item["target"],
+        "details": call_result,
+    }
+    return Attempt(success, call_result.get("error"), log, retryable=not call_result.get("outcome_unknown"))
+
+
+async def flush_suppressed(session: AsyncSession) -> None:
+    """Write the counts of coalesced duplicates collected since the last flush to event_logs."""
+    rows = webhook_coalescer.take_suppressed()
+    if rows:
+        await record_events(session, rows)
+
+
+async def _run_rules(
+    event_type: str, device_id: str, device: CachedDevice | None, rules: list
+) -> tuple[dict, list[dict[str, Any]]]:
+    """Run the rules' call actions concurrently; returns (webhook result, event-log rows) without touching the DB."""
     if not device:
-        await event_log_repo.create(
-            session,
-            event_kind="smoke_trigger_call",
-            result="failure",
-            device_id=device_id,
-            details={"reason": "device_not_found"},
-        )
-        return {"success": False, "rule_id": None, "target": None, "call_result": None}
-
-    rule = await rule_repo.get_by_event_and_device(session, event_type, device_id)
-    if not rule or rule.action_type != "call":
-        await event_log_repo.create(
-            session,
-            event_kind="smoke_trigger_call",
-            result="failure",
-            device_id=device_id,
-            details={"reason": "no_rule_or_not_call", "event_type": event_type},
-        )
-        return {"success": False, "rule_id": None, "target": None, "call_result": None}
-
-    target = rule.target
-    call_result = await freeswitch_originate(target, caller_id="IoT-Gateway")
-    call_id = call_result.get("call_id") if call_result else None
-    success = call_result.get("success", False) if call_result else False
-
-    await event_log_repo.create(
-        session,
-        event_kind="smoke_trigger_call",
-        result="success" if success else "failure",
-        device_id=device_id,
-        rule_id=rule.id,
-        call_id=call_id,
-        target_number=target,
-        details=call_result,
+        log_row = {
+            "event_kind": "smoke_trigger_call",
+            "result": "failure",
+            "device_id": device_id,
+            "details": {"reason": "device_not_found"},
+        }
+        return {"success": False, "rule_id": None, "target": None, "call_result": None, "calls": []}, [log_row]
+
+    rules = [rule for rule in rules if rule.action_type == "call"]
+    if not rules:
+        log_row = {
+            "event_kind": "smoke_trigger_call",
+            "result": "failure",
+            "device_id": device_id,
+            "details": {"reason": "no_rule_or_not_call", "event_type": event_type},
+        }
+        return {"success": False, "rule_id": None, "target": None, "call_result": None, "calls": []}, [log_row]
+
+    priority = priority_for(event_type)
+    call_ids = [str(uuid4()) for _ in rules]
+    call_results = await asyncio.gather(
+        *(_call(rule.target, priority, call_id) for rule, call_id in zip(rules, call_ids))
     )
-    return {"success": success, "rule_id": rule.id, "target": target, "call_result": call_result}
+
+    calls = []
+    log_rows = []
+    for rule, call_id, call_result in zip(rules, call_ids, call_results):
+        success = call_result.get("success", False) if call_result else False
+        # the id FreeSWITCH reports, else the one sent; the response and the log row share it
+        call_id = (call_result.get("call_id") if call_result else None) or call_id
+        calls.append({
+            "rule_id": rule.id,
+            "target": rule.target,
+            "call_id": call_id,
+            "success": success,
+            "call_result": call_result,
+        })
+        log_rows.append({
+            "event_kind": "smoke_trigger_call",
+            "result": "success" if success else "failure",
+            "device_id": device_id,
+            "rule_id": rule.id,
+            "call_id": call_id,
+            "target_number": rule.target,
+            "details": call_result,
+        })
+    first = calls[0]
+    result = {
+        "success": any(c["success"] for c in calls),
+        "rule_id": first["rule_id"],
+        "target": first["target"],
+        "call_result": first["call_result"],
+        "calls": calls,
+    }
+    return result, log_rows
+
+
+async def _call(target: str, priority: int, call_id: str | None = None) -> dict[str, Any]:
+    # includes the time spent queued in the call scheduler
+    with stage("webhook.call") as timer:
+        result = await call_scheduler.originate(
+            target,
+            priority=priority,
+            timeout=settings.webhook_call_timeout_seconds,
+            caller_id="IoT-Gateway",
+            call_id=call_id,
+        )
+        if result.get("error") in ("timeout", "queue_timeout"):
+            logger.warning(
+                "Originate to %s did not complete within %.1fs (%s)",
+                target,
+                settings.webhook_call_timeout_seconds,
+                "may still be placed" if result.get("outcome_unknown") else "dropped from the queue",
+            )
+            timer.outcome = "timeout"
+        elif not result.get("success"):
+            timer.outcome = "failure"
+        return result
@@ -0,0 +1,208 @@
+"""Durable retries: failed notifications and calls go to the outbox table and are drained in the background."""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker
+from iot_gateway.models import OutboxItem
+from iot_gateway.repositories import outbox as outbox_repo
+from iot_gateway.services.event_log_writer import record_events
+
+logger = logging.getLogger(__name__)
+
+
+class Attempt:
+    """Result of one retry: `log` is an event-log row (record_event keywords) for the final outcome."""
+
+    __slots__ = ("success", "error", "retryable", "log")
+
+    def __init__(self, success: bool, error: str | None, log: dict[str, Any], retryable: bool = True) -> None:
+        self.success = success
+        self.error = error
+        self.retryable = retryable
+        self.log = log
+
+
+Handler = Callable[[dict[str, Any]], Awaitable[Attempt]]
+
+
+class OutboxWorker:
+    """
+    Claims due items in batches (FOR UPDATE SKIP LOCKED, see repositories.outbox.claim_due), so
+    any number of gateway instances can drain one table, and runs at most `concurrency` of them
+    at once through the handler registered for their kind. A failed attempt is retried after
+    an exponential backoff with jitter; after `max_attempts`, or on a non-retryable failure,
+    the item is marked dead. Only the final outcome of an item is written to event_logs.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        concurrency: int,
+        poll_interval: float,
+        lease: float,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+    ) -> None:
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._handlers: dict[str, Handler] = {}
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self.claimed = 0
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming and wait for running items; unfinished ones are claimed again after the lease."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if self._running:
+            _, pending = await asyncio.wait(set(self._running), timeout=timeout)
+            for t in pending:
+                t.cancel()
+
+    def wake(self) -> None:
+        """Poll now instead of at the next interval (e.g. after an item was made due)."""
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before attempt `attempts + 1`: base * 2^(attempts-1), capped, with the upper half jittered."""
+        delay = min(self.max_delay, self.base_delay * 2 ** max(attempts - 1, 0))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _run(self) -> None:
+        while True:
+            free = self.concurrency - len(self._running)
+            claimed: list[OutboxItem] = []
+            if free > 0:
+                try:
+                    async with async_session_maker() as session:
+                        claimed = await outbox_repo.claim_due(
+                            session, min(self.batch_size, free), timedelta(seconds=self.lease)
+                        )
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Claiming outbox items failed")
+                for item in claimed:
+                    task = asyncio.create_task(self._process(item))
+                    self._running.add(task)
+                    task.add_done_callback(self._done)
+                self.claimed += len(claimed)
+            # a full batch means more may be due; otherwise sleep until woken or the next poll
+            if free <= 0 or len(claimed) < min(self.batch_size, free):
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._wake.set()  # a slot is free
+
+    async def _process(self, item: OutboxItem) -> None:
+        handler = self._handlers.get(item.kind)
+        if handler is None:
+            attempt = Attempt(False, f"no handler for {item.kind!r}", {}, retryable=False)
+        else:
+            try:
+                attempt = await handler(item.payload)
+            except Exception as e:
+                logger.exception("Outbox item %s (%s) failed", item.id, item.kind)
+                attempt = Attempt(False, str(e) or e.__class__.__name__, {})
+        try:
+            async with async_session_maker() as session:
+                await self._report(session, item, attempt)
+        except Exception:
+            # the item is claimed again after the lease expires
+            self.errors += 1
+            logger.exception("Recording the outcome of outbox item %s failed", item.id)
+
+    async def _report(self, session: AsyncSession, item: OutboxItem, attempt: Attempt) -> None:
+        final = attempt.success or not attempt.retryable or item.attempts >= self.max_attempts
+        if not final:
+            delay = self.backoff(item.attempts)
+            await outbox_repo.reschedule(
+                session, item.id, datetime.now(timezone.utc) + timedelta(seconds=delay), attempt.error
+            )
+            self.retried += 1
+            return
+        if attempt.success:
+            await outbox_repo.complete(session, item.id)
+            self.delivered += 1
+        else:
+            await outbox_repo.mark_dead(session, item.id, attempt.error)
+            self.dead += 1
+            logger.warning("Outbox item %s (%s) is dead after %d attempts: %s", item.id, item.kind, item.attempts, attempt.error)
+        if attempt.log:
+            details = {**(attempt.log.get("details") or {}), "outbox_id": item.id, "attempts": item.attempts}
+            if not attempt.success:
+                details["dead_letter"] = True
+            await record_events(session, [{**attempt.log, "details": details}])
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "in_flight": len(self._running),
+            "claimed": self.claimed,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead": self.dead,
+            "errors": self.errors,
+        }
+
+
+outbox_worker = OutboxWorker(
+    batch_size=settings.outbox_batch_size,
+    concurrency=settings.outbox_concurrency,
+    poll_interval=settings.outbox_poll_interval_seconds,
+    lease=settings.outbox_lease_seconds,
+    max_attempts=settings.outbox_max_attempts,
+    base_delay=settings.outbox_retry_base_seconds,
+    max_delay=settings.outbox_retry_max_seconds,
+)
+
+
+async def enqueue(session: AsyncSession, kind: str, payloads: list[dict[str, Any]]) -> int:
+    """Store retries (first attempt after one backoff step); returns how many were stored."""
+    if not settings.outbox_enabled or not payloads:
+        return 0
+    now = datetime.now(timezone.utc)
+    items = [
+        {"kind": kind, "payload": payload, "next_attempt_at": now + timedelta(seconds=outbox_worker.backoff(1))}
+        for payload in payloads
+    ]
+    await outbox_repo.enqueue_many(session, items)
+    return len(items)
@@ -0,0 +1,154 @@
+"""Bulk device and rule provisioning: chunked validation and set-based writes."""
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.config import settings
+from iot_gateway.repositories import device as device_repo
+from iot_gateway.repositories import rule as rule_repo
+from iot_gateway.schemas import DeviceCreate, RuleCreate
+from iot_gateway.services.device_cache import device_cache
+from iot_gateway.services.rule_index import rule_index
+
+logger = logging.getLogger(__name__)
+
+# (row number, parsed JSON value or the exception raised while parsing it)
+BulkItems = AsyncIterator[tuple[int, Any]]
+
+# bind parameters one statement may carry (PostgreSQL wire protocol, enforced by asyncpg)
+MAX_BIND_PARAMETERS = 32767
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BulkReport:
+    def __init__(self) -> None:
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors: list[dict[str, Any]] = []
+
+    def add_error(self, row: int, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < settings.bulk_max_reported_errors:
+            self.errors.append({"row": row, "error": error})
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def chunk_size_for(model: type[BaseModel]) -> int:
+    """BULK_CHUNK_SIZE, capped so a multi-row INSERT of the model's columns stays within MAX_BIND_PARAMETERS."""
+    return max(1, min(settings.bulk_chunk_size, MAX_BIND_PARAMETERS // len(model.model_fields)))
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors())
+
+
+async def _validated_chunks(
+    items: BulkItems, model: type[BaseModel], report: BulkReport
+) -> AsyncIterator[list[tuple[int, BaseModel]]]:
+    chunk_size = chunk_size_for(model)
+    chunk: list[tuple[int, BaseModel]] = []
+    async for row, item in items:
+        report.received += 1
+        if isinstance(item, Exception):
+            report.add_error(row, f"invalid JSON: {item}")
+            continue
+        try:
+            chunk.append((row, model.model_validate(item)))
+        except ValidationError as e:
+            report.add_error(row, _validation_message(e))
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _write_halving(
+    session: AsyncSession,
+    rows: list[tuple[int, T]],
+    write: Callable[[list[T]], Awaitable[list[R]]],
+    report: BulkReport,
+    what: str,
+) -> list[R]:
+    """
+    Write (row number, item) pairs with one statement; if it fails, roll back and retry each
+    half, so only the rows the database rejects are reported and the rest are written.
+    """
+    try:
+        return await write([item for _, item in rows])
+    except Exception as e:
+        await session.rollback()
+        if len(rows) == 1:
+            logger.warning("Bulk %s row %d failed: %s", what, rows[0][0], e)
+            report.add_error(rows[0][0], f"database error: {e.__class__.__name__}")
+            return []
+    half = len(rows) // 2
+    return (
+        await _write_halving(session, rows[:half], write, report, what)
+        + await _write_halving(session, rows[half:], write, report, what)
+    )
+
+
+async def bulk_upsert_devices(session: AsyncSession, items: BulkItems) -> dict[str, Any]:
+    """
+    Validate devices chunk by chunk and upsert each chunk with one INSERT ... ON CONFLICT (device_id).
+    An existing device is overwritten with the row's values. A chunk the database rejects is
+    retried in halves down to the failing rows. Returns a per-row error report.
+    """
+    report = BulkReport()
+    try:
+        async for chunk in _validated_chunks(items, DeviceCreate, report):
+            rows: dict[str, tuple[int, dict]] = {}
+            for row, device in chunk:
+                if device.device_id in rows:
+                    report.add_error(row, f"duplicate device_id {device.device_id!r} in the same chunk")
+                    continue
+                rows[device.device_id] = (row, device.model_dump())
+            returned = await _write_halving(
+                session, list(rows.values()), lambda data: device_repo.upsert_many(session, data), report, "device"
+            )
+            for _, inserted in returned:
+                if inserted:
+                    report.inserted += 1
+                else:
+                    report.updated += 1
+    finally:
+        # msisdn/type may have changed for any upserted device; bulk imports are rare
+        device_cache.clear()
+    return report.to_dict()
+
+
+async def bulk_create_rules(session: AsyncSession, items: BulkItems) -> dict[str, Any]:
+    """
+    Validate rules chunk by chunk and insert each chunk with one multi-row INSERT.
+    Rules have no natural key, so every valid row creates a new rule. A chunk the database
+    rejects is retried in halves down to the failing rows.
+    """
+    report = BulkReport()
+    async for chunk in _validated_chunks(items, RuleCreate, report):
+        created = await _write_halving(
+            session,
+            [(row, rule.model_dump()) for row, rule in chunk],
+            lambda data: rule_repo.create_many(session, data),
+            report,
+            "rule",
+        )
+        for rule in created:
+            rule_index.upsert(rule)
+        report.inserted += len(created)
+    return report.to_dict()
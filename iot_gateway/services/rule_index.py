@@ -0,0 +1,122 @@
+"""In-process index of active rules keyed by (event_type, device_id)."""
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from iot_gateway.models import Rule
+from iot_gateway.repositories import rule as rule_repo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedRule:
+    """Detached snapshot of an active rule (safe to share between sessions)."""
+
+    id: int
+    event_type: str
+    device_id: str
+    action_type: str
+    target: str
+
+    @classmethod
+    def from_model(cls, rule: Rule) -> "CachedRule":
+        return cls(
+            id=rule.id,
+            event_type=rule.event_type,
+            device_id=rule.device_id,
+            action_type=rule.action_type,
+            target=rule.target,
+        )
+
+
+class RuleIndex:
+    """
+    Active rules held in memory so the webhook path needs no DB round trip.
+    The index is complete once loaded: a missing key means there is no active rule.
+    """
+
+    def __init__(self) -> None:
+        self._by_key: dict[tuple[str, str], dict[int, CachedRule]] = {}
+        self._key_by_id: dict[int, tuple[str, str]] = {}
+        self._lock = asyncio.Lock()
+        # Changes made through the API while a reload is reading the table are
+        # replayed on top of the fresh snapshot so they are not lost.
+        self._pending: list[tuple[int, CachedRule | None]] | None = None
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    async def reload(self, session: AsyncSession) -> None:
+        """Rebuild the index from the rules table and swap it in atomically."""
+        async with self._lock:
+            self._pending = []
+            try:
+                rules = await rule_repo.list_active(session)
+            except Exception:
+                self._pending = None
+                raise
+            by_key: dict[tuple[str, str], dict[int, CachedRule]] = {}
+            key_by_id: dict[int, tuple[str, str]] = {}
+            for r in rules:
+                cached = CachedRule.from_model(r)
+                key = (cached.event_type, cached.device_id)
+                by_key.setdefault(key, {})[cached.id] = cached
+                key_by_id[cached.id] = key
+            self._by_key = by_key
+            self._key_by_id = key_by_id
+            pending, self._pending = self._pending, None
+            for rule_id, cached in pending:
+                self._apply(rule_id, cached)
+            self.loaded = True
+            self.reloads += 1
+        logger.info("Rule index loaded: %d active rules", len(self._key_by_id))
+
+    def get_all(self, event_type: str, device_id: str) -> list[CachedRule]:
+        """All active rules for event_type+device_id, ordered by id."""
+        entries = self._by_key.get((event_type, device_id))
+        if not entries:
+            self.misses += 1
+            return []
+        self.hits += 1
+        return [entries[rule_id] for rule_id in sorted(entries)]
+
+    def upsert(self, rule: Rule) -> None:
+        """Apply a created or updated rule; inactive rules are removed from the index."""
+        cached = CachedRule.from_model(rule) if rule.active else None
+        if self._pending is not None:
+            self._pending.append((rule.id, cached))
+        self._apply(rule.id, cached)
+
+    def remove(self, rule_id: int) -> None:
+        if self._pending is not None:
+            self._pending.append((rule_id, None))
+        self._apply(rule_id, None)
+
+    def _apply(self, rule_id: int, cached: CachedRule | None) -> None:
+        key = self._key_by_id.pop(rule_id, None)
+        if key is not None:
+            entries = self._by_key.get(key)
+            if entries is not None:
+                entries.pop(rule_id, None)
+                if not entries:
+                    del self._by_key[key]
+        if cached is not None:
+            key = (cached.event_type, cached.device_id)
+            self._by_key.setdefault(key, {})[rule_id] = cached
+            self._key_by_id[rule_id] = key
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "size": len(self._key_by_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+
+rule_index = RuleIndex()
@@ -0,0 +1,151 @@
+"""Push channel to speakers: live WebSocket connections by device_id, incoming-call pushes acked by the speaker."""
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+from typing import Any
+
+from starlette.websockets import WebSocket
+
+from iot_gateway.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection:
+    __slots__ = ("websocket", "send_lock", "pending")
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        # created on the first push: most connections stay idle
+        self.send_lock: asyncio.Lock | None = None
+        self.pending: dict[str, asyncio.Future] | None = None
+
+
+class SpeakerPushRegistry:
+    """
+    One live connection per device_id; a reconnect replaces (and closes) the older one. A push
+    sends {"type": "incoming_call", "id", ...payload} and waits up to `ack_timeout` for
+    {"type": "ack", "id"} or {"type": "nack", "id", "error"} from the speaker.
+    An idle connection costs one registry entry besides the server's socket state: no tasks or
+    timers of ours; keepalive is left to the server's WebSocket pings (uvicorn --ws-ping-interval).
+    The registry is per process, so speakers connected to another instance get the HTTP fallback.
+    """
+
+    def __init__(self, secret: str, ack_timeout: float, max_connections: int) -> None:
+        self.secret = secret
+        self.ack_timeout = ack_timeout
+        self.max_connections = max_connections
+        self._connections: dict[str, _Connection] = {}
+        self._ids = itertools.count(1)
+        self.awaiting_ack = 0
+        self.pushed = 0
+        self.acked = 0
+        self.nacked = 0
+        self.ack_timeouts = 0
+        self.replaced = 0
+
+    def token_for(self, device_id: str) -> str:
+        """Device token: hex HMAC-SHA256 of the device_id with SPEAKER_PUSH_SECRET."""
+        return hmac.new(self.secret.encode(), device_id.encode(), hashlib.sha256).hexdigest()
+
+    def authorize(self, device_id: str, token: str | None) -> bool:
+        return bool(self.secret and token) and hmac.compare_digest(self.token_for(device_id), token)
+
+    def connected(self, device_id: str) -> bool:
+        return device_id in self._connections
+
+    def has_room(self, device_id: str) -> bool:
+        """A new connection fits (a reconnect of a known device always does)."""
+        return len(self._connections) < self.max_connections or device_id in self._connections
+
+    async def serve(self, websocket: WebSocket, device_id: str) -> None:
+        """Register an accepted connection and read acks until it closes."""
+        conn = _Connection(websocket)
+        previous = self._connections.get(device_id)
+        self._connections[device_id] = conn
+        if previous is not None:
+            self.replaced += 1
+            try:
+                await previous.websocket.close(code=4000, reason="Replaced by a newer connection")
+            except Exception:
+                pass
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                self._on_frame(conn, message.get("text") or message.get("bytes") or "")
+        finally:
+            if self._connections.get(device_id) is conn:
+                del self._connections[device_id]
+            for future in (conn.pending or {}).values():
+                if not future.done():
+                    future.set_result((False, "disconnected"))
+
+    def _on_frame(self, conn: _Connection, frame: str | bytes) -> None:
+        try:
+            data = json.loads(frame)
+            kind, message_id = data.get("type"), str(data.get("id"))
+        except (ValueError, AttributeError):
+            return
+        future = conn.pending.get(message_id) if conn.pending else None
+        if future is None or future.done():
+            return
+        if kind == "ack":
+            future.set_result((True, None))
+        elif kind == "nack":
+            future.set_result((False, str(data.get("error") or "nack")))
+
+    async def push(self, device_id: str, payload: dict[str, Any]) -> dict[str, Any] | None:
+        """
+        Send over the live connection and wait for the ack: {"success", "error", "nacked"}, where
+        nacked means the speaker answered and refused; None when not connected.
+        """
+        conn = self._connections.get(device_id)
+        if conn is None:
+            return None
+        if conn.pending is None:
+            conn.pending = {}
+            conn.send_lock = asyncio.Lock()
+        message_id = str(next(self._ids))
+        future = conn.pending[message_id] = asyncio.get_running_loop().create_future()
+        self.awaiting_ack += 1
+        try:
+            async with conn.send_lock:
+                await conn.websocket.send_text(json.dumps({"type": "incoming_call", "id": message_id, **payload}))
+            self.pushed += 1
+            success, error = await asyncio.wait_for(future, self.ack_timeout)
+        except asyncio.TimeoutError:
+            self.ack_timeouts += 1
+            return {"success": False, "error": "ack_timeout", "nacked": False}
+        except Exception as e:
+            return {"success": False, "error": str(e) or e.__class__.__name__, "nacked": False}
+        finally:
+            self.awaiting_ack -= 1
+            conn.pending.pop(message_id, None)
+        if success:
+            self.acked += 1
+        else:
+            self.nacked += 1
+        return {"success": success, "error": error, "nacked": not success}
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._connections),
+            "awaiting_ack": self.awaiting_ack,
+            "pushed": self.pushed,
+            "acked": self.acked,
+            "nacked": self.nacked,
+            "ack_timeouts": self.ack_timeouts,
+            "replaced": self.replaced,
+        }
+
+
+speaker_push = SpeakerPushRegistry(
+    secret=settings.speaker_push_secret,
+    ack_timeout=settings.speaker_push_ack_timeout_seconds,
+    max_connections=settings.speaker_push_max_connections,
+)
@@ -1,15 +1,32 @@
-"""Telekom -> IoT: on incoming call, notify speaker device."""
+"""Telekom -> IoT: on incoming call, notify speaker devices."""
+import asyncio
 import logging
+from typing import Any
 from uuid import uuid4
 
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from iot_gateway.repositories import device as device_repo
-from iot_gateway.repositories import event_log as event_log_repo
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker
+from iot_gateway.integrations import http_client
+from iot_gateway.metrics import Counter, stage
+from iot_gateway.services.circuit_breaker import speaker_breakers
+from iot_gateway.services.device_cache import device_cache
+from iot_gateway.services.event_log_writer import record_event, record_events
+from iot_gateway.services.outbox import Attempt, enqueue
+from iot_gateway.services.speaker_push import speaker_push
 
 logger = logging.getLogger(__name__)
 
+SPEAKER_HEDGES = Counter("iot_gateway_speaker_hedged_requests_total", "Second notification requests sent by hedging")
+SPEAKER_PUSH_FALLBACKS = Counter(
+    "iot_gateway_speaker_push_fallbacks_total", "HTTP notifications sent after a failed push to a connected speaker"
+)
+
+# notifications still running after the call was answered; logged when they finish
+_background: set[asyncio.Task] = set()
+
 
 async def on_incoming_call(
     session: AsyncSession,
@@ -18,13 +35,17 @@ async def on_incoming_call(
     call_id: str | None = None,
 ) -> dict:
     """
-    Find speaker for to_msisdn, POST notification to device endpoint, log result.
-    Returns dict with notified (bool), device_id (str|None), error (str|None).
+    Notify every speaker registered for to_msisdn concurrently and return on the first
+    acknowledgement (push ack or HTTP 2xx); the other notifications finish and are logged in the background.
+    If no speaker acknowledges, retryable failures are queued in the outbox.
+    Returns dict with notified (bool), device_id (str|None, the acknowledging device),
+    error (str|None), devices (outcomes known at return time) and retries_scheduled.
     """
     call_id = call_id or str(uuid4())
-    device = await device_repo.get_speaker_by_msisdn(session, to_msisdn)
-    if not device:
-        await event_log_repo.create(
+    with stage("incoming_call.speaker_lookup"):
+        devices = await device_cache.get_speakers_by_msisdn(session, to_msisdn)
+    if not devices:
+        await record_event(
             session,
             event_kind="incoming_call_notify",
             result="failure",
@@ -33,40 +54,177 @@ async def on_incoming_call(
         )
         return {"notified": False, "device_id": None, "error": "no_speaker_for_msisdn"}
 
-    if not device.endpoint:
-        await event_log_repo.create(
+    targets = [d for d in devices if d.endpoint or speaker_push.connected(d.device_id)]
+    if not targets:
+        await record_event(
             session,
             event_kind="incoming_call_notify",
             result="failure",
-            device_id=device.device_id,
+            device_id=devices[0].device_id,
             details={"reason": "no_endpoint"},
         )
-        return {"notified": False, "device_id": device.device_id, "error": "no_endpoint"}
+        return {"notified": False, "device_id": devices[0].device_id, "error": "no_endpoint"}
 
     payload = {"event": "incoming_call", "from_cli": from_cli, "call_id": call_id}
+    pending = {asyncio.create_task(_notify_device(d.device_id, d.endpoint, payload)) for d in targets}
+    outcomes: list[dict[str, Any]] = []
+    ack = None
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.post(device.endpoint, json=payload)
-            success = 200 <= r.status_code < 300
-            await event_log_repo.create(
-                session,
-                event_kind="incoming_call_notify",
-                result="success" if success else "failure",
-                device_id=device.device_id,
-                call_id=call_id,
-                details={"status_code": r.status_code, "response": r.text[:500] if r.text else None},
-            )
-            if not success:
-                return {"notified": False, "device_id": device.device_id, "error": r.text}
-            return {"notified": True, "device_id": device.device_id, "error": None}
-    except Exception as e:
-        logger.exception("Notify speaker failed")
-        await event_log_repo.create(
-            session,
-            event_kind="incoming_call_notify",
-            result="failure",
-            device_id=device.device_id,
-            call_id=call_id,
-            details={"error": str(e)},
-        )
-        return {"notified": False, "device_id": device.device_id, "error": str(e)}
+        with stage("incoming_call.notify") as timer:
+            while pending and ack is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    outcomes.append(outcome)
+                    if ack is None and outcome["success"]:
+                        ack = outcome
+            if ack is None:
+                timer.outcome = "failure"
+    finally:
+        if pending:
+            _spawn(_log_in_background(pending, call_id))
+
+    await record_events(session, [_log_row(outcome, call_id) for outcome in outcomes])
+    retries = 0
+    if ack is None:
+        endpoints = {d.device_id: d.endpoint for d in targets}
+        retries = await enqueue(session, "speaker_notify", [
+            {"device_id": o["device_id"], "endpoint": endpoints[o["device_id"]], "payload": payload}
+            for o in outcomes if o["retryable"]
+        ])
+    result = {
+        "notified": ack is not None,
+        "device_id": (ack or outcomes[0])["device_id"],
+        "error": None if ack else outcomes[0]["error"],
+        "devices": [{k: v for k, v in o.items() if k not in ("details", "retryable")} for o in outcomes],
+        "retries_scheduled": retries,
+    }
+    if pending:
+        result["pending"] = len(pending)
+    return result
+
+
+async def retry_notification(item: dict[str, Any]) -> Attempt:
+    """Outbox handler for "speaker_notify" items."""
+    outcome = await _notify_device(item["device_id"], item["endpoint"], item["payload"])
+    log = _log_row(outcome, item["payload"].get("call_id"))
+    return Attempt(outcome["success"], outcome["error"], log, retryable=outcome["retryable"])
+
+
+async def _notify_device(device_id: str, endpoint: str | None, payload: dict) -> dict[str, Any]:
+    """
+    Push over the speaker's live connection, if any; otherwise, or if the push got no answer
+    (ack timeout, connection lost), POST to its endpoint within its own timeout and breaker.
+    A nack is the speaker's answer: it is final, with no HTTP fallback and no retry. Never raises.
+    """
+    if speaker_push.connected(device_id):
+        with stage("incoming_call.push") as timer:
+            pushed = await speaker_push.push(device_id, payload)
+            if pushed is not None and not pushed["success"]:
+                timer.outcome = "failure"
+        if pushed is not None and (pushed["success"] or pushed["nacked"] or not endpoint):
+            success, error = pushed["success"], pushed["error"]
+            details = {"channel": "push"} if success else {"channel": "push", "error": error}
+            return _outcome(device_id, success, None, error, details, retryable=not success and not pushed["nacked"])
+        if pushed is not None:
+            SPEAKER_PUSH_FALLBACKS.inc()
+    if not endpoint:
+        # push-only speaker that is not connected; it may be by the time of a retry
+        return _outcome(device_id, False, None, "not_connected", {"reason": "not_connected"}, retryable=True)
+    if not speaker_breakers.allow(endpoint):
+        return _outcome(device_id, False, None, "circuit_open", {"reason": "circuit_open"}, retryable=True)
+    with stage("incoming_call.notify_device") as timer:
+        try:
+            r = await asyncio.wait_for(_hedged_post(endpoint, payload), settings.speaker_notify_timeout_seconds)
+        except Exception as e:
+            timer.outcome = "failure"
+            speaker_breakers.record(endpoint, False)
+            error = str(e) or e.__class__.__name__
+            logger.warning("Notify speaker %s failed: %s", device_id, error)
+            return _outcome(device_id, False, None, error, {"error": error}, retryable=True)
+        success = 200 <= r.status_code < 300
+        if not success:
+            timer.outcome = "failure"
+    speaker_breakers.record(endpoint, r.status_code < 500)
+    details = {"status_code": r.status_code, "response": r.text[:500] if r.text else None}
+    error = None if success else (r.text or f"HTTP {r.status_code}")
+    # other 4xx replies will not change on a retry
+    retryable = r.status_code >= 500 or r.status_code in (408, 429)
+    return _outcome(device_id, success, r.status_code, error, details, retryable=not success and retryable)
+
+
+async def _hedged_post(url: str, payload: dict) -> httpx.Response:
+    """
+    POST, and if there is no reply after SPEAKER_NOTIFY_HEDGE_AFTER_SECONDS send the same
+    request once more; the first usable reply wins and the other request is cancelled.
+    Devices see the same call_id twice in that case.
+    """
+    hedge_after = settings.speaker_notify_hedge_after_seconds
+    timeout = settings.speaker_notify_timeout_seconds
+    if hedge_after <= 0:
+        return await http_client.post(url, json=payload, read_timeout=timeout)
+    attempts = [asyncio.create_task(http_client.post(url, json=payload, read_timeout=timeout))]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_after)
+        if not done:
+            SPEAKER_HEDGES.inc()
+            attempts.append(asyncio.create_task(http_client.post(url, json=payload, read_timeout=timeout)))
+        while True:
+            done, _ = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                attempts.remove(task)
+                if task.exception() is None and task.result().status_code < 500:
+                    return task.result()
+                if not attempts:
+                    return task.result()  # raises the error of the last attempt
+    finally:
+        for task in attempts:
+            task.cancel()
+
+
+def _outcome(
+    device_id: str, success: bool, status_code: int | None, error: str | None, details: dict, retryable: bool
+) -> dict[str, Any]:
+    return {
+        "device_id": device_id,
+        "success": success,
+        "status_code": status_code,
+        "error": error,
+        "details": details,
+        "retryable": retryable,
+    }
+
+
+def _log_row(outcome: dict[str, Any], call_id: str | None) -> dict[str, Any]:
+    return {
+        "event_kind": "incoming_call_notify",
+        "result": "success" if outcome["success"] else "failure",
+        "device_id": outcome["device_id"],
+        "call_id": call_id,
+        "details": outcome["details"],
+    }
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _log_in_background(tasks: set[asyncio.Task], call_id: str) -> None:
+    outcomes = [await task for task in tasks]
+    try:
+        async with async_session_maker() as session:
+            await record_events(session, [_log_row(outcome, call_id) for outcome in outcomes])
+    except Exception:
+        logger.exception("Logging %d speaker notifications of call %s failed", len(outcomes), call_id)
+
+
+async def drain(timeout: float = 15.0) -> None:
+    """Wait for background notifications (application shutdown)."""
+    if _background:
+        await asyncio.wait(set(_background), timeout=timeout)
+
+
+def stats() -> dict:
+    return {**speaker_breakers.stats(), "background": len(_background)}
@@ -0,0 +1,129 @@
+"""Startup warmup: pooled DB connections, hot-path statements, caches and FreeSWITCH reachability."""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker, engine
+from iot_gateway.integrations import freeswitch
+from iot_gateway.repositories import device as device_repo
+from iot_gateway.repositories import rule as rule_repo
+from iot_gateway.services.device_cache import device_cache
+from iot_gateway.services.rule_index import rule_index
+
+logger = logging.getLogger(__name__)
+
+# matches no row; the lookups only need to be compiled and prepared
+_PROBE = "__warmup__"
+
+
+class Readiness:
+    """Outcome of the last warmup attempt, served by /health/ready."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.attempts = 0
+        self.checks: dict[str, dict[str, Any]] = {}
+        self.ready_at: datetime | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "ready_at": self.ready_at.isoformat() if self.ready_at else None,
+            "checks": self.checks,
+        }
+
+
+readiness = Readiness()
+
+
+async def run() -> None:
+    """Warm up, retrying every WARMUP_RETRY_SECONDS until the required checks pass, then mark ready."""
+    while True:
+        readiness.attempts += 1
+        checks: dict[str, dict[str, Any]] = {}
+        try:
+            ok = await asyncio.wait_for(_attempt(checks), timeout=settings.warmup_timeout_seconds)
+        except asyncio.TimeoutError:
+            checks["timeout"] = {"ok": False, "error": f"not finished in {settings.warmup_timeout_seconds}s"}
+            ok = False
+        # the previous attempt stays visible until this one is over
+        readiness.checks = checks
+        if ok:
+            readiness.ready = True
+            readiness.ready_at = datetime.now(timezone.utc)
+            logger.info("Warmup finished; ready")
+            return
+        logger.warning("Warmup attempt %d failed: %s", readiness.attempts, readiness.checks)
+        await asyncio.sleep(settings.warmup_retry_seconds)
+
+
+async def _attempt(checks: dict[str, dict[str, Any]]) -> bool:
+    # database first: the cache step needs it and would only fail the same way
+    ok = await _check(checks, "database", _warm_connections, required=True)
+    if ok:
+        ok = await _check(checks, "caches", _load_caches, required=True)
+    fs_ok = await _check(checks, "freeswitch", freeswitch.check, required=settings.warmup_require_freeswitch)
+    return ok and fs_ok
+
+
+async def _check(
+    checks: dict[str, dict[str, Any]], name: str, step: Callable[[], Awaitable[dict[str, Any]]], required: bool
+) -> bool:
+    started = time.monotonic()
+    try:
+        info = await step()
+        ok = info.get("reachable", True)
+    except Exception as e:
+        logger.exception("Warmup step %s failed", name)
+        info, ok = {"error": str(e) or e.__class__.__name__}, False
+    checks[name] = {"ok": ok, "required": required, "seconds": round(time.monotonic() - started, 3), **info}
+    return ok or not required
+
+
+async def _warm_connections() -> dict[str, Any]:
+    """
+    Check out WARMUP_DB_CONNECTIONS connections at the same time, so the pool really opens them,
+    and run the hot-path lookups on each: asyncpg prepares statements per connection.
+    """
+    count = max(1, min(settings.warmup_db_connections, settings.db_pool_size))
+    all_held = asyncio.Event()
+    held = 0
+
+    async def hold() -> None:
+        nonlocal held
+        try:
+            async with engine.connect() as conn:
+                await _prepare(conn)
+                held += 1
+                if held == count:
+                    all_held.set()
+                await all_held.wait()
+        finally:
+            all_held.set()  # on failure, let the others return their connections
+
+    await asyncio.gather(*(hold() for _ in range(count)))
+    return {"connections": count}
+
+
+async def _prepare(conn: AsyncConnection) -> None:
+    async with AsyncSession(bind=conn) as session:
+        await device_repo.get_by_device_id(session, _PROBE)
+        await device_repo.list_by_device_ids(session, [_PROBE])
+        await device_repo.list_speakers_by_msisdn(session, _PROBE)
+        await rule_repo.list_by_event_and_device(session, _PROBE, _PROBE)
+        await rule_repo.list_many_by_event_and_device(session, {(_PROBE, _PROBE)})
+
+
+async def _load_caches() -> dict[str, Any]:
+    async with async_session_maker() as session:
+        await rule_index.reload(session)
+        devices = 0
+        if settings.warmup_device_cache_limit > 0:
+            devices = await device_cache.preload(session, settings.warmup_device_cache_limit)
+    return {"rules": rule_index.stats()["size"], "devices": devices}
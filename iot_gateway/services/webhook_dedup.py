@@ -0,0 +1,137 @@
+"""Alarm-storm coalescing: idempotency keys and a per-(device, event_type) suppression window."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from iot_gateway.config import settings
+
+
+class DedupEntry:
+    __slots__ = ("future", "device_id", "event_type", "idempotency_key")
+
+    def __init__(self, device_id: str, event_type: str, idempotency_key: str | None) -> None:
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.device_id = device_id
+        self.event_type = event_type
+        self.idempotency_key = idempotency_key
+
+
+class _ExpiringMap:
+    """Insertion-ordered map with one TTL for all keys, so expiry is always at the front."""
+
+    def __init__(self, ttl: float, capacity: int) -> None:
+        self.ttl = ttl
+        self.capacity = capacity
+        self._data: OrderedDict[Hashable, tuple[float, DedupEntry]] = OrderedDict()
+
+    def get(self, key: Hashable) -> DedupEntry | None:
+        self._expire()
+        item = self._data.get(key)
+        return item[1] if item is not None else None
+
+    def put(self, key: Hashable, entry: DedupEntry) -> None:
+        if self.ttl <= 0 or self.capacity <= 0:
+            return
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, entry)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def discard(self, key: Hashable, entry: DedupEntry) -> None:
+        item = self._data.get(key)
+        if item is not None and item[1] is entry:
+            del self._data[key]
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class WebhookCoalescer:
+    """
+    Remembers recent webhook events so duplicates are answered from the original
+    result (awaiting it if still in flight) without touching the DB or FreeSWITCH.
+    Only successful results are remembered: a failed call can be retried at once.
+    Suppressed duplicates are counted per (device_id, event_type) and written to the
+    event log periodically from the rows returned by take_suppressed().
+    """
+
+    def __init__(self, window: float, idempotency_ttl: float, capacity: int) -> None:
+        self._by_window = _ExpiringMap(window, capacity)
+        self._by_key = _ExpiringMap(idempotency_ttl, capacity)
+        self._suppressed: dict[tuple[str, str], int] = {}
+        self.suppressed_total = 0
+
+    def lookup(self, event_type: str, device_id: str, idempotency_key: str | None) -> DedupEntry | None:
+        """Return the earlier entry this event duplicates (and count it), or None."""
+        entry = None
+        if idempotency_key:
+            entry = self._by_key.get(idempotency_key)
+        if entry is None:
+            entry = self._by_window.get((device_id, event_type))
+        if entry is not None:
+            key = (device_id, event_type)
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            self.suppressed_total += 1
+        return entry
+
+    def begin(self, event_type: str, device_id: str, idempotency_key: str | None) -> DedupEntry:
+        entry = DedupEntry(device_id, event_type, idempotency_key)
+        self._by_window.put((device_id, event_type), entry)
+        if idempotency_key:
+            self._by_key.put(idempotency_key, entry)
+        return entry
+
+    def finish(self, entry: DedupEntry, result: dict | None, exc: BaseException | None = None) -> None:
+        """Resolve waiters; failed events are forgotten so the next attempt runs again."""
+        if exc is not None or not (result or {}).get("success"):
+            self._by_window.discard((entry.device_id, entry.event_type), entry)
+            if entry.idempotency_key:
+                self._by_key.discard(entry.idempotency_key, entry)
+        if entry.future.done():
+            return
+        if exc is not None:
+            entry.future.set_exception(exc)
+            entry.future.exception()  # waiters re-raise; avoid "never retrieved" warnings
+        else:
+            entry.future.set_result(result)
+
+    @staticmethod
+    async def wait(entry: DedupEntry) -> dict:
+        result = await asyncio.shield(entry.future)
+        return {**result, "duplicate": True}
+
+    def take_suppressed(self) -> list[dict[str, Any]]:
+        """Event-log rows for duplicates counted since the previous call."""
+        counts, self._suppressed = self._suppressed, {}
+        return [
+            {
+                "event_kind": "webhook_suppressed",
+                "result": "suppressed",
+                "device_id": device_id,
+                "details": {"event_type": event_type, "count": count},
+            }
+            for (device_id, event_type), count in counts.items()
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "window_entries": len(self._by_window),
+            "idempotency_entries": len(self._by_key),
+            "suppressed": self.suppressed_total,
+        }
+
+
+webhook_coalescer = WebhookCoalescer(
+    window=settings.webhook_suppress_window_seconds,
+    idempotency_ttl=settings.webhook_idempotency_ttl_seconds,
+    capacity=settings.webhook_dedup_capacity,
+)
@@ -0,0 +1,210 @@
+"""Asynchronous webhook processing: a bounded job queue, a worker pool and an expiring job table."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+from uuid import uuid4
+
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker
+from iot_gateway.services import iot_to_telekom
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WebhookJob:
+    __slots__ = (
+        "id", "event_type", "device_id", "idempotency_key", "status",
+        "created_at", "started_at", "finished_at", "result", "error", "expires_at",
+    )
+
+    def __init__(self, event_type: str, device_id: str, idempotency_key: str | None) -> None:
+        self.id = uuid4().hex
+        self.event_type = event_type
+        self.device_id = device_id
+        self.idempotency_key = idempotency_key
+        self.status = "queued"
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.expires_at: float | None = None  # set when finished
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "event_type": self.event_type,
+            "device_id": self.device_id,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class WebhookJobQueue:
+    """
+    submit() validates capacity and queues the event; `workers` tasks run it through
+    iot_to_telekom.handle_webhook with their own DB session. Finished jobs stay readable
+    for `ttl` seconds; the table holds at most `max_jobs` entries, evicting the oldest
+    finished jobs first. Queued and running jobs are bounded by the queue size instead.
+    A repeated idempotency key returns the job already created for it, unless that job failed.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_jobs: int, ttl: float) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._jobs: OrderedDict[str, WebhookJob] = OrderedDict()
+        self._finished: OrderedDict[str, None] = OrderedDict()  # finish order, for expiry and eviction
+        self._by_key: dict[str, str] = {}
+        self.busy = 0
+        self.busy_seconds_total = 0.0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Let the workers finish what is queued (up to `timeout`), then cancel them."""
+        tasks, self._tasks = self._tasks, []
+        if not tasks:
+            return
+        for _ in tasks:
+            await self._queue.put(_STOP)
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        for task in pending:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if pending:
+            logger.error("Webhook job workers did not drain within %.1fs; %d jobs abandoned", timeout, self._queue.qsize())
+
+    def submit(self, event_type: str, device_id: str, idempotency_key: str | None = None) -> WebhookJob | None:
+        """Queue an event; returns its job (an existing one for a known idempotency key) or None when full."""
+        self._expire()
+        if idempotency_key:
+            earlier = self._jobs.get(self._by_key.get(idempotency_key, ""))
+            # like the sync path, only a pending or successful job answers a retry
+            if earlier is not None and (not earlier.finished or (earlier.result or {}).get("success")):
+                return earlier
+        if not self._tasks:
+            return None
+        job = WebhookJob(event_type, device_id, idempotency_key)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return None
+        self.submitted += 1
+        self._jobs[job.id] = job
+        if idempotency_key:
+            self._by_key[idempotency_key] = job.id
+        self._evict()
+        return job
+
+    def get(self, job_id: str) -> WebhookJob | None:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job is _STOP:
+                return
+            job.status = "running"
+            job.started_at = datetime.now(timezone.utc)
+            self.busy += 1
+            started = time.monotonic()
+            try:
+                async with async_session_maker() as session:
+                    job.result = await iot_to_telekom.handle_webhook(
+                        session, job.event_type, job.device_id, job.idempotency_key
+                    )
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "worker stopped"
+                raise
+            except Exception as e:
+                logger.exception("Webhook job %s failed", job.id)
+                job.status = "failed"
+                job.error = str(e) or e.__class__.__name__
+                self.failed += 1
+            finally:
+                self.busy -= 1
+                self.busy_seconds_total += time.monotonic() - started
+                job.finished_at = datetime.now(timezone.utc)
+                job.expires_at = time.monotonic() + self.ttl
+                self._finished[job.id] = None
+
+    def _forget(self, job_id: str) -> None:
+        job = self._jobs.pop(job_id, None)
+        if job is not None and job.idempotency_key and self._by_key.get(job.idempotency_key) == job_id:
+            del self._by_key[job.idempotency_key]
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._finished:
+            job_id = next(iter(self._finished))
+            job = self._jobs.get(job_id)
+            if job is not None and job.expires_at > now:
+                break
+            del self._finished[job_id]
+            self._forget(job_id)
+
+    def _evict(self) -> None:
+        while len(self._jobs) > self.max_jobs and self._finished:
+            job_id, _ = self._finished.popitem(last=False)
+            self._forget(job_id)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._tasks),
+            "busy_workers": self.busy,
+            "utilization": self.busy / len(self._tasks) if self._tasks else 0.0,
+            "busy_seconds": self.busy_seconds_total,
+            "jobs": len(self._jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+webhook_jobs = WebhookJobQueue(
+    workers=settings.webhook_job_workers,
+    max_queue=settings.webhook_job_queue_size,
+    max_jobs=settings.webhook_job_table_size,
+    ttl=settings.webhook_job_ttl_seconds,
+)
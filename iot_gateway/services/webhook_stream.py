@@ -0,0 +1,120 @@
+"""Webhook events over a persistent WebSocket: one handshake, pipelined events, one ack per message id."""
+import asyncio
+import json
+import logging
+from typing import Any
+
+from pydantic import ValidationError
+from starlette.websockets import WebSocket
+
+from iot_gateway.config import settings
+from iot_gateway.db import async_session_maker
+from iot_gateway.schemas import WebhookStreamMessage
+from iot_gateway.services import iot_to_telekom
+from iot_gateway.services.admission import Rejected, admission
+from iot_gateway.services.call_scheduler import priority_for
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookStream:
+    """
+    Serves authenticated /webhook/ws connections. Each text frame is a WebhookStreamMessage;
+    it is handled like POST /webhook (admission, coalescing, rules, calls, event log) and
+    answered with {"id", "result"} or {"id", "error", ...} as soon as it is done, so acks can
+    arrive out of order. At most `max_in_flight` events of a connection run at once; while
+    they do, no further frames are read and the client is held back by TCP flow control.
+    """
+
+    def __init__(self, max_in_flight: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.connections = 0
+        self.received = 0
+        self.acked = 0
+        self.invalid = 0
+        self.rejected = 0
+        self.failed = 0
+        self.unacked = 0
+
+    async def serve(self, websocket: WebSocket, api_key: str) -> None:
+        """Read frames until the client disconnects; events already started are finished (their acks dropped)."""
+        slots = asyncio.Semaphore(self.max_in_flight)
+        send_lock = asyncio.Lock()
+        running: set[asyncio.Task] = set()
+
+        def done(task: asyncio.Task) -> None:
+            running.discard(task)
+            slots.release()
+
+        self.connections += 1
+        try:
+            while True:
+                await slots.acquire()
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    slots.release()
+                    break
+                self.received += 1
+                frame = message.get("text") or message.get("bytes") or ""
+                task = asyncio.create_task(self._handle(websocket, send_lock, frame, api_key))
+                running.add(task)
+                task.add_done_callback(done)
+        finally:
+            self.connections -= 1
+            if running:
+                await asyncio.wait(set(running))
+
+    async def _handle(self, websocket: WebSocket, send_lock: asyncio.Lock, frame: str | bytes, api_key: str) -> None:
+        ack = await self._process(frame, api_key)
+        try:
+            async with send_lock:
+                await websocket.send_text(json.dumps(ack, default=str))
+            self.acked += 1
+        except Exception:
+            self.unacked += 1  # the connection is gone
+
+    async def _process(self, frame: str | bytes, api_key: str) -> dict[str, Any]:
+        try:
+            data = json.loads(frame)
+        except ValueError as e:
+            self.invalid += 1
+            return {"id": None, "error": "invalid_message", "detail": str(e)}
+        try:
+            message = WebhookStreamMessage.model_validate(data)
+        except ValidationError as e:
+            self.invalid += 1
+            message_id = data.get("id") if isinstance(data, dict) else None
+            return {"id": message_id, "error": "invalid_message", "detail": e.errors(include_url=False)}
+        try:
+            admission.limit_key(api_key)
+            admission.limit_device(message.device_id)
+            with admission.slot(priority_for(message.event_type)):
+                async with async_session_maker() as session:
+                    result = await iot_to_telekom.handle_webhook(
+                        session,
+                        event_type=message.event_type,
+                        device_id=message.device_id,
+                        idempotency_key=message.idempotency_key,
+                    )
+        except Rejected as e:
+            self.rejected += 1
+            return {"id": message.id, "error": e.reason, "status": e.status_code, "retry_after": round(e.retry_after, 3)}
+        except Exception:
+            self.failed += 1
+            logger.exception("Webhook stream event %s failed", message.id)
+            return {"id": message.id, "error": "internal_error"}
+        return {"id": message.id, "result": result}
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "received": self.received,
+            "acked": self.acked,
+            "invalid": self.invalid,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "unacked": self.unacked,
+        }
+
+
+webhook_stream = WebhookStream(max_in_flight=settings.webhook_ws_max_in_flight)
@@ -0,0 +1,275 @@
+"""Per-request tracing: span trees of request -> stages (repositories, originate, speaker POST) -> SQL statements."""
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from iot_gateway.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SQL_PREVIEW = 200  # characters of a statement kept in its span
+
+
+class Span:
+    __slots__ = ("name", "attrs", "started", "duration", "error", "children")
+
+    def __init__(self, name: str, attrs: dict[str, Any] | None = None) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration: float | None = None  # None while running
+        self.error: str | None = None
+        self.children: list[Span] = []
+
+    def finish(self, error: str | None = None) -> None:
+        self.duration = time.perf_counter() - self.started
+        self.error = error
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs = {**(self.attrs or {}), **attrs}
+
+
+class Trace:
+    """One traced request: ids for the logs, the root span, and a cap on the spans kept."""
+
+    __slots__ = ("trace_id", "request_id", "sampled", "root", "spans", "dropped")
+
+    def __init__(self, request_id: str, sampled: bool, root: Span) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.sampled = sampled
+        self.root = root
+        self.spans = 1
+        self.dropped = 0
+
+    def log_ids(self) -> dict[str, str]:
+        return {"trace_id": self.trace_id, "request_id": self.request_id}
+
+    def render(self) -> str:
+        """The span tree, one span per line: offset from the request start, duration, name, attributes."""
+        lines: list[str] = []
+        self._render(self.root, 0, lines)
+        if self.dropped:
+            lines.append(f"  ... {self.dropped} more spans not kept (TRACE_MAX_SPANS)")
+        return "\n".join(lines)
+
+    def _render(self, span: Span, depth: int, lines: list[str]) -> None:
+        offset = (span.started - self.root.started) * 1000
+        duration = f"{span.duration * 1000:9.1f}ms" if span.duration is not None else "  running"
+        line = f"{'  ' * (depth + 1)}+{offset:.1f}ms {duration} {span.name}"
+        if span.attrs:
+            line += " " + " ".join(f"{k}={v}" for k, v in span.attrs.items())
+        if span.error:
+            line += f" error={span.error}"
+        lines.append(line)
+        for child in span.children:
+            self._render(child, depth + 1, lines)
+
+
+# innermost open span of the current request (asyncio tasks inherit it); None when not traced
+_current: ContextVar[tuple[Trace, Span] | None] = ContextVar("iot_gateway_span", default=None)
+
+
+def log_ids() -> dict[str, str] | None:
+    """trace_id and request_id of the traced request being handled, for event_logs.details."""
+    current = _current.get()
+    return current[0].log_ids() if current else None
+
+
+def _child(name: str, attrs: dict[str, Any]) -> tuple[Trace, Span] | None:
+    current = _current.get()
+    if current is None:
+        return None
+    trace, parent = current
+    if trace.spans >= settings.trace_max_spans:
+        trace.dropped += 1
+        return None
+    trace.spans += 1
+    span = Span(name, attrs or None)
+    parent.children.append(span)
+    return trace, span
+
+
+def leaf_span(name: str, **attrs: Any) -> Span | None:
+    """Open a child of the current span without making it current; the caller finishes it, from any context."""
+    child = _child(name, attrs)
+    return child[1] if child else None
+
+
+def start_span(name: str, **attrs: Any) -> tuple[Span, Token] | None:
+    """Open a child of the current span; None when the request is not traced or its span cap is reached."""
+    child = _child(name, attrs)
+    if child is None:
+        return None
+    return child[1], _current.set(child)
+
+
+def end_span(handle: tuple[Span, Token] | None, error: str | None = None) -> None:
+    if handle is None:
+        return
+    span, token = handle
+    span.finish(error)
+    _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    """Trace a block as a child span: `with span("http.post", url=url) as s: ...`; s is None when not traced."""
+    handle = start_span(name, **attrs)
+    try:
+        yield handle[0] if handle else None
+    except BaseException as e:
+        end_span(handle, e.__class__.__name__)
+        raise
+    end_span(handle)
+
+
+class Tracer:
+    """
+    Decides which HTTP requests are traced and logs their span trees when they end. A share
+    `sample_rate` of requests is traced and logged at INFO. With `slow_threshold` set every
+    request is traced, and those taking longer are logged at WARNING with the whole tree.
+    Requests that are not traced pay one random() call and a context-variable lookup per stage.
+    """
+
+    def __init__(self, sample_rate: float, slow_threshold: float) -> None:
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.traced = 0
+        self.sampled = 0
+        self.slow = 0
+        self.dropped_spans = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_threshold > 0
+
+    def begin(self, name: str, request_id: str | None) -> tuple[Trace, Token] | None:
+        """Start a trace for a request (None when it is not traced); pair with end()."""
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and self.slow_threshold <= 0:
+            return None
+        trace = Trace(request_id or uuid.uuid4().hex, sampled, Span(name))
+        self.traced += 1
+        return trace, _current.set((trace, trace.root))
+
+    def end(self, handle: tuple[Trace, Token], status_code: int | None) -> None:
+        trace, token = handle
+        _current.reset(token)
+        root = trace.root
+        root.finish(None if status_code is None or status_code < 500 else f"HTTP {status_code}")
+        if status_code is not None:
+            root.set(status=status_code)
+        self.dropped_spans += trace.dropped
+        slow = self.slow_threshold > 0 and root.duration >= self.slow_threshold
+        if slow:
+            self.slow += 1
+        if trace.sampled:
+            self.sampled += 1
+        if not (slow or trace.sampled):
+            return
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "%s %s %.1fms trace_id=%s request_id=%s\n%s",
+            "Slow request" if slow else "Trace",
+            root.name,
+            root.duration * 1000,
+            trace.trace_id,
+            trace.request_id,
+            trace.render(),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "slow_threshold_seconds": self.slow_threshold,
+            "traced": self.traced,
+            "sampled": self.sampled,
+            "slow": self.slow,
+            "dropped_spans": self.dropped_spans,
+        }
+
+
+tracer = Tracer(sample_rate=settings.trace_sample_rate, slow_threshold=settings.trace_slow_request_seconds)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware tracing HTTP requests chosen by the tracer. A traced request takes its
+    request id from X-Request-ID (or gets a new one) and answers with X-Request-ID and X-Trace-Id.
+    WebSocket connections are not traced: they last far longer than one request.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128] or None
+                break
+        handle = tracer.begin(f"{scope['method']} {scope['path']}", request_id)
+        if handle is None:
+            await self.app(scope, receive, send)
+            return
+        trace = handle[0]
+        status_code = None
+
+        async def send_with_ids(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", trace.request_id.encode("latin-1")))
+                headers.append((b"x-trace-id", trace.trace_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_ids)
+        finally:
+            tracer.end(handle, status_code if status_code is not None else 500)
+
+
+# SQL spans are leaves: they are not made current, so nothing depends on the context the events run in.
+# The open span is kept on the execution context, which handle_error also gets.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    child = _child("sql", {"statement": json.dumps(" ".join(statement.split())[:_SQL_PREVIEW])})
+    if child is None or context is None:
+        return
+    if executemany:
+        child[1].set(executemany=len(parameters))
+    context._trace_span = child[1]
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    sql_span = getattr(context, "_trace_span", None)
+    if sql_span is not None:
+        sql_span.finish()
+        context._trace_span = None
+
+
+def _handle_error(exception_context) -> None:
+    sql_span = getattr(exception_context.execution_context, "_trace_span", None)
+    if sql_span is not None:
+        sql_span.finish(exception_context.original_exception.__class__.__name__)
+        exception_context.execution_context._trace_span = None
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement of `engine` (the sync engine of an AsyncEngine) as a "sql" span of the traced request."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
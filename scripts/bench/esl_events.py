@@ -0,0 +1,194 @@
+"""
+Event-stream benchmark for the call tracker: a fake FreeSWITCH event socket replays synthetic
+call lifecycles (BACKGROUND_JOB, CHANNEL_ANSWER, CHANNEL_HANGUP_COMPLETE) plus events of
+channels the gateway did not originate, as fast as the socket takes them. The source runs in
+its own process; dispositions go to an in-memory writer, so only the tracker is measured.
+
+    python scripts/bench/esl_events.py --calls 50000 --noise 1.0
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from iot_gateway.integrations.esl import ESLClient
+from iot_gateway.services.call_tracker import CallTracker
+
+PASSWORD = "ClueCon"
+
+
+def call_ids(seed: int, count: int) -> list[str]:
+    rnd = random.Random(seed)
+    return [str(uuid.UUID(int=rnd.getrandbits(128), version=4)) for _ in range(count)]
+
+
+def _frame(headers: dict[str, str], body: str = "") -> bytes:
+    event = "".join(f"{name}: {quote(value, safe=' :/-+.')}\n" for name, value in headers.items())
+    if body:
+        event += f"Content-Length: {len(body)}\n\n{body}"
+    else:
+        event += "\n"
+    return f"Content-Length: {len(event)}\nContent-Type: text/event-plain\n\n{event}".encode()
+
+
+def build_stream(seed: int, calls: int, noise: float, answer_rate: float, error_rate: float) -> list[bytes]:
+    """Encoded frames in arrival order; calls overlap because their events are interleaved."""
+    rnd = random.Random(seed + 1)
+    now = int(time.time() * 1_000_000)
+    per_call = []
+    for call_id in call_ids(seed, calls):
+        common = {"Unique-ID": call_id, "Event-Date-Timestamp": str(now)}
+        if rnd.random() < error_rate:
+            per_call.append([_frame(
+                {"Event-Name": "BACKGROUND_JOB", "Job-UUID": call_id, "Event-Date-Timestamp": str(now)},
+                "-ERR USER_BUSY\n",
+            )])
+            continue
+        frames = [_frame(
+            {"Event-Name": "BACKGROUND_JOB", "Job-UUID": call_id, "Event-Date-Timestamp": str(now)},
+            f"+OK {call_id}\n",
+        )]
+        answered = rnd.random() < answer_rate
+        if answered:
+            frames.append(_frame({"Event-Name": "CHANNEL_ANSWER", **common}))
+        frames.append(_frame({
+            "Event-Name": "CHANNEL_HANGUP_COMPLETE",
+            **common,
+            "Hangup-Cause": "NORMAL_CLEARING" if answered else "NO_ANSWER",
+            "variable_billsec": str(rnd.randint(1, 60) if answered else 0),
+            "Caller-Destination-Number": "+79990000000",
+        }))
+        per_call.append(frames)
+    for _ in range(int(calls * noise)):
+        other = {"Unique-ID": str(uuid.uuid4()), "Event-Date-Timestamp": str(now)}
+        per_call.append([
+            _frame({"Event-Name": "CHANNEL_ANSWER", **other}),
+            _frame({"Event-Name": "CHANNEL_HANGUP_COMPLETE", **other, "Hangup-Cause": "NORMAL_CLEARING"}),
+        ])
+    rnd.shuffle(per_call)
+    # interleave lifecycles in windows of 100 so many calls are live at once
+    stream: list[bytes] = []
+    for i in range(0, len(per_call), 100):
+        window = [list(frames) for frames in per_call[i:i + 100]]
+        while window:
+            for frames in window:
+                stream.append(frames.pop(0))
+            window = [frames for frames in window if frames]
+    return stream
+
+
+async def serve_events(host: str, port: int, stream: list[bytes], ready) -> None:
+    """Answer auth and `event`, then write the whole stream to the first subscriber."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(b"Content-Type: auth/request\n\n")
+        await writer.drain()
+        try:
+            while True:
+                command = (await reader.readuntil(b"\n\n")).decode().strip()
+                if command.startswith("auth"):
+                    ok = command == f"auth {PASSWORD}"
+                    writer.write(f"Content-Type: command/reply\nReply-Text: {'+OK accepted' if ok else '-ERR invalid'}\n\n".encode())
+                elif command.startswith("event"):
+                    writer.write(b"Content-Type: command/reply\nReply-Text: +OK event listener enabled plain\n\n")
+                    for i in range(0, len(stream), 1000):
+                        writer.write(b"".join(stream[i:i + 1000]))
+                        await writer.drain()
+                else:
+                    writer.write(b"Content-Type: command/reply\nReply-Text: +OK\n\n")
+                    if command == "exit":
+                        break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def _source_process(host: str, port: int, args: argparse.Namespace, ready) -> None:
+    stream = build_stream(args.seed, args.calls, args.noise, args.answer_rate, args.error_rate)
+    asyncio.run(serve_events(host, port, stream, ready))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    # frames per call: 1 for errors, 2-3 otherwise; noise channels add 2 each
+    expected_events = len(build_stream(args.seed, args.calls, args.noise, args.answer_rate, args.error_rate))
+    ready = multiprocessing.Event()
+    source = multiprocessing.Process(
+        target=_source_process, args=(args.host, args.port, args, ready), daemon=True
+    )
+    source.start()
+    try:
+        if not ready.wait(60):
+            raise RuntimeError("event source did not start")
+        written: dict[str, dict] = {}
+
+        async def writer(items, since):
+            for call_id, disposition in items:
+                written[call_id] = disposition
+            return {call_id for call_id, _ in items}
+
+        tracker = CallTracker(
+            max_calls=args.calls, ttl=3600, batch_size=args.batch_size, flush_interval=0.2, writer=writer
+        )
+        for call_id in call_ids(args.seed, args.calls):
+            tracker.track(call_id, "+79990000000")
+        client = ESLClient(args.host, args.port, PASSWORD)
+        started = time.perf_counter()
+        await tracker.start(client)
+        while tracker.events < expected_events:
+            if time.perf_counter() - started > args.timeout:
+                break
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        await tracker.stop()
+    finally:
+        source.terminate()
+        source.join()
+
+    states: dict[str, int] = {}
+    for disposition in written.values():
+        states[disposition["state"]] = states.get(disposition["state"], 0) + 1
+    return {
+        "calls": args.calls,
+        "events_expected": expected_events,
+        "events": tracker.events,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(tracker.events / elapsed, 1) if elapsed else None,
+        "dispositions": states,
+        "live_calls_left": tracker.stats()["live_calls"],
+        "ignored": tracker.ignored,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Call tracker event-stream benchmark")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=18022)
+    p.add_argument("--calls", type=int, default=50000)
+    p.add_argument("--noise", type=float, default=1.0, help="foreign channels per tracked call")
+    p.add_argument("--answer-rate", type=float, default=0.7)
+    p.add_argument("--error-rate", type=float, default=0.05, help="share of originates failing with -ERR")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--timeout", type=float, default=120.0)
+    args = p.parse_args()
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Local stand-ins for the benchmark: FreeSWITCH (REST and ESL) and the speaker endpoint.
+run.py starts this module as a separate process so the fakes do not share an event loop
+with the load generator; GET /_stats on the speaker port returns request/error counts.
+"""
+import argparse
+import asyncio
+import random
+import signal
+import uuid
+from urllib.parse import quote
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+class Behaviour:
+    """Latency (mean + uniform jitter, seconds) and error rate of a fake endpoint."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+
+    async def delay(self) -> None:
+        seconds = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def fail(self) -> bool:
+        self.requests += 1
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+def freeswitch_rest_app(behaviour: Behaviour) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/originate")
+    async def originate(request: Request):
+        await request.body()
+        await behaviour.delay()
+        if behaviour.fail():
+            return Response("-ERR NORMAL_TEMPORARY_FAILURE", status_code=500)
+        return JSONResponse({"uuid": str(uuid.uuid4())})
+
+    return app
+
+
+def speaker_app(behaviour: Behaviour, stats: dict[str, Behaviour] | None = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/_stats")
+    async def get_stats():
+        return {name: b.stats() for name, b in (stats or {"speaker": behaviour}).items()}
+
+    @app.post("/{path:path}")
+    async def notify(request: Request, path: str):
+        await request.body()
+        await behaviour.delay()
+        if behaviour.fail():
+            return Response("speaker error", status_code=503)
+        return JSONResponse({"ok": True})
+
+    return app
+
+
+class FakeESLServer:
+    """
+    Answers auth, `event` and `bgapi` like FreeSWITCH mod_event_socket; events are only sent
+    when emit() is called. Accepted connections and received bgapi commands are recorded for
+    tests; port 0 picks a free port.
+    """
+
+    def __init__(self, behaviour: Behaviour, password: str = "ClueCon") -> None:
+        self.behaviour = behaviour
+        self.password = password
+        self.port = 0
+        self.connections = 0
+        self.bgapi: list[tuple[str, str | None]] = []  # (command, Job-UUID header)
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._subscribers: dict[asyncio.StreamWriter, asyncio.Lock] = {}  # connections that sent `event plain`
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self.drop_connections()
+            await self._server.wait_closed()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def emit(self, headers: dict[str, str], body: str = "") -> None:
+        """Send one text/event-plain event (URL-encoded headers, optional body) to every subscriber."""
+        event = "".join(f"{name}: {quote(value, safe=' :/-+.')}\n" for name, value in headers.items())
+        event += f"Content-Length: {len(body)}\n\n{body}" if body else "\n"
+        frame = f"Content-Length: {len(event)}\nContent-Type: text/event-plain\n\n{event}".encode()
+        for writer, lock in list(self._subscribers.items()):
+            async with lock:
+                writer.write(frame)
+                await writer.drain()
+
+    def drop_connections(self) -> None:
+        """Close every open connection, as a FreeSWITCH restart would."""
+        self._subscribers.clear()
+        for writer in list(self._writers):
+            writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+
+        async def reply(text: str, job_uuid: str | None = None) -> None:
+            frame = f"Content-Type: command/reply\nReply-Text: {text}\n"
+            if job_uuid:
+                frame += f"Job-UUID: {job_uuid}\n"
+            async with lock:
+                writer.write((frame + "\n").encode())
+                await writer.drain()
+
+        async def bgapi(job_uuid: str) -> None:
+            # FreeSWITCH replies to bgapi at once; the originate itself runs in the background
+            if self.behaviour.fail():
+                await reply("-ERR command failed", job_uuid)
+                return
+            await reply(f"+OK Job-UUID: {job_uuid}", job_uuid)
+
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            writer.write(b"Content-Type: auth/request\n\n")
+            await writer.drain()
+            auth = (await reader.readuntil(b"\n\n")).decode().strip()
+            if auth != f"auth {self.password}":
+                await reply("-ERR invalid")
+                return
+            await reply("+OK accepted")
+            while True:
+                lines = (await reader.readuntil(b"\n\n")).decode().strip().split("\n")
+                command = lines[0]
+                headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+                if command.startswith("bgapi"):
+                    self.bgapi.append((command, headers.get("Job-UUID")))
+                    await self.behaviour.delay()
+                    await bgapi(headers.get("Job-UUID") or str(uuid.uuid4()))
+                elif command.startswith("event"):
+                    await reply("+OK event listener enabled plain")
+                    self._subscribers[writer] = lock
+                elif command == "exit":
+                    await reply("+OK bye")
+                    return
+                else:
+                    await reply("+OK")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._subscribers.pop(writer, None)
+            writer.close()
+
+
+async def serve_app(app: FastAPI, host: str, port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def main() -> None:
+    p = argparse.ArgumentParser(description="Fake FreeSWITCH and speaker endpoints")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--freeswitch", choices=("rest", "esl"), default="rest")
+    p.add_argument("--fs-port", type=int, default=18021)
+    p.add_argument("--fs-latency-ms", type=float, default=0.0)
+    p.add_argument("--fs-jitter-ms", type=float, default=0.0)
+    p.add_argument("--fs-error-rate", type=float, default=0.0)
+    p.add_argument("--speaker-port", type=int, default=18090)
+    p.add_argument("--speaker-latency-ms", type=float, default=0.0)
+    p.add_argument("--speaker-jitter-ms", type=float, default=0.0)
+    p.add_argument("--speaker-error-rate", type=float, default=0.0)
+    args = p.parse_args()
+
+    fs = Behaviour(args.fs_latency_ms / 1000, args.fs_jitter_ms / 1000, args.fs_error_rate)
+    speaker = Behaviour(args.speaker_latency_ms / 1000, args.speaker_jitter_ms / 1000, args.speaker_error_rate)
+    servers = []
+    esl = None
+    if args.freeswitch == "rest":
+        servers.append(await serve_app(freeswitch_rest_app(fs), args.host, args.fs_port))
+    else:
+        esl = FakeESLServer(fs)
+        await esl.start(args.host, args.fs_port)
+    servers.append(
+        await serve_app(speaker_app(speaker, {"freeswitch": fs, "speaker": speaker}), args.host, args.speaker_port)
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    for server, task in servers:
+        server.should_exit = True
+        await task
+    if esl is not None:
+        await esl.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Response serialization benchmark: GET /devices and GET /logs through the ASGI app with the
+default path (ORM objects -> pydantic -> response_model -> json) and with FAST_JSON_RESPONSES
+(row mappings -> orjson or stdlib json). Repositories are replaced by in-memory data, so the
+numbers cover serialization only, not the database; both paths must return identical bodies.
+
+    python scripts/bench/serialization.py --devices 10000 --logs 10000 --rounds 5
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from iot_gateway import serialization  # noqa: E402
+from iot_gateway.config import settings  # noqa: E402
+from iot_gateway.db import get_db  # noqa: E402
+from iot_gateway.main import app  # noqa: E402
+from iot_gateway.models import Device, EventLog  # noqa: E402
+from iot_gateway.repositories import device as device_repo  # noqa: E402
+from iot_gateway.repositories import event_log as event_log_repo  # noqa: E402
+
+LOG_PAGE = 500  # GET /logs maximum page size
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--devices", type=int, default=10000, help="devices returned by one GET /devices")
+    p.add_argument("--logs", type=int, default=10000, help=f"log rows, read as pages of {LOG_PAGE}")
+    p.add_argument("--rounds", type=int, default=5, help="measured rounds per path (median reported)")
+    p.add_argument("--no-orjson", action="store_true", help="measure the fast path with the stdlib encoder")
+    return p.parse_args()
+
+
+def device_rows(n: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": i + 1,
+            "device_id": f"speaker-{i:06d}",
+            "type": "speaker",
+            "msisdn": f"+7900{i:07d}",
+            "subscriber_id": f"sub-{i}",
+            "vendor": "acme",
+            "endpoint": f"http://speakers.local/notify/{i}",
+            "metadata": {"room": "kitchen", "fw": "1.2.3"},
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def log_rows(n: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": n - i,
+            "event_kind": "smoke_trigger_call",
+            "device_id": f"sensor-{i % 1000:06d}",
+            "rule_id": i % 1000,
+            "call_id": f"call-{i}",
+            "target_number": "+79001234567",
+            "result": "success",
+            "details": {"success": True, "call_id": f"call-{i}", "job_uuid": "0b7f6c1e-3c2a-4a7e-9d3e-000000000000"},
+            "created_at": now - timedelta(milliseconds=i),
+        }
+        for i in range(n)
+    ]
+
+
+def install(devices: list[dict], logs: list[dict]) -> None:
+    device_models = [Device(**{("metadata_" if k == "metadata" else k): v for k, v in row.items()}) for row in devices]
+    log_models = [EventLog(**row) for row in logs]
+
+    async def no_db():
+        yield None
+
+    async def list_all(session):
+        return device_models
+
+    async def list_rows(session, limit=None, after_id=None, msisdn=None):
+        return devices
+
+    # position after each possible cursor; logs are newest first, like the repository
+    after = {(row["created_at"], row["id"]): i + 1 for i, row in enumerate(logs)}
+
+    async def list_page(session, limit=50, before=None, **filters):
+        start = after[before] if before else 0
+        return log_models[start:start + limit]
+
+    async def list_page_rows(session, limit=50, before=None, **filters):
+        start = after[before] if before else 0
+        return logs[start:start + limit]
+
+    app.dependency_overrides[get_db] = no_db
+    device_repo.list_all = list_all
+    device_repo.list_rows = list_rows
+    event_log_repo.list_page = list_page
+    event_log_repo.list_page_rows = list_page_rows
+
+
+async def read_all_logs(client: httpx.AsyncClient) -> list[bytes]:
+    bodies, cursor = [], None
+    while True:
+        r = await client.get("/logs", params={"limit": LOG_PAGE, **({"cursor": cursor} if cursor else {})})
+        r.raise_for_status()
+        bodies.append(r.content)
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return bodies
+
+
+async def measure(client: httpx.AsyncClient, fast: bool, rounds: int) -> tuple[dict, list[bytes]]:
+    settings.fast_json_responses = fast
+    timings: dict[str, list[float]] = {"devices": [], "logs": []}
+    bodies: list[bytes] = []
+    for _ in range(rounds + 1):  # the first round warms up
+        started = time.perf_counter()
+        r = await client.get("/devices")
+        r.raise_for_status()
+        timings["devices"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        pages = await read_all_logs(client)
+        timings["logs"].append(time.perf_counter() - started)
+        bodies = [r.content, *pages]
+    return {name: round(statistics.median(values[1:]) * 1000, 1) for name, values in timings.items()}, bodies
+
+
+async def main() -> int:
+    args = parse_args()
+    if args.no_orjson:
+        serialization.orjson = None
+    install(device_rows(args.devices), log_rows(args.logs))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        default, default_bodies = await measure(client, False, args.rounds)
+        fast, fast_bodies = await measure(client, True, args.rounds)
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"encoder: {encoder}; devices: {args.devices}; logs: {args.logs} ({LOG_PAGE} per page)")
+    for name in ("devices", "logs"):
+        speedup = default[name] / fast[name]
+        print(f"{name:8s} default={default[name]:>8}ms fast={fast[name]:>8}ms speedup={speedup:.1f}x")
+    if default_bodies != fast_bodies:
+        print("MISMATCH: the fast path returned different bodies")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,85 @@
+-- event_logs partition management and rollup tables.
+-- Included by init_db.sql and migrate_event_logs_partitioned.sql; safe to re-run.
+-- Partitions are daily (UTC) and named event_logs_pYYYYMMDD; rows outside every
+-- partition land in event_logs_default until their partition is created.
+-- On a database whose event_logs predates partitioning only the functions and rollup
+-- tables are created; migrate_event_logs_partitioned.sql converts the table.
+
+-- Create the partition for one UTC day; returns false if it already exists.
+-- Rows already in event_logs_default for that day are moved into the new partition.
+CREATE OR REPLACE FUNCTION event_logs_create_partition(day date) RETURNS boolean AS $$
+DECLARE
+    part text := format('event_logs_p%s', to_char(day, 'YYYYMMDD'));
+    lo timestamptz := day::timestamp AT TIME ZONE 'UTC';
+    hi timestamptz := (day + 1)::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    IF EXISTS (SELECT 1 FROM event_logs_default WHERE created_at >= lo AND created_at < hi) THEN
+        EXECUTE format('CREATE TABLE %I (LIKE event_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM event_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved', lo, hi, part);
+        EXECUTE format('ALTER TABLE event_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+    ELSE
+        EXECUTE format('CREATE TABLE %I PARTITION OF event_logs FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+    END IF;
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop daily partitions whose whole day is before `before`; returns the dropped names.
+CREATE OR REPLACE FUNCTION event_logs_drop_partitions(before timestamptz) RETURNS SETOF text AS $$
+DECLARE
+    part text;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'event_logs'::regclass
+          AND c.relname ~ '^event_logs_p[0-9]{8}$'
+        ORDER BY c.relname
+    LOOP
+        IF (to_date(substr(part, 13), 'YYYYMMDD') + 1)::timestamp AT TIME ZONE 'UTC' <= before THEN
+            EXECUTE format('DROP TABLE %I', part);
+            RETURN NEXT part;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Counts per device, event_kind and result; device_id '' stands for events without a device
+CREATE TABLE IF NOT EXISTS event_log_rollup_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    device_id VARCHAR(255) NOT NULL,
+    event_kind VARCHAR(64) NOT NULL,
+    result VARCHAR(32) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (bucket, device_id, event_kind, result)
+);
+
+CREATE TABLE IF NOT EXISTS event_log_rollup_daily (
+    bucket TIMESTAMPTZ NOT NULL,
+    device_id VARCHAR(255) NOT NULL,
+    event_kind VARCHAR(64) NOT NULL,
+    result VARCHAR(32) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (bucket, device_id, event_kind, result)
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_log_rollup_hourly_device ON event_log_rollup_hourly(device_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_event_log_rollup_daily_device ON event_log_rollup_daily(device_id, bucket);
+
+-- Default partition and the partitions for today and the next days; the gateway keeps creating them ahead
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'event_logs'::regclass) THEN
+        RAISE NOTICE 'event_logs is not partitioned; run scripts/migrate_event_logs_partitioned.sql to convert it';
+        RETURN;
+    END IF;
+    CREATE TABLE IF NOT EXISTS event_logs_default PARTITION OF event_logs DEFAULT;
+    PERFORM event_logs_create_partition((now() AT TIME ZONE 'UTC')::date + n) FROM generate_series(0, 3) AS n;
+END;
+$$;
@@ -1,4 +1,4 @@
--- IoT Gateway prototype: devices, rules, event_logs
+-- IoT Gateway prototype: devices, rules, event_logs, outbox
 
 CREATE TABLE IF NOT EXISTS devices (
     id SERIAL PRIMARY KEY,
@@ -29,8 +29,11 @@ CREATE TABLE IF NOT EXISTS rules (
 
 CREATE INDEX IF NOT EXISTS idx_rules_event_device ON rules(event_type, device_id);
 
+-- Range-partitioned by day on created_at (see event_logs_partitioning.sql).
+-- An existing unpartitioned event_logs is left as it is (with a notice) and converted by
+-- migrate_event_logs_partitioned.sql.
 CREATE TABLE IF NOT EXISTS event_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     event_kind VARCHAR(64) NOT NULL,
     device_id VARCHAR(255),
     rule_id INTEGER,
@@ -38,7 +41,30 @@ CREATE TABLE IF NOT EXISTS event_logs (
     target_number VARCHAR(64),
     result VARCHAR(32) NOT NULL,
     details JSONB,
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_event_logs_created_id ON event_logs(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_event_logs_device_created_id ON event_logs(device_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_event_logs_kind_created_id ON event_logs(event_kind, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_event_logs_result_created_id ON event_logs(result, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_event_logs_call_id ON event_logs(call_id) WHERE call_id IS NOT NULL;
+
+-- Failed notifications and calls waiting for a retry; delivered items are deleted, dead ones kept.
+CREATE TABLE IF NOT EXISTS outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_event_logs_created ON event_logs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(next_attempt_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_outbox_status_id ON outbox(status, id);
+
+\ir event_logs_partitioning.sql
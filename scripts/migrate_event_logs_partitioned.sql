@@ -0,0 +1,54 @@
+-- Convert an existing unpartitioned event_logs into the daily range-partitioned table.
+-- Run once with the gateway stopped:
+--   psql -v ON_ERROR_STOP=1 -d iot_gateway -f scripts/migrate_event_logs_partitioned.sql
+-- Rows are copied day by day into their partitions inside one transaction.
+
+BEGIN;
+
+ALTER TABLE event_logs RENAME TO event_logs_legacy;
+ALTER TABLE event_logs_legacy RENAME CONSTRAINT event_logs_pkey TO event_logs_legacy_pkey;
+DROP INDEX IF EXISTS idx_event_logs_created;
+DROP INDEX IF EXISTS idx_event_logs_created_id;
+DROP INDEX IF EXISTS idx_event_logs_device_created_id;
+DROP INDEX IF EXISTS idx_event_logs_kind_created_id;
+DROP INDEX IF EXISTS idx_event_logs_result_created_id;
+DROP INDEX IF EXISTS idx_event_logs_call_id;
+
+CREATE TABLE event_logs (
+    id INTEGER NOT NULL DEFAULT nextval('event_logs_id_seq'),
+    event_kind VARCHAR(64) NOT NULL,
+    device_id VARCHAR(255),
+    rule_id INTEGER,
+    call_id VARCHAR(255),
+    target_number VARCHAR(64),
+    result VARCHAR(32) NOT NULL,
+    details JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- keep the id sequence when the legacy table is dropped
+ALTER SEQUENCE event_logs_id_seq OWNED BY event_logs.id;
+
+CREATE INDEX idx_event_logs_created_id ON event_logs(created_at, id);
+CREATE INDEX idx_event_logs_device_created_id ON event_logs(device_id, created_at, id);
+CREATE INDEX idx_event_logs_kind_created_id ON event_logs(event_kind, created_at, id);
+CREATE INDEX idx_event_logs_result_created_id ON event_logs(result, created_at, id);
+CREATE INDEX idx_event_logs_call_id ON event_logs(call_id) WHERE call_id IS NOT NULL;
+
+\ir event_logs_partitioning.sql
+
+SELECT event_logs_create_partition(day::date)
+FROM generate_series(
+    (SELECT min(created_at) AT TIME ZONE 'UTC' FROM event_logs_legacy)::date,
+    (SELECT max(created_at) AT TIME ZONE 'UTC' FROM event_logs_legacy)::date,
+    interval '1 day'
+) AS day;
+
+INSERT INTO event_logs (id, event_kind, device_id, rule_id, call_id, target_number, result, details, created_at)
+SELECT id, event_kind, device_id, rule_id, call_id, target_number, result, details, COALESCE(created_at, NOW())
+FROM event_logs_legacy;
+
+DROP TABLE event_logs_legacy;
+
+COMMIT;
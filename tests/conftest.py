@@ -0,0 +1,13 @@
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+# the fakes of the load-test harness double as test servers
+sys.path.insert(0, str(ROOT / "scripts" / "bench"))
+sys.path.insert(0, str(ROOT))
+
+
+def run(coro, timeout: float = 10):
+    """Run a test scenario on a fresh event loop; a hung scenario fails after `timeout` seconds."""
+    return asyncio.run(asyncio.wait_for(coro, timeout=timeout))
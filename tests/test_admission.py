@@ -0,0 +1,67 @@
+"""In-flight admission of single events and batches."""
+import pytest
+from fastapi.testclient import TestClient
+
+from iot_gateway import main
+from iot_gateway.config import settings
+from iot_gateway.services.admission import AdmissionController, Rejected
+from iot_gateway.services.call_scheduler import PRIORITY_LIFE_SAFETY, PRIORITY_NORMAL
+
+
+def controller(max_in_flight: int = 10, life_safety_reserve: int = 5) -> AdmissionController:
+    return AdmissionController(
+        key_rate=0, key_burst=0, device_rate=0, device_burst=0, max_keys=100,
+        max_in_flight=max_in_flight, life_safety_reserve=life_safety_reserve,
+        shed_pool_utilization=0, shed_call_queue_depth=0, retry_after=1.0,
+        pool_utilization=lambda: 0.0, call_queue_depth=lambda: 0,
+    )
+
+
+def test_batch_is_charged_per_event():
+    admission = controller()
+    with admission.slot(PRIORITY_NORMAL, 8):
+        assert admission.in_flight == 8
+        with pytest.raises(Rejected):
+            with admission.slot(PRIORITY_NORMAL, 3):
+                pass
+        # life-safety events may use the reserve on top of the cap
+        with admission.slot(PRIORITY_LIFE_SAFETY, 7):
+            assert admission.in_flight == 15
+    assert admission.in_flight == 0
+    assert admission.rejected["in_flight"] == 1
+
+
+def test_batch_larger_than_the_cap_runs_when_idle():
+    admission = controller()
+    with admission.slot(PRIORITY_NORMAL, 50):
+        assert admission.in_flight == 10
+    assert admission.in_flight == 0
+
+
+def test_overloaded_batch_keeps_life_safety_events(monkeypatch):
+    handled = []
+
+    async def handle_webhook_batch(session, events):
+        handled.extend(events)
+        return [{"success": True, "event_type": event_type} for event_type, _, _ in events]
+
+    monkeypatch.setattr(main.iot_to_telekom_svc, "handle_webhook_batch", handle_webhook_batch)
+    monkeypatch.setattr(main, "admission", controller(max_in_flight=2))
+    main.admission.in_flight = 2  # ordinary traffic has taken every slot
+    body = [
+        {"event_type": "motion", "device_id": "dev-1"},
+        {"event_type": "smoke", "device_id": "dev-2"},
+        {"event_type": "motion", "device_id": "dev-3"},
+    ]
+    client = TestClient(main.app)
+    response = client.post("/webhook/batch", json=body, headers={"X-API-Key": settings.webhook_api_key})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r.get("error") for r in results] == ["overloaded", None, "overloaded"]
+    assert results[1]["event_type"] == "smoke"
+    assert [event_type for event_type, _, _ in handled] == ["smoke"]
+
+    only_normal = [{"event_type": "motion", "device_id": "dev-1"}]
+    response = client.post("/webhook/batch", json=only_normal, headers={"X-API-Key": settings.webhook_api_key})
+    assert response.status_code == 503
+    assert main.admission.in_flight == 2
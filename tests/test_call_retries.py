@@ -0,0 +1,71 @@
+"""Which failed webhook calls are queued in the outbox, and how their retries are placed."""
+from conftest import run
+from iot_gateway.services import iot_to_telekom
+
+
+def call(call_id: str, success: bool, **call_result) -> dict:
+    return {
+        "rule_id": 1,
+        "target": "1000",
+        "call_id": call_id,
+        "success": success,
+        "call_result": {"success": success, "call_id": call_id if success else None, **call_result},
+    }
+
+
+def test_calls_with_unknown_outcome_are_not_retried(monkeypatch):
+    enqueued = []
+
+    async def enqueue(session, kind, payloads):
+        enqueued.extend(payloads)
+        return len(payloads)
+
+    monkeypatch.setattr(iot_to_telekom, "enqueue", enqueue)
+    calls = [
+        call("placed", True),
+        call("refused", False, error="-ERR USER_BUSY"),
+        call("queued", False, error="queue_timeout"),
+        call("sent", False, error="timeout", outcome_unknown=True),
+    ]
+    run(iot_to_telekom._schedule_retries(None, [("smoke", "dev-1", {"calls": calls})]))
+    assert [payload["call_id"] for payload in enqueued] == ["refused", "queued"]
+    assert enqueued[0] == {
+        "event_type": "smoke", "device_id": "dev-1", "rule_id": 1, "target": "1000", "call_id": "refused"
+    }
+    assert [c.get("retry_scheduled", False) for c in calls] == [False, True, True, False]
+
+
+def test_retry_reuses_call_id_and_stops_on_unknown_outcome(monkeypatch):
+    placed = []
+
+    async def originate(target, priority=None, timeout=None, **kwargs):
+        placed.append(kwargs["call_id"])
+        return {"success": False, "call_id": None, "error": "timeout", "outcome_unknown": True}
+
+    monkeypatch.setattr(iot_to_telekom.rule_index, "loaded", False)
+    monkeypatch.setattr(iot_to_telekom.call_scheduler, "originate", originate)
+    item = {"event_type": "smoke", "device_id": "dev-1", "rule_id": 1, "target": "1000", "call_id": "call-1"}
+    attempt = run(iot_to_telekom.retry_call(item))
+    assert placed == ["call-1"]
+    assert not attempt.success and not attempt.retryable
+
+
+def test_response_and_log_row_share_the_call_id(monkeypatch):
+    class Rule:
+        id = 1
+        target = "1000"
+        action_type = "call"
+
+    results = iter([
+        {"success": False, "call_id": None, "error": "-ERR USER_BUSY"},
+        {"success": True, "call_id": "fs-uuid", "error": None},
+    ])
+
+    async def originate(target, priority=None, timeout=None, **kwargs):
+        return next(results)
+
+    monkeypatch.setattr(iot_to_telekom.call_scheduler, "originate", originate)
+    result, log_rows = run(iot_to_telekom._run_rules("smoke", "dev-1", object(), [Rule(), Rule()]))
+    failed, placed = result["calls"]
+    assert failed["call_id"] and failed["call_id"] == log_rows[0]["call_id"]
+    assert placed["call_id"] == log_rows[1]["call_id"] == "fs-uuid"
@@ -0,0 +1,128 @@
+"""CallScheduler dispatch order under the global CPS limit, caller timeouts and tracing."""
+import asyncio
+
+from conftest import run
+from iot_gateway import tracing
+from iot_gateway.integrations import freeswitch
+from iot_gateway.services.call_scheduler import PRIORITY_LIFE_SAFETY, PRIORITY_NORMAL, CallScheduler
+
+
+def record_originates(monkeypatch) -> list[str]:
+    placed: list[str] = []
+
+    async def originate(target, **kwargs):
+        placed.append(target)
+        return {"success": True, "call_id": f"call-{target}", "error": None}
+
+    monkeypatch.setattr(freeswitch, "originate", originate)
+    return placed
+
+
+def scheduler(concurrency: int = 50, global_cps: float = 20.0) -> CallScheduler:
+    return CallScheduler(concurrency, global_cps=global_cps, global_burst=1, target_cps=0, target_burst=1)
+
+
+def test_life_safety_call_overtakes_queued_calls_while_cps_limited(monkeypatch):
+    placed = record_originates(monkeypatch)
+
+    async def scenario():
+        calls = scheduler()
+        await calls.start()
+        try:
+            normal = [asyncio.create_task(calls.originate(f"n{i}", priority=PRIORITY_NORMAL)) for i in range(5)]
+            await asyncio.sleep(0.01)  # n0 took the only token; the rest wait for the next one
+            alarm = asyncio.create_task(calls.originate("ALARM", priority=PRIORITY_LIFE_SAFETY))
+            await asyncio.gather(alarm, *normal)
+        finally:
+            await calls.stop()
+
+    run(scenario())
+    assert placed == ["n0", "ALARM", "n1", "n2", "n3", "n4"]
+
+
+def test_same_priority_is_first_in_first_out(monkeypatch):
+    placed = record_originates(monkeypatch)
+
+    async def scenario():
+        calls = scheduler(concurrency=3, global_cps=100.0)
+        await calls.start()
+        try:
+            await asyncio.gather(*(calls.originate(f"c{i}") for i in range(6)))
+        finally:
+            await calls.stop()
+
+    run(scenario())
+    assert placed == [f"c{i}" for i in range(6)]
+
+
+def test_call_still_queued_at_the_timeout_is_dropped(monkeypatch):
+    placed = record_originates(monkeypatch)
+
+    async def scenario():
+        calls = scheduler(global_cps=5.0)
+        await calls.start()
+        try:
+            first = await calls.originate("first", timeout=1.0)
+            late = await calls.originate("late", timeout=0.05)  # the next token is 0.2s away
+            await asyncio.sleep(0.4)
+        finally:
+            await calls.stop()
+        return first, late, calls.stats()
+
+    first, late, stats = run(scenario())
+    assert first["success"]
+    assert late == {"success": False, "call_id": None, "error": "queue_timeout"}
+    assert placed == ["first"]
+    assert stats["expired"] == 1
+
+
+def test_timeout_after_dispatch_reports_unknown_outcome(monkeypatch):
+    placed = record_originates(monkeypatch)
+    record = freeswitch.originate
+
+    async def slow_originate(target, **kwargs):
+        await asyncio.sleep(0.2)
+        return await record(target, **kwargs)
+
+    monkeypatch.setattr(freeswitch, "originate", slow_originate)
+
+    async def scenario():
+        calls = scheduler()
+        await calls.start()
+        try:
+            result = await calls.originate("slow", timeout=0.05)
+            await asyncio.sleep(0.3)
+        finally:
+            await calls.stop()
+        return result
+
+    result = run(scenario())
+    assert result["error"] == "timeout" and result["outcome_unknown"]
+    assert placed == ["slow"]
+
+
+def test_originate_is_traced_under_the_callers_request(monkeypatch):
+    async def originate(target, **kwargs):
+        with tracing.span("freeswitch.originate_esl"):
+            return {"success": True, "call_id": tracing.log_ids()["request_id"], "error": None}
+
+    monkeypatch.setattr(freeswitch, "originate", originate)
+    tracer = tracing.Tracer(sample_rate=0, slow_threshold=60)
+
+    async def scenario():
+        calls = scheduler(global_cps=0)
+        await calls.start()
+        handle = tracer.begin("POST /webhook", "req-1")
+        try:
+            result = await calls.originate("1000", priority=PRIORITY_LIFE_SAFETY)
+        finally:
+            tracer.end(handle, 200)
+            await calls.stop()
+        return result, handle[0].root
+
+    result, root = run(scenario())
+    assert result["call_id"] == "req-1"
+    assert [child.name for child in root.children] == ["scheduler.wait", "freeswitch.originate_esl"]
+    wait, placed = root.children
+    assert wait.attrs == {"priority": PRIORITY_LIFE_SAFETY}
+    assert wait.duration is not None and placed.duration is not None
@@ -0,0 +1,165 @@
+"""CallTracker fed by the fake mod_event_socket server: calls are originated and their events emitted over ESL."""
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from conftest import run
+from fakes import Behaviour, FakeESLServer
+from iot_gateway.config import settings
+from iot_gateway.integrations import freeswitch
+from iot_gateway.integrations.esl import ESLClient
+from iot_gateway.services.call_tracker import CallTracker
+
+T0 = 1_760_000_000_000_000  # Event-Date-Timestamp, microseconds
+
+
+class RecordingWriter:
+    """In-memory DispositionWriter; rows listed in `missing` are reported as not in event_logs yet."""
+
+    def __init__(self, missing: set[str] | None = None) -> None:
+        self.written: dict[str, dict[str, Any]] = {}
+        self.missing = missing or set()
+        self.calls = 0
+
+    async def __call__(self, items: list[tuple[str, dict[str, Any]]], since: datetime) -> set[str]:
+        self.calls += 1
+        updated = set()
+        for call_id, disposition in items:
+            if call_id in self.missing:
+                self.missing.discard(call_id)
+                continue
+            self.written[call_id] = disposition
+            updated.add(call_id)
+        return updated
+
+
+async def wait_until(condition) -> None:
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+async def start(monkeypatch, writer: RecordingWriter, ttl: float = 60) -> tuple[FakeESLServer, CallTracker]:
+    server = FakeESLServer(Behaviour())
+    await server.start("127.0.0.1", 0)
+    monkeypatch.setattr(settings, "freeswitch_rest_url", None)
+    monkeypatch.setattr(settings, "freeswitch_mock", False)
+    monkeypatch.setattr(settings, "freeswitch_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "freeswitch_port", server.port)
+    tracker = CallTracker(max_calls=100, ttl=ttl, batch_size=10, flush_interval=0.05, writer=writer)
+    client = ESLClient("127.0.0.1", server.port, "ClueCon", connect_timeout=2, command_timeout=2, reconnect_max_delay=1)
+    await tracker.start(client=client)
+    await wait_until(lambda: server.subscribers == 1)
+    return server, tracker
+
+
+async def stop(server: FakeESLServer, tracker: CallTracker) -> None:
+    await tracker.stop()
+    await freeswitch.close()
+    await server.stop()
+
+
+async def originate(number: str) -> str:
+    result = await freeswitch.originate(number)
+    assert result["success"]
+    return result["call_id"]
+
+
+def channel_event(name: str, call_id: str, offset_seconds: int, **headers: str) -> dict[str, str]:
+    return {
+        "Event-Name": name,
+        "Unique-ID": call_id,
+        "Event-Date-Timestamp": str(T0 + offset_seconds * 1_000_000),
+        **headers,
+    }
+
+
+def test_dispositions_from_esl_events(monkeypatch):
+    async def scenario():
+        writer = RecordingWriter()
+        server, tracker = await start(monkeypatch, writer)
+        try:
+            answered, no_answer, failed = [await originate(n) for n in ("1001", "1002", "1003")]
+            await server.emit({"Event-Name": "BACKGROUND_JOB", "Job-UUID": answered}, "+OK " + answered)
+            await server.emit(channel_event("CHANNEL_ANSWER", answered, 5))
+            await server.emit(channel_event(
+                "CHANNEL_HANGUP_COMPLETE", answered, 47, **{"Hangup-Cause": "NORMAL_CLEARING", "variable_billsec": "42"},
+            ))
+            await server.emit(channel_event(
+                "CHANNEL_HANGUP_COMPLETE", no_answer, 30, **{"Hangup-Cause": "NO_ANSWER", "variable_billsec": "0"},
+            ))
+            await server.emit({"Event-Name": "BACKGROUND_JOB", "Job-UUID": failed}, "-ERR USER_BUSY\n")
+            # a channel this gateway did not originate
+            await server.emit(channel_event("CHANNEL_HANGUP_COMPLETE", "foreign", 1, **{"Hangup-Cause": "NORMAL_CLEARING"}))
+            await wait_until(lambda: len(writer.written) == 3)
+        finally:
+            await stop(server, tracker)
+        assert [job for _, job in server.bgapi] == [answered, no_answer, failed]
+        assert writer.written[answered]["state"] == "answered"
+        assert writer.written[answered]["hangup_cause"] == "NORMAL_CLEARING"
+        assert writer.written[answered]["billsec"] == 42
+        assert writer.written[answered]["answered_at"] == "2025-10-09T08:53:25+00:00"
+        assert writer.written[answered]["ended_at"] == "2025-10-09T08:54:07+00:00"
+        assert writer.written[no_answer]["state"] == "not_answered"
+        assert writer.written[no_answer]["hangup_cause"] == "NO_ANSWER"
+        assert writer.written[no_answer]["billsec"] == 0
+        assert writer.written[no_answer]["answered_at"] is None
+        assert writer.written[failed]["state"] == "failed"
+        assert writer.written[failed]["hangup_cause"] == "USER_BUSY"
+        assert writer.written[failed]["billsec"] == 0
+        stats = tracker.stats()
+        assert stats["written"] == 3
+        assert stats["ignored"] == 1  # the foreign channel
+        assert stats["live_calls"] == 0
+
+    run(scenario())
+
+
+def test_row_not_logged_yet_is_retried(monkeypatch):
+    async def scenario():
+        writer = RecordingWriter()
+        server, tracker = await start(monkeypatch, writer)
+        try:
+            call_id = await originate("1001")
+            writer.missing.add(call_id)
+            await server.emit(channel_event("CHANNEL_HANGUP_COMPLETE", call_id, 10, **{"Hangup-Cause": "NO_ANSWER"}))
+            await wait_until(lambda: call_id in writer.written)
+        finally:
+            await stop(server, tracker)
+        assert writer.calls >= 2
+        assert tracker.stats()["written"] == 1
+        assert tracker.stats()["unmatched"] == 0
+
+    run(scenario())
+
+
+def test_events_after_ttl_are_ignored(monkeypatch):
+    async def scenario():
+        writer = RecordingWriter()
+        server, tracker = await start(monkeypatch, writer, ttl=0.05)
+        try:
+            call_id = await originate("1001")
+            await wait_until(lambda: tracker.stats()["expired"] == 1)
+            await server.emit(channel_event("CHANNEL_HANGUP_COMPLETE", call_id, 120, **{"Hangup-Cause": "NORMAL_CLEARING"}))
+            await wait_until(lambda: tracker.stats()["ignored"] == 1)
+        finally:
+            await stop(server, tracker)
+        assert writer.written == {}
+
+    run(scenario())
+
+
+def test_resubscribes_after_reconnect(monkeypatch):
+    async def scenario():
+        writer = RecordingWriter()
+        server, tracker = await start(monkeypatch, writer)
+        try:
+            call_id = await originate("1001")
+            server.drop_connections()
+            await wait_until(lambda: server.subscribers == 1)
+            await server.emit(channel_event("CHANNEL_HANGUP_COMPLETE", call_id, 10, **{"Hangup-Cause": "NORMAL_CLEARING"}))
+            await wait_until(lambda: call_id in writer.written)
+        finally:
+            await stop(server, tracker)
+        assert writer.written[call_id]["hangup_cause"] == "NORMAL_CLEARING"
+
+    run(scenario())
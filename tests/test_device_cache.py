@@ -0,0 +1,31 @@
+"""DeviceCache write-through on the device endpoints."""
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from iot_gateway import main
+from iot_gateway.services.device_cache import device_cache
+
+
+def test_lookup_racing_a_delete_does_not_keep_the_device(monkeypatch):
+    row = SimpleNamespace(
+        id=1, device_id="spk-1", type="speaker", msisdn="79001234567", subscriber_id=None, vendor=None, endpoint=None
+    )
+    deleted = []
+
+    async def get_by_device_id(session, device_id):
+        return None if deleted else row
+
+    async def delete(session, device):
+        # a webhook looks the device up after the first invalidate, before the delete commits
+        assert await device_cache.get_by_device_id(session, device.device_id) is not None
+        deleted.append(device.device_id)
+
+    monkeypatch.setattr(main.device_repo, "get_by_device_id", get_by_device_id)
+    monkeypatch.setattr(main.device_repo, "delete", delete)
+    device_cache._by_device_id.clear()
+    response = TestClient(main.app).delete("/devices/spk-1")
+    assert response.status_code == 204
+    assert deleted == ["spk-1"]
+    found, _ = device_cache._by_device_id.get("spk-1")
+    assert not found
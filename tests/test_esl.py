@@ -0,0 +1,179 @@
+"""ESLClient against the fake mod_event_socket server of the load-test harness."""
+import asyncio
+
+import pytest
+
+from conftest import run
+from fakes import Behaviour, FakeESLServer
+from iot_gateway.config import settings
+from iot_gateway.integrations import freeswitch
+from iot_gateway.integrations.esl import ESLClient, ESLError
+
+
+async def start_server(behaviour: Behaviour | None = None) -> FakeESLServer:
+    server = FakeESLServer(behaviour or Behaviour())
+    await server.start("127.0.0.1", 0)
+    return server
+
+
+def client_for(server: FakeESLServer, password: str = "ClueCon") -> ESLClient:
+    return ESLClient("127.0.0.1", server.port, password, connect_timeout=2, command_timeout=2, reconnect_max_delay=1)
+
+
+def test_bgapi_sends_and_returns_job_uuid():
+    async def scenario():
+        server = await start_server()
+        client = client_for(server)
+        try:
+            job_uuid = await client.bgapi("originate user/1000 &echo", job_uuid="job-1")
+            generated = await client.bgapi("originate user/1001 &echo")
+        finally:
+            await client.close()
+            await server.stop()
+        assert job_uuid == "job-1"
+        assert server.bgapi[0] == ("bgapi originate user/1000 &echo", "job-1")
+        assert server.bgapi[1] == ("bgapi originate user/1001 &echo", generated)
+
+    run(scenario())
+
+
+def test_commands_are_pipelined_on_one_connection():
+    async def scenario():
+        server = await start_server(Behaviour(latency=0.05))
+        client = client_for(server)
+        try:
+            await client.connect()
+            tasks = [asyncio.create_task(client.bgapi(f"originate user/{i} &echo", job_uuid=f"job-{i}")) for i in range(10)]
+            while not server.bgapi:
+                await asyncio.sleep(0.005)
+            # the server is still on the first command; all ten are on the wire awaiting replies
+            assert len(client._pending) == 10
+            results = await asyncio.gather(*tasks)
+        finally:
+            await client.close()
+            await server.stop()
+        assert results == [f"job-{i}" for i in range(10)]
+        assert [job for _, job in server.bgapi] == results
+        assert server.connections == 1
+
+    run(scenario())
+
+
+def test_bgapi_error_reply_raises():
+    async def scenario():
+        server = await start_server(Behaviour(error_rate=1.0))
+        client = client_for(server)
+        try:
+            with pytest.raises(ESLError):
+                await client.bgapi("originate user/1000 &echo")
+        finally:
+            await client.close()
+            await server.stop()
+
+    run(scenario())
+
+
+def test_wrong_password_raises():
+    async def scenario():
+        server = await start_server()
+        client = client_for(server, password="wrong")
+        try:
+            with pytest.raises(ESLError):
+                await client.connect()
+            assert not client.connected
+        finally:
+            await client.close()
+            await server.stop()
+
+    run(scenario())
+
+
+def test_reconnects_after_the_connection_drops():
+    async def scenario():
+        server = await start_server()
+        client = client_for(server)
+        try:
+            await client.bgapi("originate user/1000 &echo", job_uuid="before")
+            server.drop_connections()
+            while client.connected:
+                await asyncio.sleep(0.005)
+            assert await client.bgapi("originate user/1000 &echo", job_uuid="after") == "after"
+        finally:
+            await client.close()
+            await server.stop()
+        assert server.connections == 2
+
+    run(scenario())
+
+
+def test_reconnect_backs_off_while_freeswitch_is_down():
+    async def scenario():
+        server = await start_server()
+        port = server.port
+        await server.stop()
+        client = ESLClient("127.0.0.1", port, "ClueCon", connect_timeout=1, reconnect_max_delay=5)
+        with pytest.raises(ESLError, match="failed"):
+            await client.connect()
+        # the next attempt waits out the backoff instead of hammering the port
+        with pytest.raises(ESLError, match="backoff"):
+            await client.connect()
+
+    run(scenario())
+
+
+def test_originate_uses_esl_without_rest_url(monkeypatch):
+    async def scenario():
+        server = await start_server()
+        monkeypatch.setattr(settings, "freeswitch_host", "127.0.0.1")
+        monkeypatch.setattr(settings, "freeswitch_port", server.port)
+        try:
+            result = await freeswitch.originate("1000", caller_id="IoT-Gateway")
+        finally:
+            await freeswitch.close()
+            await server.stop()
+        assert result["success"] and not result.get("mock")
+        command, job_uuid = server.bgapi[0]
+        assert result["call_id"] == job_uuid
+        assert f"origination_uuid={job_uuid}" in command and "user/1000" in command
+
+    monkeypatch.setattr(settings, "freeswitch_rest_url", None)
+    monkeypatch.setattr(settings, "freeswitch_mock", False)
+    assert not freeswitch.uses_rest()
+    run(scenario())
+
+
+def test_originate_reuses_given_call_id(monkeypatch):
+    async def scenario():
+        server = await start_server()
+        monkeypatch.setattr(settings, "freeswitch_host", "127.0.0.1")
+        monkeypatch.setattr(settings, "freeswitch_port", server.port)
+        try:
+            first = await freeswitch.originate("1000", call_id="call-1")
+            retry = await freeswitch.originate("1000", call_id="call-1")
+        finally:
+            await freeswitch.close()
+            await server.stop()
+        assert first["call_id"] == retry["call_id"] == "call-1"
+        assert [job for _, job in server.bgapi] == ["call-1", "call-1"]
+        assert all("origination_uuid=call-1," in command for command, _ in server.bgapi)
+
+    monkeypatch.setattr(settings, "freeswitch_rest_url", None)
+    monkeypatch.setattr(settings, "freeswitch_mock", False)
+    run(scenario())
+
+
+def test_mock_echoes_the_call_id(monkeypatch):
+    monkeypatch.setattr(settings, "freeswitch_mock", True)
+    result = run(freeswitch.originate("1000", call_id="call-1"))
+    assert result["mock"] and result["call_id"] == "call-1"
+
+
+def test_mock_only_when_no_freeswitch_is_configured(monkeypatch):
+    monkeypatch.setattr(settings, "freeswitch_mock", None)
+    monkeypatch.setattr(settings, "freeswitch_rest_url", None)
+    monkeypatch.setattr(settings, "__pydantic_fields_set__", settings.model_fields_set - {"freeswitch_host"})
+    assert freeswitch.uses_mock()
+    monkeypatch.setattr(settings, "freeswitch_host", "fs.internal")
+    assert not freeswitch.uses_mock()
+    monkeypatch.setattr(settings, "freeswitch_mock", True)
+    assert freeswitch.uses_mock()
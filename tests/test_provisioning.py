@@ -0,0 +1,65 @@
+"""Per-row reports of bulk provisioning when rows are invalid or rejected by the database."""
+import json
+
+from fastapi.testclient import TestClient
+
+from conftest import run
+from iot_gateway import main
+from iot_gateway.config import settings
+from iot_gateway.services import provisioning
+
+
+class Session:
+    """Stands in for the AsyncSession; the repositories are monkeypatched."""
+
+    def __init__(self) -> None:
+        self.rollbacks = 0
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+async def rows(items):
+    for row, item in enumerate(items):
+        yield row, item
+
+
+def device(n: int, **fields) -> dict:
+    return {"device_id": f"dev-{n}", "type": "speaker", **fields}
+
+
+def test_rejected_row_does_not_fail_its_chunk(monkeypatch):
+    statements = []
+
+    async def upsert_many(session, data):
+        statements.append(len(data))
+        if any(d["device_id"] == "dev-5" for d in data):
+            raise RuntimeError("foreign key violation")
+        return [(d["device_id"], True) for d in data]
+
+    monkeypatch.setattr(provisioning.device_repo, "upsert_many", upsert_many)
+    session = Session()
+    report = run(provisioning.bulk_upsert_devices(session, rows([device(n) for n in range(8)])))
+    assert report["inserted"] == 7
+    assert report["errors"] == [{"row": 5, "error": "database error: RuntimeError"}]
+    assert statements[0] == 8 and len(statements) <= 2 * 8
+
+
+def test_column_limits_are_validated_per_row(monkeypatch):
+    async def upsert_many(session, data):
+        return [(d["device_id"], True) for d in data]
+
+    monkeypatch.setattr(provisioning.device_repo, "upsert_many", upsert_many)
+    items = [device(0), device(1, msisdn="7" * 33), device(2, msisdn="7" * 32)]
+    report = run(provisioning.bulk_upsert_devices(Session(), rows(items)))
+    assert report["inserted"] == 2
+    assert [error["row"] for error in report["errors"]] == [1]
+    assert report["errors"][0]["error"].startswith("msisdn:")
+
+
+def test_json_array_over_the_size_limit_is_refused(monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_json_bytes", 100)
+    body = json.dumps([device(n) for n in range(10)])
+    response = TestClient(main.app).post("/rules/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+    assert "NDJSON" in response.json()["detail"]
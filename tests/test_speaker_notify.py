@@ -0,0 +1,43 @@
+"""Push to a connected speaker and the HTTP fallback of telekom_to_iot._notify_device."""
+import httpx
+import pytest
+
+from conftest import run
+from iot_gateway.services import telekom_to_iot
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    """Endpoints POSTed to; every POST is answered with 200."""
+    sent = []
+
+    async def hedged_post(url, payload):
+        sent.append(url)
+        return httpx.Response(200, request=httpx.Request("POST", url))
+
+    monkeypatch.setattr(telekom_to_iot, "_hedged_post", hedged_post)
+    return sent
+
+
+def connected_speaker(monkeypatch, pushed: dict) -> None:
+    async def push(device_id, payload):
+        return pushed
+
+    monkeypatch.setattr(telekom_to_iot.speaker_push, "connected", lambda device_id: True)
+    monkeypatch.setattr(telekom_to_iot.speaker_push, "push", push)
+
+
+def test_nack_is_final(monkeypatch, posts):
+    connected_speaker(monkeypatch, {"success": False, "error": "busy", "nacked": True})
+    outcome = run(telekom_to_iot._notify_device("spk-1", "http://speaker/notify", {"call_id": "c1"}))
+    assert posts == []
+    assert not outcome["success"] and outcome["error"] == "busy"
+    assert not outcome["retryable"]
+
+
+@pytest.mark.parametrize("error", ["ack_timeout", "ConnectionClosed"])
+def test_unanswered_push_falls_back_to_http(monkeypatch, posts, error):
+    connected_speaker(monkeypatch, {"success": False, "error": error, "nacked": False})
+    outcome = run(telekom_to_iot._notify_device("spk-1", "http://speaker/notify", {"call_id": "c1"}))
+    assert posts == ["http://speaker/notify"]
+    assert outcome["success"] and outcome["status_code"] == 200
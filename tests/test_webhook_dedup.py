@@ -0,0 +1,106 @@
+"""WebhookCoalescer: which results are remembered, what waiters get, batch slots and suppressed counts."""
+import asyncio
+
+import pytest
+
+from conftest import run
+from iot_gateway.services import iot_to_telekom
+from iot_gateway.services.webhook_dedup import WebhookCoalescer
+
+OK = {"success": True, "calls": []}
+FAILED = {"success": False, "calls": []}
+
+
+def coalescer(window: float = 10, idempotency_ttl: float = 300) -> WebhookCoalescer:
+    return WebhookCoalescer(window=window, idempotency_ttl=idempotency_ttl, capacity=100)
+
+
+def test_only_successes_are_remembered():
+    async def scenario():
+        dedup = coalescer()
+        dedup.finish(dedup.begin("smoke", "dev-1", "k1"), OK)
+        dedup.finish(dedup.begin("smoke", "dev-2", "k2"), FAILED)
+        dedup.finish(dedup.begin("smoke", "dev-3", "k3"), None, RuntimeError("db down"))
+        earlier = dedup.lookup("smoke", "dev-1", None)
+        assert earlier is not None and await dedup.wait(earlier) == {**OK, "duplicate": True}
+        assert dedup.lookup("smoke", "dev-2", "k2") is None
+        assert dedup.lookup("smoke", "dev-3", "k3") is None
+
+    run(scenario())
+
+
+def test_idempotency_key_outlives_the_suppression_window():
+    async def scenario():
+        dedup = coalescer(window=0.05)
+        dedup.finish(dedup.begin("smoke", "dev-1", "k1"), OK)
+        await asyncio.sleep(0.1)
+        assert dedup.lookup("smoke", "dev-1", None) is None
+        assert dedup.lookup("smoke", "dev-1", "k1") is not None
+
+    run(scenario())
+
+
+def test_waiters_get_the_original_result_or_its_exception():
+    async def scenario():
+        dedup = coalescer()
+        ok_entry = dedup.begin("smoke", "dev-1", None)
+        failing_entry = dedup.begin("smoke", "dev-2", None)
+        ok_waiter = asyncio.create_task(dedup.wait(dedup.lookup("smoke", "dev-1", None)))
+        failing_waiter = asyncio.create_task(dedup.wait(dedup.lookup("smoke", "dev-2", None)))
+        await asyncio.sleep(0)
+        assert not ok_waiter.done()
+        dedup.finish(ok_entry, OK)
+        dedup.finish(failing_entry, None, RuntimeError("db down"))
+        assert await ok_waiter == {**OK, "duplicate": True}
+        with pytest.raises(RuntimeError, match="db down"):
+            await failing_waiter
+        # the failed event is forgotten once its waiters are answered
+        assert dedup.lookup("smoke", "dev-2", None) is None
+
+    run(scenario())
+
+
+def test_duplicates_within_a_batch_share_a_slot(monkeypatch):
+    handled = []
+
+    async def handle_many(session, events):
+        handled.append(events)
+        return [{"success": device_id != "dev-2", "device_id": device_id, "calls": []} for _, device_id in events]
+
+    monkeypatch.setattr(iot_to_telekom, "_handle_many", handle_many)
+
+    async def scenario():
+        dedup = coalescer()
+        monkeypatch.setattr(iot_to_telekom, "webhook_coalescer", dedup)
+        events = [
+            ("smoke", "dev-1", None),
+            ("smoke", "dev-1", None),  # same device and event type
+            ("smoke", "dev-2", "k"),
+            ("fire", "dev-3", "k"),  # same idempotency key
+        ]
+        results = await iot_to_telekom.handle_webhook_batch(None, events)
+        return dedup, results
+
+    dedup, results = run(scenario())
+    assert handled == [[("smoke", "dev-1"), ("smoke", "dev-2")]]
+    assert [r["device_id"] for r in results] == ["dev-1", "dev-1", "dev-2", "dev-2"]
+    assert [r.get("duplicate", False) for r in results] == [False, True, False, True]
+    assert dedup.stats()["window_entries"] == 1  # the failed dev-2 event is forgotten
+
+
+def test_take_suppressed_counts_per_device_and_event_type():
+    async def scenario():
+        dedup = coalescer()
+        dedup.begin("smoke", "dev-1", None)
+        dedup.begin("fire", "dev-1", None)
+        for _ in range(3):
+            dedup.lookup("smoke", "dev-1", None)
+        dedup.lookup("fire", "dev-1", None)
+        dedup.lookup("smoke", "dev-9", None)  # not a duplicate
+        return dedup.take_suppressed(), dedup.take_suppressed(), dedup.stats()
+
+    rows, again, stats = run(scenario())
+    assert {row["details"]["event_type"]: row["details"]["count"] for row in rows} == {"smoke": 3, "fire": 1}
+    assert all(row["event_kind"] == "webhook_suppressed" and row["device_id"] == "dev-1" for row in rows)
+    assert again == []
+    assert stats["suppressed"] == 4
@@ -0,0 +1,118 @@
+"""WebhookJobQueue: submit -> worker -> finished job, idempotency-key reuse, expiry and eviction."""
+import asyncio
+
+from conftest import run
+from iot_gateway.services import iot_to_telekom
+from iot_gateway.services.webhook_jobs import WebhookJobQueue
+
+
+def fake_handle_webhook(monkeypatch, outcomes: dict[str, object] | None = None) -> list[str]:
+    """Results by device_id (an exception is raised); other devices succeed. Returns the devices handled."""
+    handled: list[str] = []
+    outcomes = outcomes or {}
+
+    async def handle_webhook(session, event_type, device_id, idempotency_key=None):
+        handled.append(device_id)
+        outcome = outcomes.get(device_id, {"success": True, "calls": []})
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(iot_to_telekom, "handle_webhook", handle_webhook)
+    return handled
+
+
+async def finished(jobs: WebhookJobQueue, *job_ids: str) -> None:
+    while not all(jobs._jobs[job_id].finished for job_id in job_ids):
+        await asyncio.sleep(0.005)
+
+
+def test_finished_job_is_reused_for_its_key_until_it_expires(monkeypatch):
+    handled = fake_handle_webhook(monkeypatch)
+
+    async def scenario():
+        jobs = WebhookJobQueue(workers=2, max_queue=10, max_jobs=10, ttl=0.1)
+        await jobs.start()
+        try:
+            job = jobs.submit("smoke", "dev-1", "k1")
+            await finished(jobs, job.id)
+            assert job.status == "done" and job.result["success"]
+            assert jobs.submit("smoke", "dev-1", "k1") is job
+            await asyncio.sleep(0.15)
+            assert jobs.get(job.id) is None
+            again = jobs.submit("smoke", "dev-1", "k1")
+            await finished(jobs, again.id)
+        finally:
+            await jobs.stop()
+        assert again is not job
+        assert handled == ["dev-1", "dev-1"]
+        assert jobs.stats()["completed"] == 2
+
+    run(scenario())
+
+
+def test_failed_jobs_do_not_answer_a_retry(monkeypatch):
+    handled = fake_handle_webhook(monkeypatch, {
+        "dev-1": RuntimeError("db down"),
+        "dev-2": {"success": False, "calls": []},
+    })
+
+    async def scenario():
+        jobs = WebhookJobQueue(workers=2, max_queue=10, max_jobs=10, ttl=60)
+        await jobs.start()
+        try:
+            crashed = jobs.submit("smoke", "dev-1", "k1")
+            unsuccessful = jobs.submit("smoke", "dev-2", "k2")
+            await finished(jobs, crashed.id, unsuccessful.id)
+            retries = [jobs.submit("smoke", "dev-1", "k1"), jobs.submit("smoke", "dev-2", "k2")]
+            await finished(jobs, *(job.id for job in retries))
+        finally:
+            await jobs.stop()
+        assert crashed.status == "failed" and crashed.error == "db down"
+        assert unsuccessful.status == "done"
+        assert retries[0] is not crashed and retries[1] is not unsuccessful
+        assert sorted(handled) == ["dev-1", "dev-1", "dev-2", "dev-2"]
+        assert jobs.stats()["failed"] == 2
+
+    run(scenario())
+
+
+def test_oldest_finished_jobs_are_evicted_first(monkeypatch):
+    fake_handle_webhook(monkeypatch)
+
+    async def scenario():
+        jobs = WebhookJobQueue(workers=1, max_queue=10, max_jobs=2, ttl=60)
+        await jobs.start()
+        try:
+            first = jobs.submit("smoke", "dev-1", "k1")
+            await finished(jobs, first.id)
+            second = jobs.submit("smoke", "dev-2")
+            await finished(jobs, second.id)
+            third = jobs.submit("smoke", "dev-3")
+            # the first job made room; its key no longer points anywhere
+            assert jobs.get(first.id) is None
+            assert jobs.get(second.id) is second and jobs.get(third.id) is third
+            await finished(jobs, third.id)
+        finally:
+            await jobs.stop()
+        assert jobs._by_key == {}
+
+    run(scenario())
+
+
+def test_submit_refuses_when_full_or_stopped(monkeypatch):
+    fake_handle_webhook(monkeypatch)
+
+    async def scenario():
+        jobs = WebhookJobQueue(workers=1, max_queue=1, max_jobs=10, ttl=60)
+        assert jobs.submit("smoke", "dev-1") is None  # not started
+        await jobs.start()
+        try:
+            # nothing yields to the worker in between, so the second submit finds the queue full
+            assert jobs.submit("smoke", "dev-1") is not None
+            assert jobs.submit("smoke", "dev-2") is None
+        finally:
+            await jobs.stop()
+        assert jobs.stats()["rejected"] == 1
+
+    run(scenario())
@@ -0,0 +1,29 @@
+"""Authentication of the /webhook/ws handshake."""
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from iot_gateway import main
+from iot_gateway.config import settings
+
+
+def test_query_key_is_refused_by_default():
+    client = TestClient(main.app)
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(f"/webhook/ws?api_key={settings.webhook_api_key}"):
+            pass
+    assert refused.value.code == 1008
+
+
+def test_header_key_is_accepted(monkeypatch):
+    served = []
+
+    async def serve(websocket, key):
+        served.append(key)
+        await websocket.close()
+
+    monkeypatch.setattr(main.webhook_stream, "serve", serve)
+    client = TestClient(main.app)
+    with client.websocket_connect("/webhook/ws", headers={"X-API-Key": settings.webhook_api_key}):
+        pass
+    assert served == [settings.webhook_api_key]